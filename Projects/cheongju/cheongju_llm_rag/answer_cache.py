@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+
+def stats_fingerprint(stats_summary) -> str:
+    """basic_summary() 결과(dict) 또는 문자열 → 내용 해시. 같은 업로드 데이터면 같은 값."""
+    if isinstance(stats_summary, dict):
+        text = json.dumps(stats_summary, ensure_ascii=False, sort_keys=True, default=str)
+    else:
+        text = str(stats_summary)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def answer_cache_key(model: str, stats_summary, retrieved_chunks: List, extra: str = "") -> str:
+    """
+    (모델, stats 지문, 검색된 청크 ID/텍스트, 프롬프트 설정) → 버킷 키.
+    청크 ID는 저장소(KB 샤드)마다 따로 매겨지므로 텍스트 해시도 함께 넣는다.
+    """
+    h = hashlib.sha256()
+    for part in (model, stats_fingerprint(stats_summary), extra):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    for c in retrieved_chunks:
+        if isinstance(c, dict):
+            h.update(str(c.get("id")).encode("utf-8"))
+            c = c["chunk"]
+        h.update(hashlib.sha256(c.encode("utf-8")).digest())
+    return h.hexdigest()
+
+
+class AnswerCache:
+    """
+    LLM 답변 디스크 캐시 (SQLite). 같은 데이터/같은 컨텍스트(버킷 키)에서
+    질문 임베딩 cosine 유사도가 threshold 이상인 이전 질문이 있으면 그 답변을 재사용.
+    - ttl_sec이 지난 답변은 사용하지 않고 정리
+    - max_entries를 넘으면 가장 오래 사용되지 않은 답변부터 삭제 (LRU)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 5000,
+        ttl_sec: float = 24 * 3600,
+        threshold: float = 0.95,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.threshold = threshold
+
+        cache_dir = os.path.dirname(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                bucket TEXT NOT NULL,
+                question TEXT NOT NULL,
+                qvec BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_answers_bucket ON answers(bucket);
+            CREATE INDEX IF NOT EXISTS idx_answers_last_used ON answers(last_used);
+            """
+        )
+        self._conn.commit()
+
+        # 프로세스 내 누적 적중/미스 횟수
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, bucket: str, qvec: np.ndarray) -> Optional[str]:
+        """버킷 안에서 가장 비슷한 (TTL 이내) 질문의 답변. 유사도가 threshold 미만이면 None."""
+        q = _unit(qvec)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, qvec, answer FROM answers WHERE bucket = ? AND created_at >= ?",
+                (bucket, time.time() - self.ttl_sec),
+            ).fetchall()
+
+            best_id, best_sim, best_answer = None, -1.0, None
+            for row_id, blob, answer in rows:
+                v = np.frombuffer(blob, dtype="float32")
+                if v.shape != q.shape:
+                    continue  # 임베딩 백엔드가 바뀐 이전 항목
+                sim = float(v @ q)
+                if sim > best_sim:
+                    best_id, best_sim, best_answer = row_id, sim, answer
+
+            if best_id is None or best_sim < self.threshold:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE answers SET last_used = ? WHERE id = ?", (time.time(), best_id))
+            self._conn.commit()
+            self.hits += 1
+            return best_answer
+
+    def put(self, bucket: str, question: str, qvec: np.ndarray, answer: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO answers (bucket, question, qvec, answer, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (bucket, question, _unit(qvec).tobytes(), answer, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """TTL이 지난 답변 삭제 후 max_entries 초과분을 last_used 오래된 순으로 삭제. (lock 안에서 호출)"""
+        self._conn.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl_sec,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                """
+                DELETE FROM answers WHERE id IN (
+                    SELECT id FROM answers ORDER BY last_used ASC LIMIT ?
+                )
+                """,
+                (overflow,),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+        return int(count)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    v = np.asarray(v, dtype="float32").ravel()
+    norm = float(np.linalg.norm(v))
+    return v / norm if norm > 0 else v
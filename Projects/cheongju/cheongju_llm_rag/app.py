@@ -1,28 +1,37 @@
-import os
-import json
 import time
 from datetime import datetime
 
 import streamlit as st
 from dotenv import load_dotenv
 
-from preprocess import load_accidents_csv, basic_summary
-from rag_engine import RAGEngine
+from preprocess import load_accidents_csv, basic_summary, stream_summary
+from kb_shards import ShardedRAGEngine, kb_names
+from rag_engine import SharedRAGEngine
+from tracing import Trace, append_jsonl
 import config  # CHUNK_SIZE, CHAT_MODEL 등 설정값
 
 st.set_page_config(page_title="Accident Risk RAG", layout="wide")
 
-LOG_PATH = "logs/latency_log.jsonl"
+LOG_PATH = config.LATENCY_LOG_PATH
 
 
 def log_latency(record: dict):
-    """요청별 지연 시간 로그를 jsonl 형태로 저장"""
-    log_dir = os.path.dirname(LOG_PATH)
-    if log_dir and not os.path.exists(log_dir):
-        os.makedirs(log_dir, exist_ok=True)
+    """요청별 지연 시간 로그를 jsonl 형태로 저장 (크기 초과 시 회전). 집계: python latency_report.py"""
+    append_jsonl(
+        LOG_PATH,
+        record,
+        max_bytes=config.LATENCY_LOG_MAX_BYTES,
+        backups=config.LATENCY_LOG_BACKUPS,
+    )
 
-    with open(LOG_PATH, "a", encoding="utf-8") as f:
-        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+@st.cache_resource
+def get_shared_engine() -> SharedRAGEngine | ShardedRAGEngine:
+    """
+    세션/리런 사이에 공유되는 엔진. 인덱스 파일이 바뀌었을 때만 다시 로드된다.
+    config.KNOWLEDGE_BASES가 있으면 KB 샤드 묶음 (샤드마다 따로 재로드).
+    """
+    return ShardedRAGEngine() if kb_names() else SharedRAGEngine()
 
 
 def main():
@@ -45,15 +54,24 @@ def main():
 
         k = st.slider("검색 컨텍스트 개수(k)", 2, 8, 4)
 
+        kbs = None  # None = 단일 인덱스
+        if kb_names():
+            kbs = st.multiselect("검색할 지식 베이스", kb_names(), default=kb_names())
+
         run_btn = st.button("분석 실행")
 
-    # RAG 로드
-    rag = RAGEngine()
+    # RAG 로드 (프로세스 공유 엔진, 인덱스가 바뀐 경우에만 재로드)
+    if kbs == []:
+        st.error("검색할 지식 베이스를 하나 이상 선택해줘.")
+        st.stop()
     try:
-        rag.load()  # 기존에 쓰던 메서드 유지
+        shared = get_shared_engine()
+        rag = shared.get(kbs) if kbs is not None else shared.get()
     except Exception as e:
         st.warning("지식 인덱스가 없어 보여. 먼저 `python ingest.py` 실행해줘.")
         st.stop()
+    if getattr(rag, "missing", None):
+        st.info(f"아직 인덱스가 없는 지식 베이스는 제외하고 검색: {', '.join(rag.missing)}")
 
     if run_btn:
         if uploaded is None:
@@ -64,54 +82,86 @@ def main():
             st.error("질문을 입력해줘.")
             st.stop()
 
-        # 전체 처리 시간 측정 시작
+        # 전체 처리 시간 측정 시작 (구간별 시간은 trace.spans에 기록)
         start_total = time.time()
+        trace = Trace()
+
+        # 쿼리 임베딩/검색은 업로드 파일과 무관 → 파일 파싱/요약과 동시에 백그라운드에서 실행
+        retrieval_future = rag.retrieve_async(question, k=k, trace=trace)
 
         # 🔴 파일 로딩 에러를 화면에서 보여주기
+        # 큰 파일은 전체를 DataFrame으로 올리지 않고 청크 단위로 요약만 계산 (parse 포함 summary span)
+        streaming = getattr(uploaded, "size", 0) >= config.STREAMING_SUMMARY_MIN_BYTES
+        trace.set("streaming_summary", int(streaming))
         try:
-            df = load_accidents_csv(uploaded)
+            if streaming:
+                with trace.span("summary"):
+                    stats = stream_summary(uploaded)
+            else:
+                with trace.span("parse"):
+                    df = load_accidents_csv(uploaded)
+                with trace.span("summary"):
+                    stats = basic_summary(df)
         except Exception as e:
+            retrieval_future.cancel()
             st.error(f"파일을 읽는 중 오류가 발생했어: {e}")
             st.stop()
 
-        stats = basic_summary(df)
-
         st.subheader("📌 데이터 요약")
         st.json(stats)
 
-        # Retrieval 시간 측정
-        start_retrieval = time.time()
-        retrieved = rag.retrieve(question, k=k)
-        end_retrieval = time.time()
+        # 검색 결과 대기 (파싱/요약이 더 오래 걸렸으면 이미 끝나 있음)
+        retrieved = retrieval_future.result()
+
+        # 겹쳐 실행해서 줄어든 시간 = (파싱 + 요약 + 검색을 순서대로 했을 때) - (세 구간의 실제 경과 시간)
+        # 경과 시간은 span 시작/끝 시각 기준이라 그 사이 화면 출력(st.json 등) 시간은 들어가지 않음
+        spans = trace.to_dict()["spans"]
+        serial_ms = spans.get("parse", 0) + spans.get("summary", 0) + spans.get("retrieval", 0)
+        overlapped_ms = trace.elapsed_ms("parse", "summary", "retrieval") or 0
+        overlap_saved_ms = max(0, int(serial_ms - overlapped_ms))
 
         col1, col2 = st.columns(2)
 
         with col1:
             st.subheader("📚 검색된 컨텍스트")
-            for i, c in enumerate(retrieved, 1):
-                st.markdown(f"**#{i}**")
-                st.write(c)
+            for i, h in enumerate(retrieved, 1):
+                kb = f"[{h['kb']}] " if "kb" in h else ""
+                st.markdown(f"**#{i}** ({kb}{h['source']}, score={h['score']:.3f})")
+                st.write(h["chunk"])
 
         with col2:
             st.subheader("🤖 LLM 답변")
+            # 토큰이 도착하는 대로 화면에 출력 (첫 토큰 시간/초당 토큰 수는 llm_metrics에 기록)
+            llm_metrics: dict = {}
             start_llm = time.time()
-            answer = rag.answer(question, stats, retrieved)
+            st.write_stream(
+                rag.answer_stream(question, stats, retrieved, metrics=llm_metrics, trace=trace)
+            )
             end_llm = time.time()
-            st.write(answer)
 
         end_total = time.time()
+        trace.add_span("total", (end_total - start_total) * 1000)
 
         # 지연 시간 로그 저장 (ms 단위)
         log_latency(
             {
                 "timestamp": datetime.now().isoformat(),
                 "question": question,
-                "retrieval_ms": int((end_retrieval - start_retrieval) * 1000),
+                "retrieval_ms": int(spans.get("retrieval", 0)),
+                "overlap_saved_ms": overlap_saved_ms,
                 "llm_ms": int((end_llm - start_llm) * 1000),
+                "ttft_ms": llm_metrics.get("ttft_ms"),
+                "output_tokens": llm_metrics.get("output_tokens"),
+                "tokens_per_sec": llm_metrics.get("tokens_per_sec"),
                 "total_ms": int((end_total - start_total) * 1000),
                 "top_k": k,
                 "chunk_size": getattr(config, "CHUNK_SIZE", None),
                 "model": getattr(config, "CHAT_MODEL", None),
+                "retriever": getattr(config, "RETRIEVER", None),
+                "kbs": kbs,
+                "index_type": rag.index_type,
+                "embedding_backend": rag.embedder.backend_id,
+                **trace.to_dict(),
             }
         )
 
@@ -0,0 +1,237 @@
+"""
+여러 (질문, 데이터 파일) 쌍을 한 번에 처리하는 배치 질의응답.
+데이터 요약 / 검색 / 답변을 크기가 정해진 스레드 풀에서 동시에 실행하고 결과를 JSONL로 저장.
+  - 같은 데이터 파일은 한 번만 요약, 같은 (질문, k) 검색은 한 번만 실행
+  - API rate limit(429)/일시 오류는 지수 백오프 + jitter로 재시도 (Retry-After 헤더 우선)
+    (재시도는 with_backoff 한 곳에서만: 배치용 OpenAI 클라이언트는 SDK 자체 재시도를 끔)
+
+입력 (jsonl 또는 csv, 필드: question, dataset, [id], [k]):
+  {"id": "w01-01", "question": "청원구 야간 교차로 사고 위험과 대책은?", "dataset": "data/raw/accidents_sample.csv"}
+
+사용 예:
+  python batch_qa.py questions.jsonl --out logs/batch_qa.jsonl --workers 8
+"""
+import os
+import csv
+import json
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+import numpy as np
+import openai
+from dotenv import load_dotenv
+
+import config  # TOP_K, BATCH_*, STREAMING_SUMMARY_MIN_BYTES
+from preprocess import load_accidents_csv, basic_summary, stream_summary
+from embedding_backends import OpenAIEmbeddingBackend, get_openai_client
+from kb_shards import MultiKBEngine, open_engine
+from rag_engine import RAGEngine
+from tracing import Trace
+
+T = TypeVar("T")
+
+# 재시도할 오류: rate limit, 연결/타임아웃, 서버 5xx
+_RETRYABLE = (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)
+
+
+def _retry_after(e: Exception) -> float | None:
+    """429 응답의 Retry-After 헤더(초). 없으면 None."""
+    response = getattr(e, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def with_backoff(fn: Callable[[], T], counters: dict | None = None) -> T:
+    """
+    fn()을 실행하고 재시도 가능한 오류면 지수 백오프(full jitter)로 다시 시도.
+    동시에 여러 워커가 429를 받아도 재시도 시점이 흩어지도록 [0, base·2^n] 구간에서 무작위로 대기.
+    counters를 넘기면 retries / backoff_ms가 누적된다.
+    """
+    max_retries = getattr(config, "BATCH_MAX_RETRIES", 5)
+    base = getattr(config, "BATCH_BACKOFF_BASE_SEC", 1.0)
+    cap = getattr(config, "BATCH_BACKOFF_MAX_SEC", 30.0)
+
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except _RETRYABLE as e:
+            if attempt == max_retries:
+                raise
+            delay = _retry_after(e)
+            if delay is None:
+                delay = random.uniform(0, min(cap, base * 2 ** attempt))
+            if counters is not None:
+                counters["retries"] = counters.get("retries", 0) + 1
+                counters["backoff_ms"] = counters.get("backoff_ms", 0) + int(delay * 1000)
+            time.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def use_client(rag: RAGEngine | MultiKBEngine, client):
+    """엔진(KB 샤드 포함)의 답변/OpenAI 임베딩 요청이 client를 쓰도록 교체."""
+    engines = rag.engines.values() if isinstance(rag, MultiKBEngine) else [rag]
+    for engine in engines:
+        engine.client = client
+        if isinstance(engine.embedder, OpenAIEmbeddingBackend):
+            engine.embedder.client = client
+
+
+def load_items(path: str) -> list[dict]:
+    if path.endswith(".csv"):
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    items = []
+    for i, r in enumerate(rows):
+        if not r.get("question") or not r.get("dataset"):
+            raise ValueError(f"{path} {i + 1}번째 항목에 question/dataset이 없음")
+        items.append(
+            {
+                "id": r.get("id") or str(i + 1),
+                "question": r["question"].strip(),
+                "dataset": r["dataset"],
+                "k": int(r["k"]) if r.get("k") else config.TOP_K,
+            }
+        )
+    return items
+
+
+def summarize_dataset(path: str) -> dict:
+    """app.py와 같은 기준: 큰 파일은 스트리밍 요약."""
+    if os.path.getsize(path) >= getattr(config, "STREAMING_SUMMARY_MIN_BYTES", float("inf")):
+        return stream_summary(path)
+    return basic_summary(load_accidents_csv(path))
+
+
+def _timed(fn: Callable[[], T]) -> tuple[T, float, dict]:
+    """(결과, 소요 ms, 재시도 카운터)"""
+    counters: dict = {}
+    start = time.perf_counter()
+    result = with_backoff(fn, counters)
+    return result, (time.perf_counter() - start) * 1000, counters
+
+
+def _retrieve(rag: RAGEngine | MultiKBEngine, question: str, k: int) -> tuple[list[dict], Trace]:
+    trace = Trace()
+    return rag.retrieve_hits(question, k=k, trace=trace), trace
+
+
+def run_batch(rag: RAGEngine | MultiKBEngine, items: list[dict], out_path: str, workers: int) -> list[dict]:
+    """
+    items를 처리해 out_path(jsonl)에 끝나는 순서대로 한 줄씩 기록하고 전체 레코드를 반환.
+    요약/검색 작업을 답변 작업보다 먼저 제출하므로, 답변 작업이 기다리는 Future는
+    항상 이미 실행 중이거나 끝난 상태 (워커가 모두 대기에 묶이는 교착이 생기지 않음).
+    """
+    out_dir = os.path.dirname(out_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    write_lock = threading.Lock()
+    records: list[dict] = []
+
+    batch_start = time.perf_counter()
+
+    # 풀이 먼저 닫혀야(남은 작업 완료 대기) 결과 파일을 닫을 수 있으므로 파일을 바깥에 둔다
+    with open(out_path, "w", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+        # 1) 데이터 요약: 파일별 한 번
+        stats_futures: dict[str, Future] = {
+            ds: pool.submit(_timed, lambda ds=ds: summarize_dataset(ds))
+            for ds in dict.fromkeys(item["dataset"] for item in items)
+        }
+
+        # 2) 검색: 같은 (질문, k)는 한 번만
+        retrieval_futures: dict[tuple, Future] = {}
+        for item in items:
+            key = (item["question"], item["k"])
+            if key not in retrieval_futures:
+                retrieval_futures[key] = pool.submit(_timed, lambda q=item["question"], k=item["k"]: _retrieve(rag, q, k))
+
+        # 3) 답변: 같은 (질문, 데이터, k)는 한 번만 생성하고 결과를 공유
+        answer_futures: dict[tuple, Future] = {}
+
+        def answer_job(item: dict) -> dict:
+            stats, stats_ms, _ = stats_futures[item["dataset"]].result()
+            retrieval = retrieval_futures[(item["question"], item["k"])]
+            (hits, retrieval_trace), retrieval_ms, retrieval_retries = retrieval.result()
+            trace = Trace()
+            answer, answer_ms, answer_retries = _timed(lambda: rag.answer(item["question"], stats, hits, trace=trace))
+            return {
+                "answer": answer,
+                "retrieved": [
+                    {"id": h["id"], "kb": h.get("kb"), "source": h["source"], "score": round(h["score"], 4)}
+                    for h in hits
+                ],
+                "latency_ms": {
+                    "stats": round(stats_ms, 1),
+                    "retrieval": round(retrieval_ms, 1),
+                    "answer": round(answer_ms, 1),
+                    # 배치 시작부터 이 항목이 끝날 때까지 (대기 포함)
+                    "total": round((time.perf_counter() - batch_start) * 1000, 1),
+                },
+                "retries": retrieval_retries.get("retries", 0) + answer_retries.get("retries", 0),
+                "spans": {**retrieval_trace.to_dict()["spans"], **trace.to_dict()["spans"]},
+                "counters": trace.to_dict()["counters"],
+            }
+
+        def finish(item: dict, future: Future):
+            record = {"id": item["id"], "question": item["question"], "dataset": item["dataset"], "k": item["k"]}
+            try:
+                record.update(future.result())
+            except Exception as e:
+                record["error"] = f"{type(e).__name__}: {e}"
+            with write_lock:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                records.append(record)
+
+        for item in items:
+            key = (item["question"], item["dataset"], item["k"])
+            if key not in answer_futures:
+                answer_futures[key] = pool.submit(answer_job, item)
+            answer_futures[key].add_done_callback(lambda f, item=item: finish(item, f))
+
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="(질문, 데이터 파일) 배치 질의응답")
+    parser.add_argument("input", help="질문 목록 (jsonl 또는 csv: question, dataset, [id], [k])")
+    parser.add_argument("--out", default="logs/batch_qa.jsonl", help="결과 jsonl 경로")
+    parser.add_argument("--workers", type=int, default=getattr(config, "BATCH_WORKERS", 4), help="동시 실행 수")
+    parser.add_argument("--kb", default=None, help="검색할 KB 이름 (쉼표 구분, 기본: 전체)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    items = load_items(args.input)
+    rag = open_engine([n.strip() for n in args.kb.split(",") if n.strip()] if args.kb else None)
+    # SDK 기본 재시도(max_retries=2)가 with_backoff 안에서 또 돌면 429 한 번에 요청이 최대 3배로 불어나고
+    # 재시도 횟수/대기 시간 집계에도 잡히지 않으므로 배치에서는 끈다
+    use_client(rag, get_openai_client().with_options(max_retries=0))
+
+    start = time.perf_counter()
+    records = run_batch(rag, items, args.out, args.workers)
+    wall_sec = time.perf_counter() - start
+
+    ok = [r for r in records if "error" not in r]
+    print(f"[OK] {len(ok)}/{len(records)}건 완료, {wall_sec:.1f}s (workers={args.workers}) → {args.out}")
+    if ok:
+        totals = np.array([r["latency_ms"]["total"] for r in ok])
+        p50, p90 = np.percentile(totals, [50, 90])
+        print(f"항목별 total_ms p50={p50:.0f} p90={p90:.0f}, 재시도 {sum(r['retries'] for r in ok)}회")
+    for r in records:
+        if "error" in r:
+            print(f"[X] {r['id']}: {r['error']}")
+
+
+if __name__ == "__main__":
+    main()
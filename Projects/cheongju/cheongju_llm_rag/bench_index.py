@@ -0,0 +1,180 @@
+"""
+인덱스 타입별 recall@k / 검색 지연 / 메모리 벤치마크.
+flat(전수 탐색) 결과를 정답으로 보고 각 ANN/양자화 인덱스의 recall@k, p50/p99 검색 지연,
+flat 대비 인덱스 메모리 절감률을 비교한다. 양자화/PCA 인덱스는 원본 벡터 재정렬 후 recall도 함께 출력.
+
+사용 예:
+  python bench_index.py                       # 현재 인덱스의 청크 + 평가/로그 질문
+  python bench_index.py --synthetic 100000    # 규모 테스트용 인위적 벡터 (네트워크 불필요)
+  python bench_index.py --types flat,sq8,pq --dims 512   # `dimensions`=512 임베딩 + 양자화 효과
+  python bench_index.py --types flat,sq8 --pca 256
+"""
+import json
+import time
+import argparse
+
+import numpy as np
+import faiss
+from dotenv import load_dotenv
+
+import config
+from rag_engine import RAGEngine
+from vector_index import INDEX_TYPES, build_index, effective_index_type, index_nbytes, is_lossy, pca_dim
+
+
+def _normalized(x: np.ndarray) -> np.ndarray:
+    x = np.ascontiguousarray(x, dtype="float32")
+    faiss.normalize_L2(x)
+    return x
+
+
+def load_kb_vectors(max_queries: int) -> tuple[np.ndarray, np.ndarray]:
+    """현재 인덱스의 청크 벡터와 질문 벡터 (평가셋 + 지연 로그 질문). 임베딩은 캐시 재사용."""
+    from evaluate_rag import TEST_CASES
+
+    rag = RAGEngine()
+    rag.load()
+    corpus = rag._embed([chunk for _, chunk in rag.store.iter_chunks()])
+
+    questions = [c["question"] for c in TEST_CASES]
+    try:
+        with open("logs/latency_log.jsonl", "r", encoding="utf-8") as f:
+            questions.extend(json.loads(line)["question"] for line in f if line.strip())
+    except FileNotFoundError:
+        pass
+    questions = list(dict.fromkeys(questions))[:max_queries]
+
+    return _normalized(corpus), _normalized(rag._embed(questions))
+
+
+def make_synthetic(n: int, n_queries: int, dim: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """실제 임베딩처럼 군집이 있는 분포 (균등 랜덤 벡터는 ANN에 지나치게 불리함)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(8, n // 1000), dim)).astype("float32")
+
+    def sample(count: int) -> np.ndarray:
+        labels = rng.integers(0, len(centers), size=count)
+        return centers[labels] + 0.5 * rng.standard_normal((count, dim)).astype("float32")
+
+    return _normalized(sample(n)), _normalized(sample(n_queries))
+
+
+def truncate_dims(x: np.ndarray, dims: int) -> np.ndarray:
+    """
+    앞쪽 dims 차원만 남기고 다시 정규화. text-embedding-3 계열에 `dimensions`를 지정했을 때
+    API가 돌려주는 벡터와 같은 방식이라 재임베딩 없이 효과를 미리 볼 수 있다.
+    """
+    if not dims or dims >= x.shape[1]:
+        return x
+    return _normalized(x[:, :dims])
+
+
+def _search(index, vectors: np.ndarray, q: np.ndarray, qi: np.ndarray, k: int, rerank_mult: int):
+    """(검색만 한 top-k, 원본 벡터로 재정렬한 top-k 또는 None). 재정렬은 인덱스가 근사일 때만."""
+    lossy = is_lossy(index)
+    _, idx = index.search(q, k * rerank_mult if lossy else k)
+    cand = idx[0][idx[0] != -1]
+    if not lossy:
+        return cand[:k], None
+    exact = vectors[cand] @ qi
+    return cand[:k], cand[np.argsort(-exact, kind="stable")[:k]]
+
+
+def bench(
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    index_types: list[str],
+    k: int,
+    dims: int = 0,
+    pca: int = 0,
+    rerank_mult: int = 4,
+) -> list[dict]:
+    """
+    정답(ground truth)은 항상 원래 차원 flat 전수 탐색 결과.
+    dims/pca로 차원을 줄이거나 양자화한 인덱스가 그 정답을 얼마나 잃는지(recall)와
+    flat 대비 메모리를 얼마나 줄이는지(mem_saved)를 함께 보여준다.
+    양자화/PCA 인덱스는 k × rerank_mult개 후보를 원본 벡터로 재정렬한 recall도 측정 (rerank@k).
+    """
+    ids = np.arange(len(corpus), dtype="int64")
+    k = min(k, len(corpus))
+
+    baseline = build_index(corpus, ids, "flat", pca=0)
+    baseline_bytes = index_nbytes(baseline)
+    _, truth = baseline.search(queries, k)
+
+    vectors = truncate_dims(corpus, dims)
+    qvecs = truncate_dims(queries, dims)
+    rows: list[dict] = []
+
+    for index_type in index_types:
+        t0 = time.perf_counter()
+        index = build_index(vectors, ids, index_type, pca=pca)
+        build_ms = (time.perf_counter() - t0) * 1000
+        nbytes = index_nbytes(index)
+
+        # 실제 서비스처럼 질문 하나씩 검색 (재정렬 포함)
+        latencies, recalls, reranked = [], [], []
+        for i in range(len(queries)):
+            t0 = time.perf_counter()
+            found, rerank_found = _search(index, vectors, qvecs[i : i + 1], qvecs[i], k, rerank_mult)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            recalls.append(len(set(found) & set(truth[i])) / k)
+            if rerank_found is not None:
+                reranked.append(len(set(rerank_found) & set(truth[i])) / k)
+
+        rows.append(
+            {
+                "index_type": index_type,
+                "effective": effective_index_type(index_type, len(corpus)),
+                "dim": pca_dim(vectors.shape[1], len(corpus), pca) or vectors.shape[1],
+                "build_ms": round(build_ms, 1),
+                "index_mb": round(nbytes / 2**20, 2),
+                "mem_saved": f"{1 - nbytes / baseline_bytes:.1%}",
+                f"recall@{k}": round(float(np.mean(recalls)), 4),
+                f"rerank@{k}": round(float(np.mean(reranked)), 4) if reranked else "-",
+                "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+                "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+            }
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FAISS 인덱스 타입별 recall@k / 지연 벤치마크")
+    parser.add_argument("--types", default=",".join(INDEX_TYPES), help="비교할 인덱스 타입 (쉼표 구분)")
+    parser.add_argument("--k", type=int, default=config.TOP_K)
+    parser.add_argument("--queries", type=int, default=200, help="질문 개수 상한")
+    parser.add_argument("--synthetic", type=int, default=0, help="N개 인위적 벡터로 벤치마크")
+    parser.add_argument("--dim", type=int, default=1536, help="--synthetic 벡터 차원")
+    parser.add_argument("--dims", type=int, default=0, help="임베딩 앞쪽 N차원만 사용 (API `dimensions`와 동일 효과)")
+    parser.add_argument("--pca", type=int, default=0, help="PCA 출력 차원 (0 = 사용 안 함)")
+    parser.add_argument(
+        "--rerank-mult",
+        type=int,
+        default=getattr(config, "RERANK_CANDIDATES_MULT", 4),
+        help="재정렬 후보 수 = k × 이 값",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    load_dotenv()
+    index_types = [t.strip() for t in args.types.split(",") if t.strip()]
+
+    if args.synthetic:
+        corpus, queries = make_synthetic(args.synthetic, args.queries, args.dim, args.seed)
+        source = f"synthetic n={args.synthetic} dim={args.dim}"
+    else:
+        corpus, queries = load_kb_vectors(args.queries)
+        source = f"kb n={len(corpus)} dim={corpus.shape[1]}"
+
+    print(f"[bench] {source}, queries={len(queries)}, k={args.k}, dims={args.dims or 'full'}, pca={args.pca or '-'}")
+    rows = bench(corpus, queries, index_types, args.k, dims=args.dims, pca=args.pca, rerank_mult=args.rerank_mult)
+
+    headers = list(rows[0].keys())
+    print(" | ".join(headers))
+    for r in rows:
+        print(" | ".join(str(r[h]) for h in headers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+검색 품질/비용 벤치마크: 청크 크기 × overlap × 인덱스 타입 × 검색기 × top_k 조합별로
+recall@k, MRR, 프롬프트 토큰 수, 검색 지연(p50/p99)을 비교.
+
+정답 라벨은 청크 ID가 아니라 원문 구간(source 파일 + 근거 문장)이라 청크 기준이 바뀌어도 그대로 쓴다.
+검색된 청크의 원문 offset이 근거 문장과 겹치면 정답으로 본다.
+  {"question": "...", "relevant": [{"source": "policy_notes.txt", "text": "근거 문장"}]}
+
+임베딩은 config.EMBED_CACHE_PATH 캐시를 공유하므로 같은 청크/질문은 조합이 바뀌어도 다시 임베딩하지 않는다
+(EMBED_CACHE_PATH = None이면 캐시 없이 매번 임베딩).
+기본 임베딩 백엔드는 hashing (네트워크/API 키 불필요).
+
+사용 예:
+  python benchmark_rag.py
+  python benchmark_rag.py --chunk-sizes 100,200,400 --top-ks 2,4,8 --backend sentence_transformers
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+from itertools import product
+
+import numpy as np
+
+import config
+from embed_cache import EmbeddingCache
+from embedding_backends import get_embedding_backend
+from prompt_builder import build_prompt
+from rag_engine import RAGEngine
+
+
+def _csv(value: str, cast=str) -> list:
+    return [cast(v.strip()) for v in value.split(",") if v.strip()]
+
+
+def load_questions(path: str, kb_files: list[str]) -> list[dict]:
+    """질문 + 정답 구간 [(source 파일명, start, end), ...]. 근거 문장이 원문에 없으면 에러."""
+    texts = {}
+    for p in kb_files:
+        with open(p, "r", encoding="utf-8") as f:
+            texts[os.path.basename(p)] = f.read()
+
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            q = json.loads(line)
+            spans = []
+            for rel in q["relevant"]:
+                source = os.path.basename(rel["source"])
+                start = texts.get(source, "").find(rel["text"])
+                if start < 0:
+                    raise ValueError(f"{path}:{line_no} 근거 문장을 {source}에서 찾지 못함: {rel['text'][:30]}")
+                spans.append((source, start, start + len(rel["text"])))
+            questions.append({"question": q["question"], "relevant": spans})
+    return questions
+
+
+def _matches(row: dict, span: tuple) -> bool:
+    source, start, end = span
+    return (
+        os.path.basename(row["source"] or "") == source
+        and row["start"] is not None
+        and row["start"] < end
+        and start < row["end"]
+    )
+
+
+def score_query(rows: list[dict], relevant: list[tuple]) -> tuple[float, float]:
+    """(recall@k: 정답 구간 중 top-k 청크가 덮은 비율, reciprocal rank: 첫 정답 청크 순위의 역수)"""
+    covered = sum(any(_matches(r, span) for r in rows) for span in relevant)
+    rr = 0.0
+    for rank, r in enumerate(rows, 1):
+        if any(_matches(r, span) for span in relevant):
+            rr = 1.0 / rank
+            break
+    return covered / len(relevant), rr
+
+
+def bench_engine(rag: RAGEngine, questions: list[dict], retriever: str, k: int, stats) -> dict:
+    # 첫 검색은 캐시/지연 초기화가 섞이므로 한 번 버림
+    rag.retrieve_hits(questions[0]["question"], k=k, mode=retriever)
+
+    recalls, rrs, prompt_tokens, latencies = [], [], [], []
+    for q in questions:
+        t0 = time.perf_counter()
+        hits = rag.retrieve_hits(q["question"], k=k, mode=retriever)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+        offsets = rag.store.get_many([h["id"] for h in hits])
+        rows = [offsets[h["id"]] for h in hits if h["id"] in offsets]
+        recall, rr = score_query(rows, q["relevant"])
+        recalls.append(recall)
+        rrs.append(rr)
+        prompt_tokens.append(build_prompt(q["question"], stats, hits)[1]["prompt_tokens"])
+
+    return {
+        "recall@k": round(float(np.mean(recalls)), 4),
+        "mrr": round(float(np.mean(rrs)), 4),
+        "prompt_tokens": round(float(np.mean(prompt_tokens)), 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+    }
+
+
+def warn_small_corpus(rows: list[dict]):
+    """
+    청크 수가 k × IVF_NLIST보다 작은 조합이 있으면 경고.
+    이 규모에서는 IVF 클러스터 수가 자동으로 줄고 재정렬 후보가 코퍼스 대부분을 덮어서
+    sq8/pq/ivf/ivfpq 결과가 flat과 거의 같게 나온다 (인덱스 타입 비교가 의미 없음).
+    """
+    nlist = getattr(config, "IVF_NLIST", 256)
+    small = [r for r in rows if r["index_type"] not in ("flat", "hnsw", "-") and r["n_chunks"] < r["k"] * nlist]
+    if not small:
+        return
+    n_min = min(r["n_chunks"] for r in small)
+    n_max = max(r["n_chunks"] for r in small)
+    k_min = min(r["k"] for r in small)
+    print(
+        f"[bench] 경고: 청크 수({n_min}~{n_max}개)가 k × IVF_NLIST(최소 {k_min} × {nlist} = {k_min * nlist})보다 작은 조합이 있음. "
+        f"이 규모에서는 양자화/IVF 인덱스가 flat과 거의 같게 나오므로 인덱스 타입 비교는 더 큰 KB로 할 것"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG 검색 파라미터 스윕 벤치마크")
+    parser.add_argument("--questions", default="data/eval/questions.jsonl")
+    parser.add_argument("--kb-dir", default="data/kb")
+    parser.add_argument("--chunk-sizes", default="32,64,200", help="청크 크기(토큰) 목록")
+    parser.add_argument("--overlaps", default="0,16", help="청크 overlap(토큰) 목록")
+    parser.add_argument("--top-ks", default="1,2,4")
+    parser.add_argument("--index-types", default="flat,hnsw")
+    parser.add_argument("--retrievers", default="dense,lexical,hybrid")
+    parser.add_argument("--backend", default="hashing", help="임베딩 백엔드 (hashing / sentence_transformers / openai)")
+    parser.add_argument("--dataset", default="data/raw/accidents_sample.csv", help="프롬프트 토큰 계산용 stats 데이터")
+    parser.add_argument("--out", default=None, help="결과를 jsonl로 저장할 경로")
+    args = parser.parse_args()
+
+    kb_files = sorted(os.path.join(args.kb_dir, f) for f in os.listdir(args.kb_dir) if f.endswith(".txt"))
+    questions = load_questions(args.questions, kb_files)
+
+    stats = {}
+    if args.dataset and os.path.exists(args.dataset):
+        from preprocess import load_accidents_csv, basic_summary
+
+        stats = basic_summary(load_accidents_csv(args.dataset))
+
+    # 모든 조합이 같은 임베딩 백엔드/캐시를 공유
+    embedder = get_embedding_backend(args.backend.replace("-", "_"))
+    embed_cache = None
+    if getattr(config, "EMBED_CACHE_PATH", None):
+        embed_cache = EmbeddingCache(config.EMBED_CACHE_PATH, max_entries=config.EMBED_CACHE_MAX_ENTRIES)
+    print(f"[bench] {len(questions)} questions, {len(kb_files)} kb files, backend={embedder.backend_id}")
+
+    rows = []
+    hits_before = embed_cache.hits if embed_cache else 0
+    misses_before = embed_cache.misses if embed_cache else 0
+    for chunk_size, overlap, index_type in product(
+        _csv(args.chunk_sizes, int), _csv(args.overlaps, int), _csv(args.index_types)
+    ):
+        if overlap >= chunk_size:
+            continue
+        with tempfile.TemporaryDirectory() as tmp:
+            rag = RAGEngine(
+                index_path=os.path.join(tmp, "faiss.index"),
+                meta_path=os.path.join(tmp, "meta.json"),
+                manifest_path=os.path.join(tmp, "manifest.json"),
+                info_path=os.path.join(tmp, "index_info.json"),
+                store_path=os.path.join(tmp, "chunks.sqlite"),
+                embed_cache=embed_cache,
+                embedder=embedder,
+                index_type=index_type,
+                chunk_size=chunk_size,
+                chunk_overlap=overlap,
+            )
+            t0 = time.perf_counter()
+            rag.build_from_text_files(kb_files)
+            build_ms = (time.perf_counter() - t0) * 1000
+
+            for retriever, k in product(_csv(args.retrievers), _csv(args.top_ks, int)):
+                # lexical 검색은 벡터 인덱스와 무관 → 첫 인덱스 타입에서만 측정
+                if retriever == "lexical" and index_type != _csv(args.index_types)[0]:
+                    continue
+                row = {
+                    "chunk_size": chunk_size,
+                    "overlap": overlap,
+                    "index_type": index_type if retriever != "lexical" else "-",
+                    "retriever": retriever,
+                    "k": k,
+                    "n_chunks": len(rag.store),
+                    "build_ms": round(build_ms, 1),
+                    **bench_engine(rag, questions, retriever, k, stats),
+                }
+                rows.append(row)
+            rag.store.close()
+
+    headers = list(rows[0].keys())
+    print(" | ".join(headers))
+    for r in sorted(rows, key=lambda r: (-r["recall@k"], -r["mrr"], r["prompt_tokens"])):
+        print(" | ".join(str(r[h]) for h in headers))
+    warn_small_corpus(rows)
+    if embed_cache is not None:
+        print(
+            f"[bench] embed cache hits during sweep: {embed_cache.hits - hits_before}, "
+            f"misses: {embed_cache.misses - misses_before}"
+        )
+
+    if args.out:
+        out_dir = os.path.dirname(args.out)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            for r in rows:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import os
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+from typing import Iterator, List
+
+import numpy as np
+
+from lexical import char_ngrams
+
+
+_SQL_BATCH = 500
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ChunkStore:
+    """
+    청크 텍스트/출처/offset과 BM25용 n-gram 역색인을 담는 SQLite 저장소. (meta.json 대체)
+    - 청크의 원본 float32 임베딩(L2 정규화)도 함께 보관 → 양자화 인덱스 검색 후보를 정확한 점수로 재정렬
+    - 검색 시에는 필요한 청크 ID 몇 개만 조회하므로 로드 시간/메모리가 KB 크기와 무관
+    - ingest의 추가/삭제는 하나의 트랜잭션으로 묶이고 commit() 시점에 한 번에 반영
+      (WAL 모드라 읽는 쪽은 commit 전까지 이전 상태를 그대로 봄)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        store_dir = os.path.dirname(path)
+        if store_dir:
+            os.makedirs(store_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY,
+                chunk TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                source TEXT,
+                start INTEGER,
+                end INTEGER,
+                n_terms INTEGER NOT NULL DEFAULT 0,
+                vec BLOB
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_hash ON chunks(hash);
+
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_postings_id ON postings(id);
+
+            CREATE TABLE IF NOT EXISTS stats (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            """
+        )
+        # vec 컬럼이 생기기 전에 만든 저장소
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(chunks)")}
+        if "vec" not in columns:
+            self._conn.execute("ALTER TABLE chunks ADD COLUMN vec BLOB")
+        self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # 쓰기 (commit() 전까지 다른 연결에는 보이지 않음)
+    # ------------------------------------------------------------------
+    def add_many(self, entries: List[dict], vectors: np.ndarray | None = None):
+        """
+        entries: [{"id", "chunk", "source", "start", "end"}, ...] 청크와 n-gram 역색인을 함께 추가.
+        vectors를 넘기면 entries와 같은 순서의 임베딩을 float32로 저장.
+        """
+        with self._lock:
+            total_terms = 0
+            for row, e in enumerate(entries):
+                tf = Counter(char_ngrams(e["chunk"]))
+                n_terms = sum(tf.values())
+                total_terms += n_terms
+                self._conn.execute(
+                    "INSERT INTO chunks (id, chunk, hash, source, start, end, n_terms, vec) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        e["id"],
+                        e["chunk"],
+                        _text_hash(e["chunk"]),
+                        e.get("source"),
+                        e.get("start"),
+                        e.get("end"),
+                        n_terms,
+                        np.asarray(vectors[row], dtype="float32").tobytes() if vectors is not None else None,
+                    ),
+                )
+                self._conn.executemany(
+                    "INSERT INTO postings (term, id, tf) VALUES (?, ?, ?)",
+                    [(term, e["id"], cnt) for term, cnt in tf.items()],
+                )
+            self._bump_stat("total_terms", total_terms)
+            self._bump_stat("n_docs", len(entries))
+
+    def delete_many(self, ids: List[int]):
+        with self._lock:
+            for i in range(0, len(ids), _SQL_BATCH):
+                batch = list(ids[i : i + _SQL_BATCH])
+                placeholders = ",".join("?" * len(batch))
+                (removed_terms,) = self._conn.execute(
+                    f"SELECT COALESCE(SUM(n_terms), 0) FROM chunks WHERE id IN ({placeholders})", batch
+                ).fetchone()
+                cur = self._conn.execute(f"DELETE FROM chunks WHERE id IN ({placeholders})", batch)
+                self._conn.execute(f"DELETE FROM postings WHERE id IN ({placeholders})", batch)
+                self._bump_stat("total_terms", -removed_terms)
+                self._bump_stat("n_docs", -cur.rowcount)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM stats")
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    def rollback(self):
+        with self._lock:
+            self._conn.rollback()
+
+    def _bump_stat(self, name: str, delta: int):
+        self._conn.execute(
+            "INSERT INTO stats (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, int(delta)),
+        )
+
+    # ------------------------------------------------------------------
+    # 읽기
+    # ------------------------------------------------------------------
+    def get_many(self, ids: List[int]) -> dict[int, dict]:
+        """청크 ID → {"id", "chunk", "source", "start", "end"}. 없는 ID는 결과에서 빠짐."""
+        out: dict[int, dict] = {}
+        with self._lock:
+            for i in range(0, len(ids), _SQL_BATCH):
+                batch = list(ids[i : i + _SQL_BATCH])
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT id, chunk, source, start, end FROM chunks WHERE id IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for cid, chunk, source, start, end in rows:
+                    out[cid] = {"id": cid, "chunk": chunk, "source": source, "start": start, "end": end}
+        return out
+
+    def get_vectors(self, ids: List[int]) -> dict[int, np.ndarray]:
+        """청크 ID → 저장된 원본 임베딩. 벡터 없이 저장된 청크(예전 저장소)는 결과에서 빠짐."""
+        out: dict[int, np.ndarray] = {}
+        with self._lock:
+            for i in range(0, len(ids), _SQL_BATCH):
+                batch = list(ids[i : i + _SQL_BATCH])
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT id, vec FROM chunks WHERE id IN ({placeholders}) AND vec IS NOT NULL",
+                    batch,
+                ).fetchall()
+                for cid, blob in rows:
+                    out[cid] = np.frombuffer(blob, dtype="float32")
+        return out
+
+    def find_ids(self, texts: List[str]) -> dict[str, int]:
+        """이미 저장된 청크 텍스트 → ID (중복 제거용)."""
+        by_hash = {_text_hash(t): t for t in texts}
+        found: dict[str, int] = {}
+        with self._lock:
+            hashes = list(by_hash)
+            for i in range(0, len(hashes), _SQL_BATCH):
+                batch = hashes[i : i + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, id, chunk FROM chunks WHERE hash IN ({placeholders})", batch
+                ).fetchall()
+                for h, cid, chunk in rows:
+                    if chunk == by_hash[h]:
+                        found[chunk] = cid
+        return found
+
+    def iter_chunks(self, batch_size: int = 1000) -> Iterator[tuple[int, str]]:
+        """(ID, 청크 텍스트)를 ID 순으로 batch_size씩 읽어서 순회 (인덱스 재구축/벤치마크용)."""
+        last_id = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, chunk FROM chunks WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1][0]
+
+    def postings(self, terms: List[str]) -> dict[str, dict[int, int]]:
+        """term → {청크 ID: tf}. 쿼리에 나온 term의 posting만 읽는다."""
+        out: dict[str, dict[int, int]] = {}
+        with self._lock:
+            for i in range(0, len(terms), _SQL_BATCH):
+                batch = list(terms[i : i + _SQL_BATCH])
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT term, id, tf FROM postings WHERE term IN ({placeholders})", batch
+                ).fetchall()
+                for term, cid, tf in rows:
+                    out.setdefault(term, {})[cid] = tf
+        return out
+
+    def doc_lengths(self, ids: List[int]) -> dict[int, int]:
+        out: dict[int, int] = {}
+        with self._lock:
+            for i in range(0, len(ids), _SQL_BATCH):
+                batch = list(ids[i : i + _SQL_BATCH])
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT id, n_terms FROM chunks WHERE id IN ({placeholders})", batch
+                ).fetchall()
+                out.update(rows)
+        return out
+
+    def max_id(self) -> int:
+        """가장 큰 청크 ID (비어 있으면 -1)."""
+        with self._lock:
+            (value,) = self._conn.execute("SELECT COALESCE(MAX(id), -1) FROM chunks").fetchone()
+        return int(value)
+
+    def _stat(self, name: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM stats WHERE name = ?", (name,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def total_terms(self) -> int:
+        return self._stat("total_terms")
+
+    def __len__(self) -> int:
+        # COUNT(*)는 전체 스캔이라 add/delete 때 갱신하는 카운터를 사용
+        return self._stat("n_docs")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,129 @@
+import re
+from typing import List
+
+import config  # CHUNK_SIZE, CHUNK_OVERLAP
+from tokens import count_tokens
+
+
+# 글머리표 줄: "- ", "* ", "• ", "· ", "1. ", "1) ", "①"
+_BULLET_RE = re.compile(r"^\s*(?:[-*•·▪]\s+|\d+[.)]\s+|[①-⑳])")
+# 문장 끝: 마침표/물음표/느낌표 뒤 공백 (한국어 "~다." 포함)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?。])\s+")
+
+
+def _split_units(text: str) -> List[tuple[int, int, bool]]:
+    """
+    텍스트를 문단 → 줄(글머리표) → 문장 단위로 나눠 (start, end, 문단 시작 여부) 목록으로 반환.
+    offset은 원문 기준이라 청크 텍스트를 원문 그대로 잘라낼 수 있다.
+    """
+    units: List[tuple[int, int, bool]] = []
+    for para in re.finditer(r"\S(?:.*?\S)?(?=\n\s*\n|\s*\Z)", text, flags=re.S):
+        first_in_para = True
+        pos = para.start()
+        for line in para.group().split("\n"):
+            line_start = pos
+            pos += len(line) + 1
+            if not line.strip():
+                continue
+
+            # 글머리표 줄은 한 항목을 통째로 하나의 단위로 취급
+            if _BULLET_RE.match(line):
+                spans = [(0, len(line))]
+            else:
+                spans = []
+                last = 0
+                for m in _SENTENCE_END_RE.finditer(line):
+                    spans.append((last, m.start()))
+                    last = m.end()
+                spans.append((last, len(line)))
+
+            for s, e in spans:
+                seg = line[s:e]
+                if not seg.strip():
+                    continue
+                lead = len(seg) - len(seg.lstrip())
+                trail = len(seg) - len(seg.rstrip())
+                units.append((line_start + s + lead, line_start + e - trail, first_in_para))
+                first_in_para = False
+    return units
+
+
+def _hard_split(text: str, start: int, end: int, max_tokens: int) -> List[tuple[int, int]]:
+    """한 문장이 max_tokens보다 길면 공백 기준(없으면 글자 기준)으로 다시 자른다."""
+    pieces: List[tuple[int, int]] = []
+    s = start
+    while s < end:
+        if count_tokens(text[s:end]) <= max_tokens:
+            pieces.append((s, end))
+            break
+
+        # 예산 안에 들어오는 가장 긴 구간을 이분 탐색한 뒤, 가능하면 마지막 공백에서 자름
+        lo, hi = s + 1, end
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if count_tokens(text[s:mid]) <= max_tokens:
+                lo = mid
+            else:
+                hi = mid - 1
+        e = lo
+        cut = text.rfind(" ", s + 1, e)
+        if cut > s:
+            e = cut
+
+        pieces.append((s, e))
+        s = e
+        while s < end and text[s].isspace():
+            s += 1
+    return pieces
+
+
+def chunk_text(
+    text: str,
+    chunk_size: int | None = None,
+    overlap: int | None = None,
+) -> List[dict]:
+    """
+    문단/문장/글머리표 경계를 지키면서 토큰 기준 chunk_size 이하로 묶은 청크 목록.
+    이웃 청크는 끝부분 문장을 overlap 토큰 이내로 공유한다.
+    반환: [{"chunk": 텍스트, "start": 원문 시작 offset, "end": 원문 끝 offset}, ...]
+    """
+    chunk_size = chunk_size or getattr(config, "CHUNK_SIZE", 200)
+    overlap = getattr(config, "CHUNK_OVERLAP", 0) if overlap is None else overlap
+
+    text = text.replace("\r\n", "\n")
+    units: List[tuple[int, int, int, bool]] = []  # (start, end, tokens, 문단 시작)
+    for s, e, para_start in _split_units(text):
+        for i, (hs, he) in enumerate(_hard_split(text, s, e, chunk_size)):
+            units.append((hs, he, count_tokens(text[hs:he]), para_start and i == 0))
+
+    chunks: List[dict] = []
+    current: List[tuple[int, int, int, bool]] = []
+    current_tokens = 0
+
+    def flush():
+        start, end = current[0][0], current[-1][1]
+        chunks.append({"chunk": text[start:end], "start": start, "end": end})
+
+    for unit in units:
+        tokens = unit[2]
+        # 예산 초과(단위 사이 공백/줄바꿈 토큰까지 포함해 원문 구간으로 셈),
+        # 또는 새 문단이 시작되는데 현재 청크가 이미 절반 이상 찼으면 끊는다
+        full = bool(current) and count_tokens(text[current[0][0] : unit[1]]) > chunk_size
+        para_break = unit[3] and current_tokens >= chunk_size // 2
+        if current and (full or para_break):
+            flush()
+            # overlap: 직전 청크의 마지막 단위들을 overlap 토큰 이내에서 다음 청크 앞에 붙임
+            # (직전 청크 전체가 다시 들어가지 않도록 첫 단위는 제외)
+            carry: List[tuple[int, int, int, bool]] = []
+            end = current[-1][1]
+            for prev in reversed(current[1:]):
+                if count_tokens(text[prev[0] : end]) > overlap or count_tokens(text[prev[0] : unit[1]]) > chunk_size:
+                    break
+                carry.insert(0, prev)
+            current, current_tokens = carry, sum(u[2] for u in carry)
+        current.append(unit)
+        current_tokens += tokens
+
+    if current:
+        flush()
+    return chunks
@@ -1,20 +1,103 @@
 # config.py
 
 # ===== LLM / Embedding 설정 =====
+# 임베딩 백엔드: "openai" | "sentence_transformers"(로컬 CPU) | "hashing"(문자 n-gram, 오프라인)
+# 바꾸면 기존 인덱스와 벡터가 호환되지 않으므로 `python ingest.py --rebuild` 필요
+EMBEDDING_BACKEND = "openai"
 EMBEDDING_MODEL = "text-embedding-3-small"  # 속도/비용/성능 밸런스용
+EMBEDDING_DIMENSIONS = None                 # 예: 512 → API가 1536차원 대신 짧은 벡터 반환 (인덱스 메모리 1/3)
+LOCAL_EMBEDDING_MODEL = "jhgan/ko-sroberta-multitask"  # sentence_transformers 백엔드용
+HASHING_EMBEDDING_DIM = 1024        # hashing 백엔드 벡터 차원
+HASHING_NGRAM_RANGE = (2, 3)        # hashing 백엔드 문자 n-gram 범위
 CHAT_MODEL = "gpt-4o-mini"                 # 정책/설명 쓰기 좋은 가벼운 모델
 TEMPERATURE = 0.4                          # 일관성 ↑, 랜덤성 ↓
 
 # ===== RAG 설정 =====
-CHUNK_SIZE = 200            # 한 컨셉이 잘리는 최소 단위
+CHUNK_SIZE = 200            # 청크 최대 토큰 수 (문단/문장/글머리표 경계 기준으로 묶음)
+CHUNK_OVERLAP = 30          # 이웃 청크가 공유하는 끝부분 문장의 최대 토큰 수
 TOP_K = 4                   # 너무 많으면 노이즈, 너무 적으면 정보 부족
 
-# ===== 입력/출력 길이 의도 (설계 기준) =====
-# 실제 max_tokens는 OpenAI API 호출 시 사용 가능
-MAX_INPUT_TOKENS = 2048     # 질문 + stats + 컨텍스트가 들어가는 목표 범위
-MAX_OUTPUT_TOKENS = 400     # 요약 + 위험요인 + 대응전략 정도 분량
+# ===== 검색기 =====
+# "dense"(임베딩) | "lexical"(문자 n-gram BM25, 오프라인 가능) | "hybrid"(두 결과 RRF 결합)
+# 지명("청원구", "오창읍")처럼 정확한 키워드는 lexical이 잘 잡아줌 → 필요하면 "hybrid"로 바꿔서 사용
+RETRIEVER = "dense"
+LEXICAL_NGRAM_RANGE = (2, 3)    # 한국어 어절 내부 문자 2~3-gram
+BM25_K1 = 1.5
+BM25_B = 0.75
+HYBRID_CANDIDATES_MULT = 3      # hybrid에서 각 검색기가 뽑는 후보 수 = k × 이 값
+RRF_K = 60                      # RRF 상수 (클수록 하위 순위 영향↑)
+
+# ===== 벡터 인덱스 =====
+# "flat"(전수 탐색) | "hnsw" | "ivf" | "ivfpq" | "sq8"(8비트 스칼라 양자화) | "pq"(곱 양자화)
+# 바꾸면 다음 ingest 때 전체 재구축. 타입별 recall/지연/메모리 비교: `python bench_index.py`
+INDEX_TYPE = "flat"
+INDEX_PCA_DIM = 0           # >0이면 PCA로 이 차원까지 줄여서 인덱싱 (0 = 사용 안 함)
+# 양자화/PCA 인덱스는 k × 이 값만큼 후보를 뽑아 chunks.sqlite의 원본 벡터로 정확히 재정렬
+EXACT_RERANK = True
+RERANK_CANDIDATES_MULT = 4
+HNSW_M = 32                 # HNSW 노드당 연결 수 (클수록 recall↑, 메모리↑)
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64         # 검색 시 탐색 폭 (클수록 recall↑, 지연↑)
+IVF_NLIST = 256             # IVF 클러스터 수 (학습 벡터가 적으면 자동으로 줄어듦)
+IVF_NPROBE = 16             # 검색 시 살펴볼 클러스터 수
+PQ_M = 16                   # ivfpq / pq 서브벡터 개수 (차원의 약수로 자동 조정)
+PQ_NBITS = 8                # 서브벡터당 코드 비트 수
+PQ_STANDALONE_M = 64        # pq(IVF 없이) 서브벡터 개수. 후보가 정답을 담고 있어야 재정렬이 의미 있으므로 더 촘촘하게
+
+# ===== 입력/출력 길이 제한 =====
+# 프롬프트가 넘으면 stats 필드 → 점수 낮은 컨텍스트 순으로 줄임 (prompt_builder.py)
+MAX_INPUT_TOKENS = 2048     # 질문 + stats + 컨텍스트가 들어가는 상한
+MAX_OUTPUT_TOKENS = 400     # API max_tokens (요약 + 위험요인 + 대응전략 정도 분량)
+CONTEXT_DEDUPE_JACCARD = 0.8  # 문자 n-gram 유사도가 이 이상인 컨텍스트 청크는 하나만 사용
+
+# ===== 동시 실행 =====
+ENGINE_WORKERS = 4          # retrieve_async / answer_async 스레드 풀 크기 (프로세스 공유)
+
+# ===== 배치 질의응답 (batch_qa.py) =====
+BATCH_WORKERS = 4           # 요약/검색/답변 동시 실행 수
+BATCH_MAX_RETRIES = 5       # rate limit(429)/일시 오류 재시도 횟수
+BATCH_BACKOFF_BASE_SEC = 1.0  # 지수 백오프 시작 값 (full jitter)
+BATCH_BACKOFF_MAX_SEC = 30.0  # 백오프 상한
+
+# ===== 임베딩 캐시 =====
+# (임베딩 모델, 텍스트 해시) 기준 디스크 캐시. None이면 캐시 사용 안 함
+EMBED_CACHE_PATH = "storage/embed_cache.sqlite"
+EMBED_CACHE_MAX_ENTRIES = 100_000   # 초과 시 오래 안 쓴 벡터부터 삭제
+EMBED_BATCH_SIZE = 256              # 임베딩 백엔드 1회 호출당 최대 텍스트 수
+
+# ===== 업로드 파싱 캐시 =====
+# 업로드 파일 내용 해시 기준으로 정규화된 DataFrame을 Parquet으로 저장 (pyarrow 필요). None이면 사용 안 함
+UPLOAD_CACHE_DIR = "storage/upload_cache"
+UPLOAD_CACHE_MAX_FILES = 20         # 초과 시 오래된 캐시 파일부터 삭제
+# 이보다 큰 업로드는 DataFrame 전체를 만들지 않고 청크 단위로 읽으며 요약만 계산 (stream_summary)
+STREAMING_SUMMARY_MIN_BYTES = 200 * 1024 * 1024
+SUMMARY_CHUNK_ROWS = 200_000        # 스트리밍 요약 시 한 번에 읽을 행 수
+
+# ===== 답변 캐시 =====
+# (모델, stats 지문, 검색된 청크) 버킷 안에서 질문 임베딩이 비슷하면 이전 답변 재사용. None이면 사용 안 함
+ANSWER_CACHE_PATH = "storage/answer_cache.sqlite"
+ANSWER_CACHE_MAX_ENTRIES = 5000     # 초과 시 오래 안 쓴 답변부터 삭제
+ANSWER_CACHE_TTL_SEC = 24 * 3600    # 이보다 오래된 답변은 사용하지 않음
+ANSWER_CACHE_SIMILARITY = 0.95      # 질문 임베딩 cosine 유사도 기준
+
+# ===== 지연 시간 로그 =====
+LATENCY_LOG_PATH = "logs/latency_log.jsonl"
+LATENCY_LOG_MAX_BYTES = 5 * 1024 * 1024   # 넘으면 latency_log.jsonl.1 로 회전
+LATENCY_LOG_BACKUPS = 3                   # 보관할 회전 파일 개수
+
+# ===== 지식 베이스(KB) 샤드 =====
+# 이름 → .txt 문서 폴더. 비어 있으면 data/kb 전체를 아래 INDEX_PATH 단일 인덱스로 사용 (기존 방식)
+# 샤드마다 KB_STORAGE_DIR/<이름>/에 인덱스를 따로 만들고 따로 갱신 (`python ingest.py --kb 이름`)
+# 예: {"policy": "data/kb/policy", "regulations": "data/kb/regulations", "reports": "data/kb/reports"}
+KNOWLEDGE_BASES = {}
+KB_STORAGE_DIR = "storage/kb"
+KB_SEARCH_WORKERS = 4       # 샤드 동시 검색 스레드 수
+KB_CANDIDATES_MULT = 2      # lexical/hybrid 점수 정규화용으로 샤드마다 k × 이 값 후보를 뽑음
 
 # ===== 파일 경로 =====
 INDEX_PATH = "storage/faiss.index"
-META_PATH = "storage/meta.json"
+CHUNK_STORE_PATH = "storage/chunks.sqlite"  # 청크 텍스트/출처 + BM25 역색인
+META_PATH = "storage/meta.json"             # 예전 형식. chunks.sqlite가 없으면 로드 시 이전
+MANIFEST_PATH = "storage/manifest.json"   # 증분 ingest용: 파일별 해시 + 청크 ID
+INDEX_INFO_PATH = "storage/index_info.json"  # ingest마다 마지막에 갱신되는 버전 스탬프
 POLICY_NOTES_PATH = "data/kb/policy_notes.txt"
@@ -0,0 +1,143 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+
+# SQLite의 IN (...) 바인딩 변수 개수 제한(구버전 999)을 넘지 않도록 나눠서 조회
+_SQL_BATCH = 500
+
+
+def _text_key(model: str, text: str) -> str:
+    """(임베딩 모델, 텍스트) 쌍을 sha256 해시 키로 변환."""
+    h = hashlib.sha256()
+    h.update(model.encode("utf-8"))
+    h.update(b"\x00")
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    (임베딩 모델, 텍스트 해시) → 임베딩 벡터를 저장하는 디스크 캐시 (SQLite).
+    - get_many / put_many 로 여러 텍스트를 한 번에 조회·저장
+    - max_entries를 넘으면 가장 오래 사용되지 않은 벡터부터 삭제 (LRU)
+    """
+
+    def __init__(self, path: str, max_entries: int = 100_000):
+        self.path = path
+        self.max_entries = max_entries
+
+        cache_dir = os.path.dirname(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        # Streamlit 등 여러 스레드에서 같은 캐시를 쓰므로 lock으로 직렬화
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                dim INTEGER NOT NULL,
+                vec BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)"
+        )
+        self._conn.commit()
+
+        # 프로세스 내 누적 적중/미스 횟수
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        texts 순서대로 캐시된 벡터를 반환. 캐시에 없으면 해당 위치는 None.
+        조회된 항목은 last_used가 갱신된다.
+        """
+        keys = [_text_key(model, t) for t in texts]
+        found: dict[str, np.ndarray] = {}
+
+        with self._lock:
+            unique_keys = list(dict.fromkeys(keys))
+            for i in range(0, len(unique_keys), _SQL_BATCH):
+                batch = unique_keys[i : i + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vec FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype="float32")
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+
+        results: List[Optional[np.ndarray]] = []
+        for key in keys:
+            vec = found.get(key)
+            if vec is None:
+                self.misses += 1
+                results.append(None)
+            else:
+                self.hits += 1
+                # frombuffer 결과는 읽기 전용이므로 복사본을 반환 (normalize_L2가 제자리 수정)
+                results.append(vec.copy())
+        return results
+
+    def put_many(self, model: str, texts: List[str], vectors: np.ndarray):
+        """texts[i]의 임베딩으로 vectors[i]를 저장하고, 필요하면 오래된 항목을 정리."""
+        if len(texts) == 0:
+            return
+
+        vectors = np.asarray(vectors, dtype="float32")
+        now = time.time()
+        rows = [
+            (_text_key(model, t), int(v.shape[0]), v.tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vec, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """max_entries를 초과한 만큼 last_used가 오래된 순으로 삭제. (lock 안에서 호출)"""
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                """
+                DELETE FROM embeddings WHERE key IN (
+                    SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?
+                )
+                """,
+                (overflow,),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return int(count)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
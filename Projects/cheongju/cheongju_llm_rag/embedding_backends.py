@@ -0,0 +1,190 @@
+import os
+import zlib
+import threading
+from typing import List
+
+import numpy as np
+
+import config  # EMBEDDING_BACKEND, EMBEDDING_MODEL, LOCAL_EMBEDDING_MODEL, HASHING_*, EMBED_BATCH_SIZE
+from lexical import char_ngrams
+
+
+_client_lock = threading.Lock()
+_openai_client = None
+
+
+def get_openai_client():
+    """
+    프로세스 전체에서 공유하는 OpenAI 클라이언트. 처음 필요할 때 생성.
+    (로컬 임베딩 + 검색만 쓰는 경우 API 키 없이도 동작하도록 지연 생성)
+    OPENAI_BASE_URL 환경 변수를 지정하면 호환 서버(mock_openai_server.py 등)로 요청한다.
+    """
+    global _openai_client
+    if _openai_client is None:
+        with _client_lock:
+            if _openai_client is None:
+                from openai import OpenAI
+
+                _openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _openai_client
+
+
+class EmbeddingBackend:
+    """
+    임베딩 백엔드 공통 인터페이스.
+    - embed(texts): batch_size 단위로 나눠 _embed_batch 호출 → (len(texts), dim) float32
+    - backend_id: 캐시 키와 인덱스 메타데이터에 기록되는 식별자 (백엔드:모델)
+    - dim: 출력 벡터 차원 (API 호출 없이 알 수 없으면 None)
+    """
+
+    name = "base"
+    dim: int | None = None
+
+    def __init__(self, model: str, batch_size: int | None = None):
+        self.model = model
+        self.batch_size = batch_size or getattr(config, "EMBED_BATCH_SIZE", 256)
+
+    @property
+    def backend_id(self) -> str:
+        return f"{self.name}:{self.model}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        rows: list[np.ndarray] = []
+        for i in range(0, len(texts), self.batch_size):
+            rows.append(self._embed_batch(texts[i : i + self.batch_size]))
+        if not rows:
+            return np.zeros((0, 0), dtype="float32")
+        return np.vstack(rows).astype("float32", copy=False)
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """
+    OpenAI embeddings API (기본값, config.EMBEDDING_MODEL).
+    dimensions(config.EMBEDDING_DIMENSIONS)를 주면 API가 앞쪽 차원만 잘라 정규화한 짧은 벡터를 반환
+    (text-embedding-3 계열만 지원). 차원이 다르면 다른 벡터이므로 backend_id에도 포함.
+    """
+
+    name = "openai"
+
+    # 모델별 기본 출력 차원 (dimensions를 주지 않았을 때)
+    MODEL_DIMS = {
+        "text-embedding-3-small": 1536,
+        "text-embedding-3-large": 3072,
+        "text-embedding-ada-002": 1536,
+    }
+
+    def __init__(
+        self,
+        model: str | None = None,
+        batch_size: int | None = None,
+        client=None,
+        dimensions: int | None = None,
+    ):
+        super().__init__(model or config.EMBEDDING_MODEL, batch_size)
+        self._client = client
+        self.dimensions = dimensions if dimensions is not None else getattr(config, "EMBEDDING_DIMENSIONS", None)
+
+    @property
+    def backend_id(self) -> str:
+        if self.dimensions:
+            return f"{self.name}:{self.model}@{self.dimensions}"
+        return super().backend_id
+
+    @property
+    def dim(self) -> int | None:
+        return self.dimensions or self.MODEL_DIMS.get(self.model)
+
+    @property
+    def client(self):
+        return self._client or get_openai_client()
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        kwargs = {"dimensions": self.dimensions} if self.dimensions else {}
+        resp = self.client.embeddings.create(model=self.model, input=texts, **kwargs)
+        return np.array([d.embedding for d in resp.data], dtype="float32")
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """
+    로컬 CPU 임베딩 (sentence-transformers).
+    naver_news_sentiment 프로젝트에서 쓰는 jhgan/ko-sroberta-multitask가 기본값.
+    """
+
+    name = "sentence_transformers"
+
+    def __init__(self, model: str | None = None, batch_size: int | None = None):
+        super().__init__(model or config.LOCAL_EMBEDDING_MODEL, batch_size)
+        self._model = None
+
+    def _load_model(self):
+        if self._model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError as e:
+                raise ImportError(
+                    "sentence_transformers 백엔드를 쓰려면 `pip install sentence-transformers` 필요"
+                ) from e
+            self._model = SentenceTransformer(self.model, device="cpu")
+        return self._model
+
+    @property
+    def dim(self) -> int | None:
+        # 로컬 모델이라 로드해도 비용 없음 (검색 때 어차피 로드)
+        return self._load_model().get_sentence_embedding_dimension()
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        model = self._load_model()
+        return model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        ).astype("float32")
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    문자 n-gram 해싱 벡터라이저 (외부 의존성/네트워크 없음).
+    한국어는 띄어쓰기 단위 안에서 2~3글자 n-gram이 키워드를 잘 잡아주므로,
+    어절별 문자 n-gram을 crc32로 dim 차원에 부호 해싱한다. 오프라인 벤치마크/테스트용.
+    """
+
+    name = "hashing"
+
+    def __init__(
+        self,
+        dim: int | None = None,
+        ngram_range: tuple[int, int] | None = None,
+        batch_size: int | None = None,
+    ):
+        self.dim = dim or getattr(config, "HASHING_EMBEDDING_DIM", 1024)
+        self.ngram_range = tuple(ngram_range or getattr(config, "HASHING_NGRAM_RANGE", (2, 3)))
+        lo, hi = self.ngram_range
+        super().__init__(f"char{lo}-{hi}gram-{self.dim}", batch_size)
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for g in char_ngrams(text, self.ngram_range):
+                h = zlib.crc32(g.encode("utf-8"))
+                out[row, h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        return out
+
+
+def get_embedding_backend(name: str | None = None, client=None) -> EmbeddingBackend:
+    """config.EMBEDDING_BACKEND(또는 name)에 해당하는 임베딩 백엔드 생성."""
+    name = name or getattr(config, "EMBEDDING_BACKEND", "openai")
+    if name == "openai":
+        return OpenAIEmbeddingBackend(client=client)
+    if name == "sentence_transformers":
+        return SentenceTransformerBackend()
+    if name == "hashing":
+        return HashingEmbeddingBackend()
+    raise ValueError(f"알 수 없는 EMBEDDING_BACKEND: {name}")
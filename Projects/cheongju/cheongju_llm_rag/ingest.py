@@ -1,17 +1,66 @@
 import os
+import argparse
 from dotenv import load_dotenv
+
+import config  # KNOWLEDGE_BASES
+from kb_shards import kb_engine_kwargs, kb_files, kb_names
 from rag_engine import RAGEngine
 
+
+def ingest(rag: RAGEngine, files: list[str], rebuild: bool, label: str):
+    """파일 목록을 rag 인덱스에 반영 (rebuild면 전체 재구축, 아니면 바뀐 파일만)."""
+    if rebuild:
+        rag.build_from_text_files(files)
+        print(f"[OK] {label} 전체 인덱싱 완료: {len(files)}개 파일")
+        return
+
+    result = rag.update_from_text_files(files)
+    if result["rebuilt"]:
+        print(f"[OK] {label} 기존 manifest가 없어 전체 인덱싱: {len(files)}개 파일")
+        return
+
+    print(
+        f"[OK] {label} 증분 인덱싱 완료: 추가 {len(result['added'])}, 변경 {len(result['changed'])}, "
+        f"삭제 {len(result['deleted'])}, 유지 {len(result['unchanged'])}"
+    )
+
+
 def main():
+    parser = argparse.ArgumentParser(description="data/kb 지식 문서 인덱싱")
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="manifest를 무시하고 전체 인덱스를 새로 생성 (기본: 바뀐 파일만 증분 반영)",
+    )
+    parser.add_argument(
+        "--kb",
+        default=None,
+        help="인덱싱할 KB 이름 (쉼표 구분, 기본: config.KNOWLEDGE_BASES 전체). "
+        "KB마다 인덱스가 따로라 다른 KB 검색/갱신을 막지 않음",
+    )
+    args = parser.parse_args()
+
     load_dotenv()
-    kb_dir = "data/kb"
-    files = [os.path.join(kb_dir, f) for f in os.listdir(kb_dir) if f.endswith(".txt")]
-    if not files:
-        raise FileNotFoundError("data/kb 폴더에 .txt 지식 문서가 없음")
-
-    rag = RAGEngine()
-    rag.build_from_text_files(files)
-    print(f"[OK] 인덱싱 완료: {len(files)}개 파일")
+
+    if not kb_names():
+        if args.kb:
+            raise ValueError("config.KNOWLEDGE_BASES가 비어 있어 --kb를 쓸 수 없음")
+        kb_dir = "data/kb"
+        files = [os.path.join(kb_dir, f) for f in os.listdir(kb_dir) if f.endswith(".txt")]
+        if not files:
+            raise FileNotFoundError("data/kb 폴더에 .txt 지식 문서가 없음")
+        ingest(RAGEngine(), files, args.rebuild, "data/kb")
+        return
+
+    names = [n.strip() for n in args.kb.split(",") if n.strip()] if args.kb else kb_names()
+    for name in names:
+        kwargs = kb_engine_kwargs(name)  # 알 수 없는 이름이면 ValueError
+        files = kb_files(name)
+        if not files:
+            print(f"[SKIP] {name}: {config.KNOWLEDGE_BASES[name]} 폴더에 .txt 문서가 없음")
+            continue
+        ingest(RAGEngine(**kwargs), files, args.rebuild, f"[{name}]")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,256 @@
+"""
+이름 붙은 지식 베이스(KB) 샤드. config.KNOWLEDGE_BASES = {이름: 문서 폴더}
+- 샤드마다 KB_STORAGE_DIR/<이름>/ 아래에 인덱스/청크 저장소/manifest/버전 스탬프를 따로 둔다
+  → 큰 KB를 재구축하는 동안에도 다른 KB는 그대로 검색되고 따로 갱신된다 (`python ingest.py --kb 이름`)
+- 검색은 선택한 샤드를 동시에 조회한 뒤 샤드 간에 비교 가능한 점수로 하나의 top-k로 합친다
+  (dense: cosine 그대로, lexical: BM25 / 쿼리 최대 BM25, hybrid: 전체 샤드 기준 dense·lexical 순위로 RRF)
+- 임베딩 백엔드/임베딩·답변 캐시는 모든 샤드가 공유
+"""
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator, List
+
+import config  # KNOWLEDGE_BASES, KB_STORAGE_DIR, KB_SEARCH_WORKERS, KB_CANDIDATES_MULT
+from lexical import reciprocal_rank_fusion
+from rag_engine import RAGEngine, SharedRAGEngine, get_executor
+from tracing import Trace
+
+
+_fanout_lock = threading.Lock()
+_fanout_executor: ThreadPoolExecutor | None = None
+
+
+def _get_fanout_executor() -> ThreadPoolExecutor:
+    """
+    샤드별 검색 전용 스레드 풀.
+    retrieve_async가 엔진 풀(get_executor) 안에서 샤드 검색을 기다리므로 같은 풀을 쓰면
+    워커가 모두 대기에 묶일 수 있어 따로 둔다 (샤드 검색 작업은 다른 작업을 기다리지 않음).
+    """
+    global _fanout_executor
+    if _fanout_executor is None:
+        with _fanout_lock:
+            if _fanout_executor is None:
+                _fanout_executor = ThreadPoolExecutor(
+                    max_workers=getattr(config, "KB_SEARCH_WORKERS", 4),
+                    thread_name_prefix="kb",
+                )
+    return _fanout_executor
+
+
+def kb_names() -> List[str]:
+    return list(getattr(config, "KNOWLEDGE_BASES", None) or {})
+
+
+def kb_files(name: str) -> List[str]:
+    """KB 문서 폴더의 .txt 파일 목록."""
+    kb_dir = config.KNOWLEDGE_BASES[name]
+    return sorted(os.path.join(kb_dir, f) for f in os.listdir(kb_dir) if f.endswith(".txt"))
+
+
+def kb_engine_kwargs(name: str) -> dict:
+    """KB 샤드의 RAGEngine 파일 경로 인자."""
+    if name not in kb_names():
+        raise ValueError(f"알 수 없는 KB: {name} (config.KNOWLEDGE_BASES: {', '.join(kb_names()) or '없음'})")
+    root = os.path.join(getattr(config, "KB_STORAGE_DIR", "storage/kb"), name)
+    return {
+        "index_path": os.path.join(root, "faiss.index"),
+        "store_path": os.path.join(root, "chunks.sqlite"),
+        "meta_path": os.path.join(root, "meta.json"),
+        "manifest_path": os.path.join(root, "manifest.json"),
+        "info_path": os.path.join(root, "index_info.json"),
+    }
+
+
+def normalize_lexical(hits: List[dict], engine: RAGEngine, query: str) -> List[dict]:
+    """
+    BM25 점수를 샤드 간에 비교할 수 있는 [0, 1] 점수로 변환: score / (그 샤드에서 쿼리가 받을 수 있는 최대 BM25).
+    샤드 안에서 min-max를 하면 관련 없는 샤드의 1등도 1.0이 되므로, 쿼리 자체를 기준으로 나눈다.
+    (dense cosine은 모든 샤드가 같은 임베딩을 쓰므로 변환 없이 비교 가능)
+    """
+    if not hits:
+        return hits
+    top = engine.lexical.max_score(query)
+    return [{**h, "score": h["score"] / top if top > 0 else 0.0} for h in hits]
+
+
+def fuse_hybrid(dense_hits: List[dict], lexical_hits: List[dict], k: int) -> List[dict]:
+    """
+    모든 샤드의 dense 후보(cosine 순)와 lexical 후보(정규화 BM25 순)를 각각 하나의 순위로 만든 뒤 RRF.
+    샤드별 hybrid 점수(샤드 안 순위 기반)를 합치면 샤드마다 1등끼리 동점이 되므로 전체 순위로 다시 합친다.
+    """
+    by_key = {(h["kb"], h["id"]): h for h in dense_hits + lexical_hits}
+    ranked = [
+        [((h["kb"], h["id"]), h["score"]) for h in sorted(hits, key=lambda h: h["score"], reverse=True)]
+        for hits in (dense_hits, lexical_hits)
+    ]
+    fused = reciprocal_rank_fusion(ranked, rrf_k=getattr(config, "RRF_K", 60))[:k]
+    return [{**by_key[key], "score": score} for key, score in fused]
+
+
+class MultiKBEngine:
+    """
+    로드된 샤드 엔진 묶음. 검색은 여러 샤드에 나눠 보내고, 답변 생성은 RAGEngine과 같은 인터페이스.
+    (app.py / batch_qa.py에서 RAGEngine 대신 그대로 사용)
+    """
+
+    def __init__(self, engines: dict[str, RAGEngine], missing: List[str] | None = None):
+        if not engines:
+            raise FileNotFoundError("로드된 KB 인덱스가 없음. 먼저 `python ingest.py` 실행 필요")
+        self.engines = engines
+        self.missing = missing or []  # 아직 인덱스가 없는 KB
+        # 답변 생성/임베딩은 샤드와 무관 (백엔드/캐시 공유) → 아무 샤드 엔진에 위임
+        self._primary = next(iter(engines.values()))
+
+    @property
+    def embedder(self):
+        return self._primary.embedder
+
+    @property
+    def index_type(self) -> str:
+        return self._primary.index_type
+
+    @property
+    def chat_model(self) -> str:
+        return self._primary.chat_model
+
+    def retrieve(
+        self,
+        query: str,
+        k: int | None = None,
+        mode: str | None = None,
+        trace: Trace | None = None,
+    ) -> List[str]:
+        return [h["chunk"] for h in self.retrieve_hits(query, k=k, mode=mode, trace=trace)]
+
+    def retrieve_hits(
+        self,
+        query: str,
+        k: int | None = None,
+        mode: str | None = None,
+        trace: Trace | None = None,
+    ) -> List[dict]:
+        """
+        모든 샤드를 동시에 검색해서 정규화된 점수 순 상위 k개. [{"id", "chunk", "source", "score", "kb"}, ...]
+        청크 ID는 샤드마다 따로 매겨지므로 (kb, id)가 청크를 구분한다.
+        trace에는 샤드별 검색 시간이 kb_<이름> 구간으로, 임베딩 캐시 적중 수는 합산해서 기록된다.
+        """
+        k = k or config.TOP_K
+        mode = mode or getattr(config, "RETRIEVER", "dense")
+        trace = trace or Trace()
+        if mode not in ("dense", "lexical", "hybrid"):
+            raise ValueError(f"알 수 없는 RETRIEVER: {mode} (dense / lexical / hybrid)")
+
+        # 쿼리 임베딩은 한 번만: 공유 캐시에 넣어두면 샤드들은 캐시에서 꺼내 쓴다
+        if mode != "lexical" and self._primary.embed_cache is not None:
+            with trace.span("embed_query"):
+                self._primary._embed([query], trace)
+
+        n = k if mode == "dense" else k * getattr(config, "KB_CANDIDATES_MULT", 2)
+
+        def search(name: str, engine: RAGEngine) -> tuple[dict, Trace]:
+            """샤드 하나의 dense / lexical 후보 (hybrid면 둘 다, 합치기는 전체 샤드 기준으로)"""
+            shard_trace = Trace()
+            found = {"dense": [], "lexical": []}
+            with shard_trace.span(f"kb_{name}"):
+                if mode in ("dense", "hybrid"):
+                    found["dense"] = engine.retrieve_hits(query, k=n, mode="dense", trace=shard_trace)
+                if mode in ("lexical", "hybrid"):
+                    with shard_trace.span("lexical_search"):
+                        hits = engine.retrieve_hits(query, k=n, mode="lexical")
+                    found["lexical"] = normalize_lexical(hits, engine, query)
+            return {key: [{**h, "kb": name} for h in hits] for key, hits in found.items()}, shard_trace
+
+        pool = _get_fanout_executor()
+        futures = [pool.submit(search, name, engine) for name, engine in self.engines.items()]
+
+        merged = {"dense": [], "lexical": []}
+        for f in futures:
+            found, shard_trace = f.result()
+            for key, hits in found.items():
+                merged[key].extend(hits)
+            shard = shard_trace.to_dict()
+            for name, ms in shard["spans"].items():
+                if name.startswith("kb_"):
+                    trace.add_span(name, ms)
+            for name in ("embed_cache_hits", "embed_cache_misses"):
+                if name in shard["counters"]:
+                    trace.incr(name, shard["counters"][name])
+
+        if mode == "hybrid":
+            return fuse_hybrid(merged["dense"], merged["lexical"], k)
+        hits = merged["dense"] if mode == "dense" else merged["lexical"]
+        return sorted(hits, key=lambda h: h["score"], reverse=True)[:k]
+
+    def retrieve_async(
+        self,
+        query: str,
+        k: int | None = None,
+        mode: str | None = None,
+        trace: Trace | None = None,
+    ) -> "Future[List[dict]]":
+        """retrieve_hits()를 엔진 스레드 풀에서 실행 (RAGEngine.retrieve_async와 같은 계약)."""
+        trace = trace or Trace()
+
+        def run() -> List[dict]:
+            with trace.span("retrieval"):
+                return self.retrieve_hits(query, k=k, mode=mode, trace=trace)
+
+        return get_executor().submit(run)
+
+    def answer(self, user_question: str, stats_summary, retrieved_chunks: List, trace: Trace | None = None) -> str:
+        return self._primary.answer(user_question, stats_summary, retrieved_chunks, trace=trace)
+
+    def answer_async(self, user_question: str, stats_summary, retrieved_chunks: List) -> "Future[str]":
+        return self._primary.answer_async(user_question, stats_summary, retrieved_chunks)
+
+    def answer_stream(
+        self,
+        user_question: str,
+        stats_summary,
+        retrieved_chunks: List,
+        metrics: dict | None = None,
+        trace: Trace | None = None,
+    ) -> Iterator[str]:
+        return self._primary.answer_stream(user_question, stats_summary, retrieved_chunks, metrics=metrics, trace=trace)
+
+
+class ShardedRAGEngine:
+    """
+    KB별 SharedRAGEngine 묶음. (Streamlit st.cache_resource 용)
+    샤드마다 버전 스탬프를 따로 보고 바뀐 샤드만 다시 로드하며, 임베딩 백엔드/캐시는 모든 샤드가 공유.
+    """
+
+    def __init__(self, kbs: List[str] | None = None):
+        names = kbs or kb_names()
+        if not names:
+            raise ValueError("config.KNOWLEDGE_BASES가 비어 있음 (단일 인덱스는 SharedRAGEngine 사용)")
+
+        probe = RAGEngine(**kb_engine_kwargs(names[0]))
+        shared = {"embed_cache": probe.embed_cache, "answer_cache": probe.answer_cache, "embedder": probe.embedder}
+        self._shards = {name: SharedRAGEngine(**kb_engine_kwargs(name), **shared) for name in names}
+
+    def get(self, kbs: List[str] | None = None) -> MultiKBEngine:
+        """
+        kbs(기본: 전체) 샤드의 최신 엔진 묶음. 인덱스가 아직 없는 샤드는 건너뛰고 missing에 기록.
+        선택한 샤드가 모두 없으면 FileNotFoundError.
+        """
+        engines: dict[str, RAGEngine] = {}
+        missing: List[str] = []
+        for name in kbs or list(self._shards):
+            if name not in self._shards:
+                raise ValueError(f"알 수 없는 KB: {name}")
+            try:
+                engines[name] = self._shards[name].get()
+            except FileNotFoundError:
+                missing.append(name)
+        return MultiKBEngine(engines, missing)
+
+
+def open_engine(kbs: List[str] | None = None) -> RAGEngine | MultiKBEngine:
+    """CLI 스크립트용: KB 샤드가 설정돼 있으면 샤드 묶음, 아니면 단일 인덱스 엔진을 로드해서 반환."""
+    if not kb_names():
+        rag = RAGEngine()
+        rag.load()
+        return rag
+    return ShardedRAGEngine(kbs).get()
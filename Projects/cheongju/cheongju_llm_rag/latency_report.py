@@ -0,0 +1,95 @@
+"""
+logs/latency_log.jsonl(회전 파일 포함)을 읽어 구간(span)별 p50/p90/p99 지연을 집계.
+
+사용 예:
+  python latency_report.py
+  python latency_report.py --group-by top_k,retriever --since 2026-01-01
+"""
+import argparse
+from collections import defaultdict
+
+import numpy as np
+
+import config
+from tracing import read_jsonl
+
+
+# spans 필드가 생기기 전의 로그에도 있던 최상위 지연 필드 → span 이름
+_LEGACY_SPANS = {
+    "retrieval_ms": "retrieval",
+    "llm_ms": "llm",
+    "ttft_ms": "llm_ttft",
+    "total_ms": "total",
+}
+
+
+def record_spans(record: dict) -> dict[str, float]:
+    spans = {name: record[key] for key, name in _LEGACY_SPANS.items() if record.get(key) is not None}
+    spans.update(record.get("spans") or {})
+    return spans
+
+
+def summarize(records: list[dict], group_by: list[str]) -> dict[tuple, dict]:
+    """그룹 → {"n": 요청 수, "spans": {span: [ms, ...]}, "counters": {name: [값, ...]}}"""
+    groups: dict[tuple, dict] = defaultdict(
+        lambda: {"n": 0, "spans": defaultdict(list), "counters": defaultdict(list)}
+    )
+    for r in records:
+        g = groups[tuple(r.get(key) for key in group_by)]
+        g["n"] += 1
+        for name, ms in record_spans(r).items():
+            g["spans"][name].append(float(ms))
+        for name, value in (r.get("counters") or {}).items():
+            if isinstance(value, (int, float)):
+                g["counters"][name].append(value)
+        # 파일 파싱/요약과 검색을 겹쳐 실행해서 줄어든 시간 (app.py)
+        if isinstance(r.get("overlap_saved_ms"), (int, float)):
+            g["counters"]["overlap_saved_ms"].append(r["overlap_saved_ms"])
+    return groups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG 앱 지연 로그 구간별 백분위 리포트")
+    parser.add_argument("--log", default=config.LATENCY_LOG_PATH)
+    parser.add_argument("--group-by", default="top_k,chunk_size,model", help="그룹 기준 필드 (쉼표 구분)")
+    parser.add_argument("--since", default=None, help="이 시각(ISO 형식) 이후 기록만 집계")
+    args = parser.parse_args()
+
+    group_by = [g.strip() for g in args.group_by.split(",") if g.strip()]
+    records = [
+        r
+        for r in read_jsonl(args.log, backups=config.LATENCY_LOG_BACKUPS)
+        if args.since is None or str(r.get("timestamp", "")) >= args.since
+    ]
+    if not records:
+        print(f"집계할 로그가 없음: {args.log}")
+        return
+
+    groups = summarize(records, group_by)
+    for key in sorted(groups, key=str):
+        g = groups[key]
+        label = ", ".join(f"{name}={value}" for name, value in zip(group_by, key))
+        print(f"\n=== {label}  (요청 {g['n']}건)")
+        print(f"{'span':<18}{'n':>6}{'p50':>10}{'p90':>10}{'p99':>10}")
+        for name in sorted(g["spans"]):
+            values = np.array(g["spans"][name])
+            p50, p90, p99 = np.percentile(values, [50, 90, 99])
+            print(f"{name:<18}{len(values):>6}{p50:>10.1f}{p90:>10.1f}{p99:>10.1f}")
+
+        counters = g["counters"]
+        if counters:
+            print("counters (평균): " + ", ".join(
+                f"{name}={np.mean(values):.1f}" for name, values in sorted(counters.items())
+            ))
+            hits = sum(counters.get("embed_cache_hits", []))
+            misses = sum(counters.get("embed_cache_misses", []))
+            if hits + misses:
+                print(f"embed cache hit rate: {hits / (hits + misses):.1%}")
+            hits = sum(counters.get("answer_cache_hits", []))
+            misses = sum(counters.get("answer_cache_misses", []))
+            if hits + misses:
+                print(f"answer cache hit rate: {hits / (hits + misses):.1%}")
+
+
+if __name__ == "__main__":
+    main()
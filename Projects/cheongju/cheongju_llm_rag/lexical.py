@@ -0,0 +1,89 @@
+import re
+import math
+from collections import Counter
+from typing import List
+
+import config  # LEXICAL_NGRAM_RANGE, BM25_K1, BM25_B
+
+
+def char_ngrams(text: str, ngram_range: tuple[int, int] | None = None) -> List[str]:
+    """
+    어절(\\w+) 단위 문자 n-gram.
+    한국어는 조사가 붙어 어절이 달라지므로("청원구에서", "청원구의") 형태소 분석 없이도
+    2~3글자 n-gram이면 "청원구", "오창읍" 같은 지명이 그대로 매칭된다.
+    """
+    lo, hi = ngram_range or getattr(config, "LEXICAL_NGRAM_RANGE", (2, 3))
+    grams: List[str] = []
+    for word in re.findall(r"\w+", text.lower()):
+        if len(word) < lo:
+            grams.append(word)
+            continue
+        for n in range(lo, hi + 1):
+            grams.extend(word[i : i + n] for i in range(len(word) - n + 1))
+    return grams
+
+
+class BM25Index:
+    """
+    문자 n-gram 역색인 + BM25 점수. 임베딩/네트워크 없이 동작하는 키워드 검색기.
+    역색인 자체는 ChunkStore(SQLite)에 청크와 함께 저장되고, 검색 시 쿼리 n-gram의 posting만 읽는다.
+    - search(query, k): [(청크 ID, score), ...] 점수 내림차순
+    """
+
+    def __init__(self, store, k1: float | None = None, b: float | None = None):
+        self.store = store
+        self.k1 = k1 if k1 is not None else getattr(config, "BM25_K1", 1.5)
+        self.b = b if b is not None else getattr(config, "BM25_B", 0.75)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def search(self, query: str, k: int) -> List[tuple[int, float]]:
+        n_docs = len(self.store)
+        if n_docs == 0:
+            return []
+        avg_len = max(self.store.total_terms() / n_docs, 1.0)
+
+        query_tf = Counter(char_ngrams(query))
+        postings = self.store.postings(list(query_tf))
+        doc_len = self.store.doc_lengths(list({d for docs in postings.values() for d in docs}))
+
+        scores: dict[int, float] = {}
+        for term, docs in postings.items():
+            qtf = query_tf[term]
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * doc_len.get(doc_id, avg_len) / avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + qtf * idf * tf * (self.k1 + 1) / norm
+
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+
+    def max_score(self, query: str) -> float:
+        """
+        이 인덱스에서 query가 받을 수 있는 BM25 상한 (모든 쿼리 n-gram이 tf→∞로 들어 있는 문서).
+        Σ qtf × idf × (k1 + 1). 인덱스(샤드)마다 IDF가 달라 BM25 점수를 직접 비교할 수 없으므로
+        score / max_score로 "쿼리를 얼마나 채웠는지" 비율로 바꿔 비교할 때 사용.
+        """
+        n_docs = len(self.store)
+        if n_docs == 0:
+            return 0.0
+        query_tf = Counter(char_ngrams(query))
+        postings = self.store.postings(list(query_tf))
+        total = 0.0
+        for term, qtf in query_tf.items():
+            df = len(postings.get(term, {}))
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            total += qtf * idf * (self.k1 + 1)
+        return total
+
+
+def reciprocal_rank_fusion(result_lists: List[List[tuple[int, float]]], rrf_k: int = 60) -> List[tuple[int, float]]:
+    """
+    여러 검색 결과 리스트를 순위 기반으로 합침 (RRF: Σ 1 / (rrf_k + rank)).
+    dense(cosine)와 BM25는 점수 스케일이 달라 점수 대신 순위만 사용.
+    """
+    fused: dict[int, float] = {}
+    for results in result_lists:
+        for rank, (doc_id, _) in enumerate(results, 1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)
@@ -0,0 +1,241 @@
+"""
+RAG 요청 경로(검색 → 스트리밍 답변) 부하 테스트.
+logs/latency_log.jsonl의 질문(과 top_k)을 순서대로 재생하며 목표 QPS로 요청을 보내고
+처리량과 구간별 꼬리 지연(p50/p90/p99)을 리포트한다.
+
+개방형(open-loop) 부하: 요청은 응답을 기다리지 않고 예정 시각에 발생하며,
+지연은 예정 시각부터 측정하므로 워커가 밀리면 대기 시간(queue)까지 포함된다.
+매 실행마다 임시 디렉터리에 data/kb 인덱스와 빈 임베딩/답변 캐시를 새로 만들어
+실제 storage/와 캐시를 건드리지 않고, 조건이 같으면 결과도 재현된다.
+
+사용 예 (로컬 mock 서버 대상, API 과금 없음):
+  python mock_openai_server.py --port 8100 &
+  python load_test.py --base-url http://127.0.0.1:8100/v1 --qps 4 --duration 60
+  python load_test.py --base-url http://127.0.0.1:8100/v1 --qps 4 --no-answer-cache   # 캐시 효과 비교
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from dotenv import load_dotenv
+from openai import OpenAI
+
+import config
+from answer_cache import AnswerCache
+from embed_cache import EmbeddingCache
+from embedding_backends import get_embedding_backend
+from rag_engine import RAGEngine
+from tracing import Trace, read_jsonl
+
+
+def load_replay(log_path: str) -> list[dict]:
+    """지연 로그의 (질문, top_k). 로그가 없으면 평가셋 질문."""
+    items = [
+        {"question": r["question"], "k": int(r.get("top_k") or config.TOP_K)}
+        for r in read_jsonl(log_path, backups=getattr(config, "LATENCY_LOG_BACKUPS", 3))
+        if r.get("question")
+    ]
+    if not items:
+        from evaluate_rag import TEST_CASES
+
+        items = [{"question": c["question"], "k": config.TOP_K} for c in TEST_CASES]
+    return items
+
+
+def arrival_offsets(n: int, qps: float, arrival: str, seed: int) -> list[float]:
+    """요청 발생 시각(초, 시작 기준). poisson: 지수 분포 간격, uniform: 고정 간격."""
+    if arrival == "uniform":
+        return [i / qps for i in range(n)]
+    rng = random.Random(seed)
+    t, out = 0.0, []
+    for _ in range(n):
+        out.append(t)
+        t += rng.expovariate(qps)
+    return out
+
+
+def build_engine(tmp: str, args: argparse.Namespace, client: OpenAI) -> RAGEngine:
+    """임시 디렉터리에 KB 인덱스 + 빈 캐시로 엔진 구성."""
+    embed_cache = EmbeddingCache(os.path.join(tmp, "embed_cache.sqlite"))
+    answer_cache = AnswerCache(
+        os.path.join(tmp, "answer_cache.sqlite"),
+        max_entries=getattr(config, "ANSWER_CACHE_MAX_ENTRIES", 5000),
+        ttl_sec=getattr(config, "ANSWER_CACHE_TTL_SEC", 24 * 3600),
+        threshold=getattr(config, "ANSWER_CACHE_SIMILARITY", 0.95),
+    )
+    rag = RAGEngine(
+        index_path=os.path.join(tmp, "faiss.index"),
+        meta_path=os.path.join(tmp, "meta.json"),
+        manifest_path=os.path.join(tmp, "manifest.json"),
+        info_path=os.path.join(tmp, "index_info.json"),
+        store_path=os.path.join(tmp, "chunks.sqlite"),
+        client=client,
+        embed_cache=embed_cache,
+        answer_cache=answer_cache,
+        embedder=get_embedding_backend(args.backend, client=client),
+    )
+    kb_files = sorted(os.path.join(args.kb_dir, f) for f in os.listdir(args.kb_dir) if f.endswith(".txt"))
+    rag.build_from_text_files(kb_files)
+
+    # 인덱스 구축에는 캐시를 쓰고, 요청 경로에서만 끈다
+    if args.no_embed_cache:
+        rag.embed_cache = None
+    if args.no_answer_cache:
+        rag.answer_cache = None
+    return rag
+
+
+def run_one(rag: RAGEngine, item: dict, stats: dict, scheduled: float) -> dict:
+    """요청 하나: 검색 → 스트리밍 답변을 끝까지 소비. 모든 지연은 예정 시각(scheduled) 기준."""
+    started = time.perf_counter()
+    record = {"question": item["question"], "k": item["k"], "queue_ms": round((started - scheduled) * 1000, 1)}
+    trace = Trace()
+    try:
+        with trace.span("retrieval"):
+            hits = rag.retrieve_hits(item["question"], k=item["k"], trace=trace)
+        first_piece_at = None
+        for _ in rag.answer_stream(item["question"], stats, hits, trace=trace):
+            if first_piece_at is None:
+                first_piece_at = time.perf_counter()
+        end = time.perf_counter()
+        record["ttft_ms"] = round(((first_piece_at or end) - scheduled) * 1000, 1)
+        record["total_ms"] = round((end - scheduled) * 1000, 1)
+    except Exception as e:
+        record["error"] = type(e).__name__
+        record["total_ms"] = round((time.perf_counter() - scheduled) * 1000, 1)
+    record.update(trace.to_dict())
+    record["finished_at"] = time.perf_counter()
+    return record
+
+
+def fetch_server_stats(base_url: str | None) -> dict | None:
+    """mock_openai_server의 /stats (실제 API나 연결 실패면 None)."""
+    if not base_url:
+        return None
+    try:
+        with urllib.request.urlopen(base_url.rstrip("/") + "/stats", timeout=2) as resp:
+            return json.loads(resp.read())
+    except Exception:
+        return None
+
+
+def report(records: list[dict], wall_sec: float, target_qps: float):
+    ok = [r for r in records if "error" not in r]
+    errors: dict[str, int] = {}
+    for r in records:
+        if "error" in r:
+            errors[r["error"]] = errors.get(r["error"], 0) + 1
+
+    print(f"\n요청 {len(records)}건: 성공 {len(ok)}, 실패 {len(records) - len(ok)} {errors or ''}")
+    print(f"목표 {target_qps:.2f} QPS → 처리량 {len(ok) / wall_sec:.2f} req/s (wall {wall_sec:.1f}s)")
+    if not ok:
+        return
+
+    rows = {
+        "queue": [r["queue_ms"] for r in ok],
+        "retrieval": [r["spans"].get("retrieval", 0.0) for r in ok],
+        "ttft": [r["ttft_ms"] for r in ok],
+        "total": [r["total_ms"] for r in ok],
+    }
+    print(f"{'(ms)':<12}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for name, values in rows.items():
+        p50, p90, p99 = np.percentile(values, [50, 90, 99])
+        print(f"{name:<12}{p50:>10.1f}{p90:>10.1f}{p99:>10.1f}{max(values):>10.1f}")
+
+    for cache in ("embed_cache", "answer_cache"):
+        hits = sum(r["counters"].get(f"{cache}_hits", 0) for r in ok)
+        misses = sum(r["counters"].get(f"{cache}_misses", 0) for r in ok)
+        if hits + misses:
+            print(f"{cache} hit rate: {hits / (hits + misses):.1%} ({hits}/{hits + misses})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG 요청 경로 부하 테스트 (지연 로그 질문 재생)")
+    parser.add_argument("--log", default=config.LATENCY_LOG_PATH, help="재생할 질문 로그")
+    parser.add_argument("--qps", type=float, default=1.0, help="목표 초당 요청 수")
+    parser.add_argument("--duration", type=float, default=30.0, help="요청 발생 구간 길이(초)")
+    parser.add_argument("--requests", type=int, default=0, help="요청 수 (지정 시 --duration 무시)")
+    parser.add_argument("--arrival", choices=["poisson", "uniform"], default="poisson", help="요청 발생 간격 분포")
+    parser.add_argument("--concurrency", type=int, default=32, help="동시 처리 워커 수 (초과분은 대기)")
+    parser.add_argument("--base-url", default=os.getenv("OPENAI_BASE_URL"), help="OpenAI 호환 서버 주소 (mock 서버 등)")
+    parser.add_argument("--max-retries", type=int, default=2, help="OpenAI SDK 자체 재시도 횟수 (429/5xx)")
+    parser.add_argument("--backend", default=None, help="임베딩 백엔드 (기본: config.EMBEDDING_BACKEND)")
+    parser.add_argument("--kb-dir", default="data/kb")
+    parser.add_argument("--dataset", default="data/raw/accidents_sample.csv", help="stats 요약에 쓸 데이터")
+    parser.add_argument("--no-embed-cache", action="store_true", help="요청 경로에서 임베딩 캐시 끄기")
+    parser.add_argument("--no-answer-cache", action="store_true", help="요청 경로에서 답변 캐시 끄기")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="요청별 결과 jsonl 경로")
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = OpenAI(
+        base_url=args.base_url,
+        api_key=os.getenv("OPENAI_API_KEY") or "mock",
+        max_retries=args.max_retries,
+    )
+
+    replay = load_replay(args.log)
+    n = args.requests or max(1, int(args.qps * args.duration))
+    offsets = arrival_offsets(n, args.qps, args.arrival, args.seed)
+    items = [replay[i % len(replay)] for i in range(n)]
+
+    stats = {}
+    if args.dataset and os.path.exists(args.dataset):
+        from preprocess import load_accidents_csv, basic_summary
+
+        stats = basic_summary(load_accidents_csv(args.dataset))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rag = build_engine(tmp, args, client)
+        print(
+            f"[load] {n} requests @ {args.qps} QPS ({args.arrival}), {len(replay)} distinct log entries, "
+            f"concurrency={args.concurrency}, base_url={args.base_url or 'api.openai.com'}"
+        )
+        server_before = fetch_server_stats(args.base_url)
+
+        records: list[dict] = []
+        lock = threading.Lock()
+
+        def collect(future):
+            with lock:
+                records.append(future.result())
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="load") as pool:
+            for item, offset in zip(items, offsets):
+                scheduled = start + offset
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(run_one, rag, item, stats, scheduled).add_done_callback(collect)
+        wall_sec = max(r["finished_at"] for r in records) - start
+
+        report(records, wall_sec, args.qps)
+        server_after = fetch_server_stats(args.base_url)
+        if server_after is not None:
+            before = (server_before or {}).get("endpoints", {})
+            for endpoint, counts in sorted(server_after["endpoints"].items()):
+                delta = {k: v - before.get(endpoint, {}).get(k, 0) for k, v in counts.items()}
+                print(f"server {endpoint}: {delta}")
+        rag.store.close()
+
+    if args.out:
+        out_dir = os.path.dirname(args.out)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            for r in records:
+                r = {k: v for k, v in r.items() if k != "finished_at"}
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
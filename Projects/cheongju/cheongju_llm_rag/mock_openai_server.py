@@ -0,0 +1,293 @@
+"""
+부하 테스트용 로컬 OpenAI 호환 서버 (API 호출/과금 없음, 네트워크 지터 없음).
+  - POST /v1/embeddings        : hashing 백엔드 벡터 반환 (비슷한 문장 → 비슷한 벡터, `dimensions` 지원)
+  - POST /v1/chat/completions  : 고정 답변. stream=True면 SSE로 토큰 단위 전송 (+ include_usage)
+  - GET  /v1/models, /stats    : 헬스 체크 / 엔드포인트별 요청·429 횟수
+
+지연은 분포 문자열로 지정: "const:50", "uniform:20,80", "lognormal:300,0.5" (중앙값 ms, sigma)
+429 주입: --error-rate 비율만큼 무작위, 또는 동시 처리 중인 요청이 --max-concurrency를 넘으면 (Retry-After 포함)
+
+사용 예:
+  python mock_openai_server.py --port 8100 --chat-ttft lognormal:400,0.4 --error-rate 0.05
+  OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=mock python load_test.py --qps 2
+"""
+import sys
+import math
+import base64
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from embedding_backends import HashingEmbeddingBackend
+from tokens import count_tokens
+
+
+DEFAULT_ANSWER = (
+    "업로드된 데이터 요약과 정책 메모를 보면, 야간 교차로 사고는 조명과 신호 체계가 취약한 구간에 집중됩니다. "
+    "우선 사고가 잦은 교차로에 보행자 조명을 보강하고, 심야 시간대 점멸 신호 운영을 재검토하는 것이 좋습니다. "
+    "또한 월별·요일별 추이를 함께 확인해 단속과 홍보 시점을 사고가 몰리는 시기에 맞추는 방안을 권장합니다."
+)
+
+
+def parse_latency(spec: str):
+    """지연 분포 문자열 → 호출할 때마다 ms 값을 뽑는 함수."""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v.strip()]
+    if kind == "const" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        mu, sigma = math.log(max(values[0], 1e-3)), values[1]
+        return lambda: random.lognormvariate(mu, sigma)
+    raise argparse.ArgumentTypeError(f"지연 분포 형식 오류: {spec} (const:ms / uniform:lo,hi / lognormal:median,sigma)")
+
+
+class MockState:
+    """서버 설정 + 엔드포인트별 카운터. 핸들러 스레드들이 공유."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.embed_latency = parse_latency(args.embed_latency)
+        self.chat_ttft = parse_latency(args.chat_ttft)
+        self.token_interval = parse_latency(args.token_interval)
+        self.error_rate = args.error_rate
+        self.max_concurrency = args.max_concurrency
+        self.retry_after = args.retry_after
+        self.answer = args.answer or DEFAULT_ANSWER
+        self.embedders: dict[int, HashingEmbeddingBackend] = {}
+
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.counts: dict[str, dict[str, int]] = {}
+
+    def embedder(self, dim: int) -> HashingEmbeddingBackend:
+        with self._lock:
+            if dim not in self.embedders:
+                self.embedders[dim] = HashingEmbeddingBackend(dim=dim)
+            return self.embedders[dim]
+
+    def incr(self, endpoint: str, key: str):
+        with self._lock:
+            c = self.counts.setdefault(endpoint, {})
+            c[key] = c.get(key, 0) + 1
+
+    def enter(self) -> bool:
+        """동시 처리 한도 안이면 True (in_flight 증가)."""
+        with self._lock:
+            if self.max_concurrency and self.in_flight >= self.max_concurrency:
+                return False
+            self.in_flight += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"in_flight": self.in_flight, "endpoints": json.loads(json.dumps(self.counts))}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "MockOpenAI/1.0"
+    protocol_version = "HTTP/1.1"  # keep-alive (httpx 연결 풀 재사용)
+
+    @property
+    def state(self) -> MockState:
+        return self.server.state
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    # ---------- 응답 헬퍼 ----------
+
+    def _send_json(self, status: int, body: dict, headers: dict | None = None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int, message: str, err_type: str, headers: dict | None = None):
+        self._send_json(status, {"error": {"message": message, "type": err_type, "code": None}}, headers)
+
+    def _rate_limited(self) -> dict:
+        return {"retry-after": str(self.state.retry_after)} if self.state.retry_after is not None else {}
+
+    # ---------- 라우팅 ----------
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]})
+        elif self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, self.state.snapshot())
+        else:
+            self._send_error(404, f"unknown path {self.path}", "invalid_request_error")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_error(400, "invalid JSON body", "invalid_request_error")
+            return
+
+        path = self.path.rstrip("/")
+        if path.endswith("/embeddings"):
+            endpoint, handler = "embeddings", self._embeddings
+        elif path.endswith("/chat/completions"):
+            endpoint, handler = "chat", self._chat
+        else:
+            self._send_error(404, f"unknown path {self.path}", "invalid_request_error")
+            return
+
+        self.state.incr(endpoint, "requests")
+        if random.random() < self.state.error_rate or not self.state.enter():
+            self.state.incr(endpoint, "rate_limited")
+            self._send_error(429, "Rate limit reached (mock)", "rate_limit_error", self._rate_limited())
+            return
+        try:
+            handler(body)
+        except (BrokenPipeError, ConnectionResetError):
+            self.state.incr(endpoint, "client_disconnects")  # 스트림 도중 클라이언트가 끊음
+        finally:
+            self.state.leave()
+
+    # ---------- 엔드포인트 ----------
+
+    def _embeddings(self, body: dict):
+        texts = body.get("input", [])
+        if isinstance(texts, str):
+            texts = [texts]
+        dim = int(body.get("dimensions") or 1536)
+        fmt = body.get("encoding_format") or "float"  # openai SDK는 numpy가 있으면 base64로 요청
+
+        time.sleep(self.state.embed_latency() / 1000)
+        vecs = self.state.embedder(dim).embed(texts)
+        n_tokens = sum(count_tokens(t) for t in texts)
+        self._send_json(
+            200,
+            {
+                "object": "list",
+                "data": [{"object": "embedding", "index": i, "embedding": _encode(v, fmt)} for i, v in enumerate(vecs)],
+                "model": body.get("model", "mock"),
+                "usage": {"prompt_tokens": n_tokens, "total_tokens": n_tokens},
+            },
+        )
+
+    def _chat(self, body: dict):
+        prompt = "".join(str(m.get("content") or "") for m in body.get("messages", []))
+        prompt_tokens = count_tokens(prompt)
+        # max_tokens 만큼만 생성 (어절 조각 하나를 토큰 하나로 취급)
+        pieces = _split_pieces(self.state.answer)[: int(body.get("max_tokens") or 1_000_000)]
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(pieces),
+            "total_tokens": prompt_tokens + len(pieces),
+        }
+        base = {"id": f"chatcmpl-mock-{time.time_ns()}", "created": int(time.time()), "model": body.get("model", "mock")}
+
+        time.sleep(self.state.chat_ttft() / 1000)
+        if not body.get("stream"):
+            # 비스트리밍: 전체 생성 시간을 한 번에 기다림
+            time.sleep(sum(self.state.token_interval() for _ in pieces[1:]) / 1000)
+            self._send_json(
+                200,
+                {
+                    **base,
+                    "object": "chat.completion",
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": "".join(pieces)},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": usage,
+                },
+            )
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")  # 스트림 끝 = 연결 종료 (Content-Length 없음)
+        self.end_headers()
+        self.close_connection = True
+
+        def event(payload: dict):
+            self.wfile.write(b"data: " + json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n\n")
+            self.wfile.flush()
+
+        chunk = {**base, "object": "chat.completion.chunk"}
+        for i, piece in enumerate(pieces):
+            if i:
+                time.sleep(self.state.token_interval() / 1000)
+            delta = {"role": "assistant", "content": piece} if i == 0 else {"content": piece}
+            event({**chunk, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+        event({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (body.get("stream_options") or {}).get("include_usage"):
+            event({**chunk, "choices": [], "usage": usage})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def _encode(vec, fmt: str):
+    if fmt == "base64":
+        return base64.b64encode(vec.astype("<f4").tobytes()).decode("ascii")
+    return vec.tolist()
+
+
+def _split_pieces(text: str) -> list[str]:
+    """스트리밍 조각: 공백을 앞에 붙인 어절 단위 (실제 API의 토큰 조각과 비슷한 크기)."""
+    words = text.split(" ")
+    return [words[0]] + [" " + w for w in words[1:]] if words else []
+
+
+def make_server(args: argparse.Namespace) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((args.host, args.port), MockHandler)
+    server.daemon_threads = True
+    server.state = MockState(args)
+    server.verbose = args.verbose
+    return server
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="부하 테스트용 로컬 OpenAI 호환 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--embed-latency", default="lognormal:80,0.3", help="임베딩 요청 지연 분포 (ms)")
+    parser.add_argument("--chat-ttft", default="lognormal:500,0.4", help="첫 토큰까지 지연 분포 (ms)")
+    parser.add_argument("--token-interval", default="uniform:15,35", help="스트리밍 토큰 간격 분포 (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="무작위 429 비율 (0~1)")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="동시 처리 한도 (초과 시 429, 0=무제한)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429 응답의 Retry-After 초 (음수면 헤더 생략)")
+    parser.add_argument("--answer", default=None, help="채팅 응답 텍스트 (기본: 고정 한국어 답변)")
+    parser.add_argument("--verbose", action="store_true", help="요청마다 접근 로그 출력")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    if args.retry_after < 0:
+        args.retry_after = None
+    server = make_server(args)
+    print(f"[mock] http://{args.host}:{args.port}/v1 (OPENAI_BASE_URL로 지정), Ctrl+C로 종료", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"[mock] {json.dumps(server.state.snapshot()['endpoints'], ensure_ascii=False)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,70 @@
+import io
 import os
+import csv
+import codecs
+import hashlib
 import pandas as pd
 from pandas.errors import EmptyDataError 
 
+import config  # UPLOAD_CACHE_DIR, UPLOAD_CACHE_MAX_FILES
+
+try:  # 빠른 CSV 엔진 + Parquet 캐시용 (없으면 pandas 기본 엔진, 캐시 없이 동작)
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+# 로딩/정규화 로직이 바뀌면 올려서 예전 Parquet 캐시를 무효화
+_PARSE_CACHE_VERSION = "1"
+
+# 인코딩 판별용 앞부분 샘플 크기
+_ENCODING_SAMPLE_BYTES = 64 * 1024
+
+# 전체 인코딩 검증 시 한 번에 디코딩하는 크기 (전체 문자열 사본을 만들지 않도록 조각 단위)
+_ENCODING_CHECK_BYTES = 4 * 1024 * 1024
+
+# 모드별 알려진 컬럼의 dtype (없는 컬럼은 무시, 나머지 컬럼은 엔진이 추론)
+#  - 집계 파일은 행이 적어서 숫자 컬럼만 지정
+#  - 상세 사고 파일(수십만 행 이상)은 반복되는 문자열 컬럼을 category로 읽어 메모리/집계 시간 절약
+_COUNT = "Int64"      # 빈 칸이 있어도 정수 유지
+_FLOAT = "float64"
+_CATEGORY = "category"
+_SCHEMA_DTYPES = {
+    "district_summary": {
+        "사고건수": _COUNT,
+        "사망자수": _COUNT,
+        "부상신고자수": _COUNT,
+        "사상자수": _COUNT,
+        "사고 1건당 사상자수": _FLOAT,
+    },
+    "geo_summary": {
+        "사고건수": _COUNT,
+        "위도": _FLOAT,
+        "경도": _FLOAT,
+    },
+    # 첫 데이터 행이 헤더 내용이라 문자열로 읽은 뒤 _normalize에서 숫자로 변환
+    "time_summary": {},
+    # (발생일자/발생시간 등 날짜·시각 컬럼은 엔진이 날짜 타입으로 추론하도록 둠)
+    "detail": {
+        col: _CATEGORY
+        for col in [
+            "시군구", "구", "시군구명",
+            "노면형태", "도로형태", "기상상태", "사고유형", "사고유형_대분류",
+            "돌발분류명", "연월",
+            "region", "road_type", "weather", "severity", "accident_type",
+        ]
+    },
+}
+
+
 # ------------------------------------------------------------------
 # CSV 로딩 함수
 #  - 동/위도·경도 집계 (시도코드명, 시군구명, 읍면동명, 사고건수, 위도, 경도)
 #  - 구 단위 요약 (구, 사고건수, 사망자수, 부상신고자수, 사상자수...)
 #  - 요일·시간대·월별 요약 (요일별(1), 시간대별(1), 월별(1), 2024, 2024.1, 2024.2)
 #  - 나중에 상세사고 데이터(발생일자 등)도 확장 가능
+#  같은 파일(내용 해시 기준)은 정규화까지 끝난 결과를 Parquet으로 캐시해서 파싱을 건너뜀
 # ------------------------------------------------------------------
 def load_accidents_csv(file):
     # file: Streamlit UploadedFile 또는 파일 경로(str)
@@ -18,40 +75,171 @@ def load_accidents_csv(file):
         name = str(file)
     ext = os.path.splitext(name)[1].lower()
 
+    data = _read_bytes(file)
+    cache_path = _cache_path(data, ext)
+    if cache_path and os.path.exists(cache_path):
+        try:
+            df = pd.read_parquet(cache_path)
+            os.utime(cache_path)  # 정리 순서(mtime) 기준으로 최근 사용 표시
+            return df
+        except Exception:
+            pass  # 깨진 캐시 파일이면 다시 파싱해서 덮어씀
+
+    df = _normalize(_read_raw(data, ext))
+
+    if cache_path:
+        _write_cache(df, cache_path)
+    return df
+
+
+def _read_bytes(file) -> bytes:
+    if hasattr(file, "getvalue"):  # Streamlit UploadedFile / BytesIO
+        return file.getvalue()
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            return f.read()
+    return file.read()
+
+
+def _cache_path(data: bytes, ext: str) -> str | None:
+    cache_dir = getattr(config, "UPLOAD_CACHE_DIR", None)
+    if not HAS_PYARROW or not cache_dir:
+        return None
+    h = hashlib.sha256(data)
+    h.update(f"\x00{ext}\x00{_PARSE_CACHE_VERSION}".encode("utf-8"))
+    return os.path.join(cache_dir, h.hexdigest() + ".parquet")
+
+
+def _write_cache(df: pd.DataFrame, cache_path: str):
+    """임시 파일에 쓴 뒤 교체. 타입이 섞인 컬럼 등으로 Parquet 변환이 안 되면 캐시 없이 진행."""
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp = cache_path + ".tmp"
+    try:
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, cache_path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return
+
+    # 오래된 캐시부터 정리 (업로드마다 파일이 하나씩 쌓이므로)
+    max_files = getattr(config, "UPLOAD_CACHE_MAX_FILES", 20)
+    cache_dir = os.path.dirname(cache_path)
+    cached = sorted(
+        (os.path.join(cache_dir, f) for f in os.listdir(cache_dir) if f.endswith(".parquet")),
+        key=os.path.getmtime,
+    )
+    for old in cached[: max(0, len(cached) - max_files)]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+
+
+def _detect_encoding(sample: bytes) -> str:
+    """앞부분 샘플만 보고 판별: BOM → utf-8-sig, UTF-8로 풀리면 utf-8, 아니면 cp949."""
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        # 샘플 끝에서 잘린 멀티바이트 문자는 에러로 보지 않음
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "cp949"
+
+
+def _is_valid_encoding(data: bytes, encoding: str) -> bool:
+    """data 전체가 encoding으로 풀리는지. 조각 단위 incremental 디코딩이라 추가 메모리는 조각 크기만큼."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    view = memoryview(data)
+    try:
+        for i in range(0, len(view), _ENCODING_CHECK_BYTES):
+            decoder.decode(view[i : i + _ENCODING_CHECK_BYTES], final=False)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _read_header(data: bytes, encoding: str) -> list[str]:
+    """첫 줄 컬럼명 (정리 전 원본, 중복 포함)."""
+    sample = data[:_ENCODING_SAMPLE_BYTES].decode(encoding, errors="ignore")
+    return next(csv.reader(io.StringIO(sample)), [])
+
+
+def _read_raw(data: bytes, ext: str) -> pd.DataFrame:
+    """바이트 → 원본 DataFrame (컬럼명 정리 전)."""
     # 2) 엑셀 / CSV 분기
     if ext in [".xlsx", ".xls"]:
         try:
-            df = pd.read_excel(file)
+            return pd.read_excel(io.BytesIO(data))
         except EmptyDataError:
             raise ValueError("엑셀 파일 안에 데이터가 없어서 읽을 수 없어.")
 
-    # 2) CSV 파일
-    else:
-        last_error = None
-        for enc in ("utf-8-sig", "cp949"):
-            try:
-                df = pd.read_csv(file, encoding=enc)
-                break
-            except UnicodeDecodeError as e:
-                last_error = e
-                continue
-            except EmptyDataError:
-                raise ValueError("CSV 파일 안에 데이터가 없어서 읽을 수 없어.")
-        else:
-            # utf-8, cp949 둘 다 실패한 경우
-            raise ValueError(f"CSV 인코딩을 인식하지 못했어. (마지막 에러: {last_error})")
+    # 2) CSV 파일: 인코딩은 샘플로 한 번만 판별, 헤더로 모드를 미리 알아내 dtype 지정
+    if not data.strip():
+        raise ValueError("CSV 파일 안에 데이터가 없어서 읽을 수 없어.")
+    encoding = _detect_encoding(data[:_ENCODING_SAMPLE_BYTES])
+    # 샘플 뒤쪽에만 UTF-8이 아닌 바이트가 있는 경우 확인
+    # (pyarrow는 category 컬럼의 잘못된 UTF-8을 에러 없이 bytes로 읽음)
+    if encoding != "cp949" and not _is_valid_encoding(data, encoding):
+        encoding = "cp949"
+    if encoding == "cp949" and not _is_valid_encoding(data, encoding):
+        # utf-8, cp949 둘 다 실패한 경우
+        raise ValueError("CSV 인코딩을 인식하지 못했어. (utf-8 / cp949 모두 실패)")
+
+    header = _read_header(data, encoding)
+    if not header:
+        raise ValueError("CSV 파일 안에 데이터가 없어서 읽을 수 없어.")
+    mode = _detect_mode({c.strip().lstrip("\ufeff") for c in header})
+    dtype = {col: t for col, t in _SCHEMA_DTYPES[mode].items() if col in header}
+
+    # 중복 헤더(요일·시간대 파일의 2024, 2024 → 2024, 2024.1)는 C 엔진만 pandas 방식으로 바꿔줌
+    # cp949는 pyarrow가 내부에서 전체를 UTF-8로 다시 변환(느린 경로)하므로 C 엔진이 직접 디코딩
+    attempts = []
+    if HAS_PYARROW and encoding != "cp949" and len(set(header)) == len(header):
+        attempts.append({"engine": "pyarrow", "dtype": dtype})
+    attempts.append({"engine": "c", "dtype": dtype})
+    attempts.append({"engine": "c"})  # dtype이 안 맞는 값(예: "1,234")이 있으면 추론에 맡김
+
+    last_error = None
+    for kwargs in attempts:
+        try:
+            return pd.read_csv(io.BytesIO(data), encoding=encoding, **kwargs)
+        except EmptyDataError:
+            raise ValueError("CSV 파일 안에 데이터가 없어서 읽을 수 없어.")
+        except (ValueError, TypeError) as e:
+            last_error = e
+            continue
+
+    raise ValueError(f"CSV 파일을 읽지 못했어. (마지막 에러: {last_error})")
+
+
+def _detect_mode(cols: set) -> str:
+    """정리된 컬럼명 집합 → district_summary / geo_summary / time_summary / detail"""
+    if "구" in cols and "사고건수" in cols and "읍면동명" not in cols:
+        return "district_summary"
+    if {"시도코드명", "시군구명", "읍면동명", "사고건수"}.issubset(cols):
+        return "geo_summary"
+    if {"요일별(1)", "시간대별(1)", "월별(1)", "2024"}.issubset(cols):
+        return "time_summary"
+    return "detail"
+
 
+def _normalize(df: pd.DataFrame, verbose: bool = True) -> pd.DataFrame:
+    """원본 DataFrame → 모드 판별 + 공통 컬럼명(region, accident_count, ...)으로 매핑"""
     # 3) 컬럼명 정리 (이 아래부터는 네가 이미 쓰고 있는 모드 판별 / 매핑 로직)
     df.columns = [c.strip().lstrip("\ufeff") for c in df.columns]
-    print("정리된 컬럼:", list(df.columns))
+    if verbose:
+        print("정리된 컬럼:", list(df.columns))
 
-    cols = set(df.columns)
+    mode = _detect_mode(set(df.columns))
 
     # ==========================
     # A. 구 단위 요약 데이터 모드
     #    예: ['구', '사고건수', '사망자수', '부상신고자수', '사상자수', ...]
     # ==========================
-    if "구" in cols and "사고건수" in cols and "읍면동명" not in cols:
+    if mode == "district_summary":
         df = df.rename(
             columns={
                 "구": "region",
@@ -77,7 +265,7 @@ def load_accidents_csv(file):
     # B. 동 단위 + 위도·경도 집계 모드
     #    예: ['시도코드명', '시군구명', '읍면동명', '사고건수', '위도', '경도']
     # ==========================
-    if {"시도코드명", "시군구명", "읍면동명", "사고건수"}.issubset(cols):
+    if mode == "geo_summary":
         df = df.rename(
             columns={
                 "시도코드명": "province",
@@ -99,7 +287,7 @@ def load_accidents_csv(file):
     # C. 요일·시간대·월별 집계 모드
     #    예: ['요일별(1)', '시간대별(1)', '월별(1)', '2024', '2024.1', '2024.2']
     # ==========================
-    if {"요일별(1)", "시간대별(1)", "월별(1)", "2024"}.issubset(cols):
+    if mode == "time_summary":
         # 첫 행이 헤더 내용인 경우 제거
         # (요일별(1) == '요일별(1)' 이고 2024 == '사고건수 (건)' 인 행)
         try:
@@ -163,67 +351,194 @@ def load_accidents_csv(file):
     return df
 
 
+# ------------------------------------------------------------------
+# 스트리밍 로딩 (전체 DataFrame을 만들지 않고 청크 단위로 읽기)
+#  - 수 GB 상세 사고 파일은 stream_summary()로 요약만 계산
+#  - pyarrow 엔진은 청크 읽기를 지원하지 않아 C 엔진 사용
+# ------------------------------------------------------------------
+def iter_accident_chunks(file, chunk_rows: int | None = None, encoding: str | None = None, use_dtype: bool = True):
+    """CSV를 chunk_rows 행씩 읽어서 load_accidents_csv와 같은 정규화를 거친 DataFrame을 순서대로 반환."""
+    chunk_rows = chunk_rows or getattr(config, "SUMMARY_CHUNK_ROWS", 200_000)
+
+    if isinstance(file, (str, os.PathLike)):
+        f = open(file, "rb")
+    elif hasattr(file, "getvalue"):  # Streamlit UploadedFile: 이미 메모리에 있는 bytes를 복사 없이 감쌈
+        f = io.BytesIO(file.getvalue())
+    else:
+        f = file
+
+    try:
+        sample = f.read(_ENCODING_SAMPLE_BYTES)
+        f.seek(0)
+        if not sample.strip():
+            raise ValueError("CSV 파일 안에 데이터가 없어서 읽을 수 없어.")
+
+        encoding = encoding or _detect_encoding(sample)
+        header = _read_header(sample, encoding)
+        mode = _detect_mode({c.strip().lstrip("\ufeff") for c in header})
+        dtype = {col: t for col, t in _SCHEMA_DTYPES[mode].items() if col in header} if use_dtype else None
+
+        try:
+            reader = pd.read_csv(f, encoding=encoding, dtype=dtype, chunksize=chunk_rows)
+        except EmptyDataError:
+            raise ValueError("CSV 파일 안에 데이터가 없어서 읽을 수 없어.")
+        with reader:
+            for i, chunk in enumerate(reader):
+                yield _normalize(chunk, verbose=(i == 0))
+    finally:
+        if f is not file:
+            f.close()
+
+
+def stream_summary(file, chunk_rows: int | None = None) -> dict:
+    """
+    청크 단위로 읽으면서 부분 집계만 유지해 basic_summary와 같은 stats를 계산.
+    메모리 사용량은 파일 크기가 아니라 chunk_rows와 (지역/요일 등) 키 개수에 비례.
+    """
+    name = getattr(file, "name", None) or str(file)
+    ext = os.path.splitext(name)[1].lower()
+    if ext in [".xlsx", ".xls"]:
+        # 엑셀은 청크 읽기가 안 되므로 일반 경로
+        return basic_summary(load_accidents_csv(file))
+
+    # 샘플로 고른 인코딩/dtype이 뒤쪽 행에서 안 맞으면 처음부터 다시 집계
+    last_error = None
+    for encoding, use_dtype in [(None, True), (None, False), ("cp949", True), ("cp949", False)]:
+        acc = SummaryAccumulator()
+        try:
+            for chunk in iter_accident_chunks(file, chunk_rows, encoding=encoding, use_dtype=use_dtype):
+                acc.update(chunk)
+            return acc.result()
+        except (ValueError, TypeError) as e:  # UnicodeDecodeError 포함
+            last_error = e
+            continue
+        finally:
+            if hasattr(file, "seek"):
+                file.seek(0)
+
+    raise ValueError(f"CSV 파일을 읽지 못했어. (마지막 에러: {last_error})")
+
+
 # ------------------------------------------------------------------
 # 기본 요약 통계
 #  - summary 계열(mode == *_summary)은 사고건수/사망자 등 합계 위주
 #  - detail 모드는 나중에 필요하면 확장
+#  - 청크별 부분 집계를 합칠 수 있도록 SummaryAccumulator로 계산
+#    (basic_summary(df)는 전체 DataFrame을 청크 하나로 보고 계산한 것과 같음)
 # ------------------------------------------------------------------
-def basic_summary(df):
-    stats = {}
-
-    # 1) 모드, 행/열 정보
-    mode = df["mode"].iloc[0] if "mode" in df.columns else "unknown"
-    stats["mode"] = mode
-    stats["rows"] = int(len(df))
-    stats["columns"] = list(df.columns)
-
-    # 2) 공통 지표: 사고/사망/사상자 합계 (있으면 계산)
-    if "accident_count" in df.columns:
-        stats["total_accidents"] = int(df["accident_count"].sum())
-
-    if "death_count" in df.columns:
-        stats["total_deaths"] = int(df["death_count"].sum())
-
-    if "casualty_count" in df.columns:
-        stats["total_casualties"] = int(df["casualty_count"].sum())
-
-    # 3) 지역 기준 top5 (구/동/region 있는 경우)
-    if "region" in df.columns and "accident_count" in df.columns:
-        top_regions = (
-            df.groupby("region")["accident_count"]
-              .sum()
-              .sort_values(ascending=False)
-              .head(5)
-              .to_dict()
-        )
-        stats["top_regions_by_accidents"] = top_regions
-
-    # 4) 요일 기준 top5 (요일·시간대 파일일 때)
-    if "weekday" in df.columns and "accident_count" in df.columns:
-        top_weekdays = (
-            df.groupby("weekday")["accident_count"]
-              .sum()
-              .sort_values(ascending=False)
-              .head(5)
-              .to_dict()
-        )
-        stats["top_weekdays_by_accidents"] = top_weekdays
-
-    # 5) 상세 데이터에만 있는 애들(있을 때만 추가)
-    for col, key in [
-        ("road_type", "top_road"),
-        ("weather", "top_weather"),
-        ("accident_type", "top_accident_type"),
-    ]:
-          # 돌발 현황 파일 전용 요약 (컬럼이 있을 때만)
-        if "돌발분류명" in df.columns:
-          stats["top_incident_types"] = (
-            df["돌발분류명"].value_counts().head(5).to_dict()
-        )
+_TOP_N = 5
+
+# stats 키 → 합계를 낼 컬럼
+_SUM_FIELDS = [
+    ("total_accidents", "accident_count"),
+    ("total_deaths", "death_count"),
+    ("total_casualties", "casualty_count"),
+]
+
+# stats 키 → accident_count 합을 키별로 모을 컬럼
+_GROUP_FIELDS = [
+    ("top_regions_by_accidents", "region"),   # 지역 기준 top5 (구/동/region 있는 경우)
+    ("top_weekdays_by_accidents", "weekday"), # 요일 기준 top5 (요일·시간대 파일일 때)
+]
+
+# stats 키 → 값별 행 수를 셀 컬럼 (돌발 현황 파일 전용 요약, 컬럼이 있을 때만)
+_COUNT_FIELDS = [
+    ("top_incident_types", "돌발분류명"),
+    ("top_year_months", "연월"),
+]
+
+
+def _top_n(totals: dict, sort_keys: bool) -> dict:
+    """값 내림차순 상위 _TOP_N개. 동점은 키 순서(sort_keys) 또는 처음 나온 순서."""
+    items = list(totals.items())
+    if sort_keys:
+        try:
+            items.sort(key=lambda kv: kv[0])
+        except TypeError:
+            pass
+    items.sort(key=lambda kv: kv[1], reverse=True)
+    return dict(items[:_TOP_N])
+
+
+class SummaryAccumulator:
+    """
+    basic_summary용 부분 집계: 행 수, 합계, 키별 합계/개수.
+    update()로 청크를 하나씩 넣거나 merge()로 다른 누적기와 합친 뒤 result()로 stats를 만든다.
+    키별 합계는 전체를 들고 있다가 result()에서 top5를 고름 (청크별 top5만 합치면 틀릴 수 있음).
+    """
+
+    def __init__(self):
+        self.mode = None
+        self.rows = 0
+        self.columns: list | None = None
+        self.sums: dict[str, int | float] = {}
+        self.group_sums: dict[str, dict] = {}
+        self.value_counts: dict[str, dict] = {}
+
+    def update(self, df: pd.DataFrame) -> "SummaryAccumulator":
+        # 1) 모드, 행/열 정보 (모드/컬럼은 첫 청크 기준)
+        if self.columns is None:
+            self.columns = list(df.columns)
+        if self.mode is None:
+            if "mode" not in df.columns:
+                self.mode = "unknown"
+            elif len(df):
+                self.mode = df["mode"].iloc[0]
+        self.rows += int(len(df))
+
+        # 2) 공통 지표: 사고/사망/사상자 합계 (있으면 계산)
+        for key, col in _SUM_FIELDS:
+            if col in df.columns:
+                self.sums[key] = self.sums.get(key, 0) + df[col].sum()
 
-        if "연월" in df.columns:
-          stats["top_year_months"] = (
-            df["연월"].value_counts().head(5).to_dict()
-        )
+        # 3) 지역/요일별 사고건수 합
+        for key, col in _GROUP_FIELDS:
+            if col in df.columns and "accident_count" in df.columns:
+                part = df.groupby(col, observed=True)["accident_count"].sum().to_dict()
+                _add_counts(self.group_sums.setdefault(key, {}), part)
 
-    return stats
+        # 4) 돌발분류명/연월 값별 개수
+        for key, col in _COUNT_FIELDS:
+            if col in df.columns:
+                counts = df[col].value_counts(sort=False)
+                _add_counts(self.value_counts.setdefault(key, {}), counts[counts > 0].to_dict())
+        return self
+
+    def merge(self, other: "SummaryAccumulator") -> "SummaryAccumulator":
+        """other가 뒤쪽 청크라고 보고 합침 (모드/컬럼/동점 순서는 self 우선)."""
+        if self.columns is None:
+            self.columns = other.columns
+        if self.mode is None:
+            self.mode = other.mode
+        self.rows += other.rows
+        for key, value in other.sums.items():
+            self.sums[key] = self.sums.get(key, 0) + value
+        for key, totals in other.group_sums.items():
+            _add_counts(self.group_sums.setdefault(key, {}), totals)
+        for key, totals in other.value_counts.items():
+            _add_counts(self.value_counts.setdefault(key, {}), totals)
+        return self
+
+    def result(self) -> dict:
+        stats = {}
+        stats["mode"] = self.mode
+        stats["rows"] = self.rows
+        stats["columns"] = self.columns or []
+
+        for key, _ in _SUM_FIELDS:
+            if key in self.sums:
+                stats[key] = int(self.sums[key])
+        for key, totals in self.group_sums.items():
+            stats[key] = _top_n(totals, sort_keys=True)
+        for key, totals in self.value_counts.items():
+            stats[key] = _top_n(totals, sort_keys=False)
+        return stats
+
+
+def _add_counts(totals: dict, part: dict):
+    for k, v in part.items():
+        totals[k] = totals.get(k, 0) + v
+
+
+def basic_summary(df):
+    return SummaryAccumulator().update(df).result()
@@ -0,0 +1,158 @@
+from typing import List
+
+import config  # MAX_INPUT_TOKENS, CONTEXT_DEDUPE_JACCARD
+from lexical import char_ngrams
+from tokens import count_tokens, truncate_to_tokens
+
+
+PROMPT_TEMPLATE = """
+너는 교통안전 분석가다. 아래의 '데이터 요약'과 '지식 컨텍스트'를 근거로 사용자의 질문에 답해라.
+- 근거가 부족하면 "추가 데이터 필요"를 말하고 어떤 데이터가 필요한지 제시해라.
+- 출력은 한국어로, 너무 길지 않게. (핵심 8~12줄)
+- 반드시: ①핵심 위험요인 ②왜 위험한지 ③우선 대응전략(3개) ④추가로 확인할 데이터
+
+[데이터 요약]
+{stats_summary}
+
+[지식 컨텍스트]
+{context}
+
+[사용자 질문]
+{user_question}
+""".strip()
+
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+# 예산을 넘으면 앞에서부터 뺄 stats 필드 (답변 근거로 덜 쓰이는 순서)
+# 합계(total_*)와 top_regions_by_accidents는 끝까지 남긴다
+STATS_DROP_ORDER = [
+    "columns",
+    "rows",
+    "top_year_months",
+    "top_incident_types",
+    "top_weekdays_by_accidents",
+    "mode",
+]
+
+# 잘라낸 청크가 이보다 짧아지면 넣지 않음 (의미 없는 조각)
+_MIN_CHUNK_TOKENS = 20
+
+# 질문을 잘라야 할 때 최소한 남겨야 하는 토큰 수. 이보다 적게 남으면 예산 자체가 너무 작은 것
+_MIN_QUESTION_TOKENS = 16
+
+
+def _as_hits(retrieved: List) -> List[dict]:
+    """retrieve() 결과(문자열) / retrieve_hits() 결과(dict) 모두 [{"chunk", "score"}]로. 문자열은 순위가 점수."""
+    hits = []
+    for rank, r in enumerate(retrieved):
+        if isinstance(r, dict):
+            hits.append({"chunk": r["chunk"], "score": r.get("score", -rank)})
+        else:
+            hits.append({"chunk": r, "score": -rank})
+    return hits
+
+
+def dedupe_hits(hits: List[dict], threshold: float | None = None) -> List[dict]:
+    """
+    점수 높은 순으로 보면서 이미 고른 청크와 거의 같은 청크(문자 n-gram Jaccard ≥ threshold)는 제외.
+    여러 문서에 같은 문단이 들어 있으면 컨텍스트 토큰만 쓰고 정보는 늘지 않기 때문.
+    """
+    threshold = threshold if threshold is not None else getattr(config, "CONTEXT_DEDUPE_JACCARD", 0.8)
+    kept: List[dict] = []
+    kept_grams: List[set] = []
+    for h in sorted(hits, key=lambda h: h["score"], reverse=True):
+        grams = set(char_ngrams(h["chunk"]))
+        if any(len(grams & g) / max(len(grams | g), 1) >= threshold for g in kept_grams):
+            continue
+        kept.append(h)
+        kept_grams.append(grams)
+    return kept
+
+
+def build_prompt(
+    user_question: str,
+    stats_summary,
+    retrieved: List,
+    max_input_tokens: int | None = None,
+) -> tuple[str, dict]:
+    """
+    MAX_INPUT_TOKENS 안에 들어가도록 프롬프트를 만든다.
+      1) 컨텍스트 중복 제거 (점수 높은 청크 우선)
+      2) 예산 초과 시 stats에서 STATS_DROP_ORDER 순서로 필드 제거
+      3) 그래도 넘으면 점수 낮은 청크부터 제거, 마지막 청크는 남는 토큰만큼 잘라서 사용
+      4) 컨텍스트를 모두 빼도 넘으면 (질문이 아주 긴 경우) 질문을 남는 토큰만큼 잘라서 사용
+    질문에 _MIN_QUESTION_TOKENS도 남지 않으면 (템플릿 + 남은 stats만으로 예산 초과) ValueError.
+    stats_summary는 basic_summary() dict 또는 문자열, retrieved는 청크 문자열 또는 hit dict 리스트.
+    반환: (프롬프트, {"prompt_tokens", "dropped_stats", "context_chunks", "context_truncated", "question_truncated"})
+    """
+    budget = max_input_tokens or getattr(config, "MAX_INPUT_TOKENS", 2048)
+    stats = dict(stats_summary) if isinstance(stats_summary, dict) else stats_summary
+    hits = dedupe_hits(_as_hits(retrieved))
+    chunks = [h["chunk"] for h in hits]
+    dropped: List[str] = []
+    truncated = False
+
+    question_truncated = False
+
+    def render(stats, chunks, question=user_question) -> str:
+        return PROMPT_TEMPLATE.format(
+            stats_summary=stats,
+            context=CONTEXT_SEPARATOR.join(chunks),
+            user_question=question,
+        )
+
+    prompt = render(stats, chunks)
+    n_tokens = count_tokens(prompt)
+
+    # 2) 가치가 낮은 stats 필드부터 제거
+    if isinstance(stats, dict):
+        for field in STATS_DROP_ORDER:
+            if n_tokens <= budget:
+                break
+            if field in stats:
+                del stats[field]
+                dropped.append(field)
+                prompt = render(stats, chunks)
+                n_tokens = count_tokens(prompt)
+
+    # 3) 점수 낮은 청크부터 제거. 남는 토큰이 충분하면 빼는 대신 그만큼 잘라서 한 번만 넣음
+    while n_tokens > budget and chunks:
+        last = chunks.pop()
+        if not truncated:
+            room = budget - count_tokens(render(stats, chunks + [""]))
+            while room >= _MIN_CHUNK_TOKENS:
+                cut = truncate_to_tokens(last, room)
+                over = count_tokens(render(stats, chunks + [cut])) - budget
+                if over <= 0:
+                    chunks.append(cut)
+                    truncated = True
+                    break
+                room -= over  # 경계에서 토큰이 합쳐지거나 나뉘어 생긴 오차만큼 더 줄임
+        prompt = render(stats, chunks)
+        n_tokens = count_tokens(prompt)
+
+    # 4) 질문만으로 예산을 넘는 경우: 질문 앞부분만 남는 토큰만큼 사용
+    if n_tokens > budget:
+        room = budget - count_tokens(render(stats, chunks, ""))
+        while room >= _MIN_QUESTION_TOKENS:
+            question = truncate_to_tokens(user_question, room)
+            over = count_tokens(render(stats, chunks, question)) - budget
+            if over <= 0:
+                prompt = render(stats, chunks, question)
+                n_tokens = count_tokens(prompt)
+                question_truncated = True
+                break
+            room -= over
+        else:
+            raise ValueError(
+                f"MAX_INPUT_TOKENS({budget})가 너무 작음: 질문 없이 템플릿과 데이터 요약만으로 "
+                f"{count_tokens(render(stats, chunks, ''))} 토큰"
+            )
+
+    return prompt, {
+        "prompt_tokens": n_tokens,
+        "dropped_stats": dropped,
+        "context_chunks": len(chunks),
+        "context_truncated": truncated,
+        "question_truncated": question_truncated,
+    }
@@ -1,153 +1,772 @@
 import os
 import json
-from typing import List
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Iterator, List
 
 import numpy as np
 import faiss
 from openai import OpenAI
 
-import config  # EMBEDDING_MODEL, CHAT_MODEL, CHUNK_SIZE, TOP_K, TEMPERATURE, INDEX_PATH, META_PATH
+import config  # EMBEDDING_BACKEND, CHAT_MODEL, CHUNK_SIZE, TOP_K, TEMPERATURE, INDEX_PATH, META_PATH
+from chunker import chunk_text
+from embed_cache import EmbeddingCache
+from answer_cache import AnswerCache, answer_cache_key
+from embedding_backends import EmbeddingBackend, get_embedding_backend, get_openai_client
+from vector_index import build_index, configure_search, is_lossy, supports_remove
+from lexical import BM25Index, reciprocal_rank_fusion
+from chunk_store import ChunkStore
+from prompt_builder import build_prompt
+from tracing import Trace
 
 
-def _chunk_text(text: str, chunk_size: int | None = None) -> List[str]:
-    """
-    긴 텍스트를 chunk_size 단위로 잘라 리스트로 반환.
-    chunk_size가 None이면 config.CHUNK_SIZE를 사용.
-    """
-    if chunk_size is None:
-        chunk_size = getattr(config, "CHUNK_SIZE", 200)
+_executor_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
+
+# 검색에서 임베딩한 최근 질문 벡터 수 (답변 캐시 조회에 재사용)
+_QUERY_VECTOR_MEMO = 256
+
+# 질문 벡터가 없을 때(lexical 검색) 답변 캐시 항목의 벡터. 버킷 키에 질문 원문을 넣어 정확히 같은 질문만 적중
+_EXACT_QUESTION_VEC = np.ones(1, dtype="float32")
 
-    text = text.replace("\r\n", "\n").strip()
-    if not text:
-        return []
 
-    chunks: List[str] = []
-    for i in range(0, len(text), chunk_size):
-        chunk = text[i : i + chunk_size].strip()
-        if chunk:
-            chunks.append(chunk)
+def get_executor() -> ThreadPoolExecutor:
+    """retrieve_async / answer_async가 쓰는 프로세스 공유 스레드 풀. 처음 필요할 때 생성."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(config, "ENGINE_WORKERS", 4),
+                    thread_name_prefix="rag",
+                )
+    return _executor
 
-    return chunks
+
+def _atomic_write_json(path: str, obj):
+    """JSON을 임시 파일에 쓴 뒤 os.replace로 교체 (읽는 쪽이 반쯤 쓰인 파일을 보지 않도록)."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
 
 
 class RAGEngine:
-    def __init__(self, index_path: str | None = None, meta_path: str | None = None):
-        # OpenAI 클라이언트 설정
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    def __init__(
+        self,
+        index_path: str | None = None,
+        meta_path: str | None = None,
+        manifest_path: str | None = None,
+        info_path: str | None = None,
+        store_path: str | None = None,
+        client: OpenAI | None = None,
+        embed_cache: EmbeddingCache | None = None,
+        answer_cache: AnswerCache | None = None,
+        embedder: EmbeddingBackend | None = None,
+        index_type: str | None = None,
+        chunk_size: int | None = None,
+        chunk_overlap: int | None = None,
+    ):
+        # OpenAI 클라이언트는 실제로 LLM/임베딩 API를 부를 때 생성 (미지정 시 프로세스 공유 클라이언트)
+        self._client = client
 
         # 모델 / 설정값은 config에서 통일 관리
-        self.embed_model = config.EMBEDDING_MODEL
+        self.embedder = embedder or get_embedding_backend(client=client)
         self.chat_model = config.CHAT_MODEL
+        self.index_type = index_type or getattr(config, "INDEX_TYPE", "flat")
+        self.chunk_size = chunk_size or config.CHUNK_SIZE
+        self.chunk_overlap = getattr(config, "CHUNK_OVERLAP", 0) if chunk_overlap is None else chunk_overlap
 
-        # 인덱스/메타 파일 경로
+        # 인덱스/청크 저장소 파일 경로 (meta_path는 예전 meta.json → chunks.sqlite 이전용)
         self.index_path = index_path or config.INDEX_PATH
+        self.store_path = store_path or config.CHUNK_STORE_PATH
         self.meta_path = meta_path or config.META_PATH
+        self.manifest_path = manifest_path or config.MANIFEST_PATH
+        self.info_path = info_path or config.INDEX_INFO_PATH
 
         self.index: faiss.Index | None = None
-        self.meta: list[dict] = []
+        self.store: ChunkStore | None = None
+        self.lexical: BM25Index | None = None
+        self.manifest: dict | None = None
+
+        # 검색 때 만든 질문 벡터 (질문 → 정규화 벡터, 최근 것만). 답변 캐시 조회에서 다시 임베딩하지 않도록
+        self._query_vectors: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._query_vectors_lock = threading.Lock()
+
+        # 임베딩 디스크 캐시 (같은 청크/질문은 API를 다시 호출하지 않음)
+        cache_path = getattr(config, "EMBED_CACHE_PATH", None)
+        self.embed_cache: EmbeddingCache | None = embed_cache
+        if self.embed_cache is None and cache_path:
+            self.embed_cache = EmbeddingCache(
+                cache_path,
+                max_entries=getattr(config, "EMBED_CACHE_MAX_ENTRIES", 100_000),
+            )
+
+        # 답변 디스크 캐시 (같은 데이터/컨텍스트에서 거의 같은 질문이면 LLM을 다시 호출하지 않음)
+        answer_cache_path = getattr(config, "ANSWER_CACHE_PATH", None)
+        self.answer_cache: AnswerCache | None = answer_cache
+        if self.answer_cache is None and answer_cache_path:
+            self.answer_cache = AnswerCache(
+                answer_cache_path,
+                max_entries=getattr(config, "ANSWER_CACHE_MAX_ENTRIES", 5000),
+                ttl_sec=getattr(config, "ANSWER_CACHE_TTL_SEC", 24 * 3600),
+                threshold=getattr(config, "ANSWER_CACHE_SIMILARITY", 0.95),
+            )
+
+    @property
+    def client(self) -> OpenAI:
+        return self._client or get_openai_client()
+
+    @client.setter
+    def client(self, value: OpenAI):
+        self._client = value
 
     def build_from_text_files(self, file_paths: List[str]):
         """
-        여러 텍스트 파일을 읽어 chunking → 임베딩 → FAISS 인덱스 생성.
-        ingest.py에서 사용할 함수.
+        여러 텍스트 파일을 읽어 chunking → 임베딩 → FAISS 인덱스 생성. (전체 재구축)
+        ingest.py --rebuild 에서 사용할 함수.
         """
-        texts: List[str] = []
-        for p in file_paths:
-            with open(p, "r", encoding="utf-8") as f:
-                texts.append(f.read())
-
-        chunks: List[str] = []
-        for t in texts:
-            chunks.extend(_chunk_text(t, chunk_size=config.CHUNK_SIZE))
+        docs = self._read_files(file_paths)
+
+        self._open_store()
+        # 청크 ID는 재구축해도 0부터 다시 매기지 않고 이어서 매긴다.
+        # 실행 중인 엔진은 새 인덱스로 재로드하기 전까지 예전 인덱스의 ID로 저장소를 조회하므로
+        # ID를 재사용하면 예전 ID가 전혀 다른 새 청크 텍스트로 연결된다.
+        prev = self._load_manifest() or {}
+        next_id = max(prev.get("next_id", 0), self.store.max_id() + 1)
+        self.index = None
+        self.store.clear()
+        self.manifest = {"files": {}, "next_id": next_id}
+        try:
+            self._add_files(docs)
+            if len(self.store) == 0:
+                raise ValueError("생성된 청크가 없습니다. 입력 텍스트를 확인해주세요.")
+            self._save()
+        except BaseException:
+            self.store.rollback()
+            raise
+
+    def update_from_text_files(self, file_paths: List[str]) -> dict:
+        """
+        manifest(파일별 해시/청크 ID)와 비교해 바뀐 파일만 다시 인덱싱. (증분 ingest)
+        - 내용이 바뀐 파일: 기존 청크 삭제 후 다시 추가
+        - 새 파일: 추가
+        - 목록에서 사라진 파일: 청크 삭제
+        기존 인덱스/manifest가 없거나 ID 매핑이 없는 예전 인덱스면 전체 재구축.
+        반환값: {"added": [...], "changed": [...], "deleted": [...], "unchanged": [...]}
+        """
+        info = self._load_info() or {}
+        if info.get("embedding_backend") not in (None, self.embedder.backend_id):
+            # 다른 임베딩 백엔드로 만든 인덱스와는 벡터를 섞을 수 없음 → 전체 재구축
+            self.manifest = None
+        elif info.get("index_type", "flat") != self.index_type:
+            # 인덱스 타입(flat/hnsw/ivf...)이 바뀌면 학습부터 다시 → 전체 재구축
+            self.manifest = None
+        elif info.get("pca_dim", 0) != getattr(config, "INDEX_PCA_DIM", 0):
+            # PCA 차원이 바뀌면 인덱스 벡터 공간 자체가 달라짐 → 전체 재구축
+            self.manifest = None
+        elif (info.get("chunk_size"), info.get("chunk_overlap")) != (self.chunk_size, self.chunk_overlap):
+            # 청크 기준이 바뀌면 변경되지 않은 파일도 청크가 달라짐 → 전체 재구축
+            self.manifest = None
+        else:
+            try:
+                self.load()
+                self.manifest = self._load_manifest()
+            except (FileNotFoundError, ValueError):
+                # 인덱스가 없거나 현재 임베딩과 차원이 다른 예전 인덱스 → 전체 재구축
+                self.manifest = None
+
+        if self.manifest is None:
+            self.build_from_text_files(file_paths)
+            return {
+                "added": sorted(self.manifest["files"]),
+                "changed": [],
+                "deleted": [],
+                "unchanged": [],
+                "rebuilt": True,
+            }
+
+        docs = self._read_files(file_paths)
+        old_files = self.manifest["files"]
+
+        added = [p for p in docs if p not in old_files]
+        changed = [p for p in docs if p in old_files and old_files[p]["sha256"] != docs[p][0]]
+        deleted = [p for p in old_files if p not in docs]
+        unchanged = [p for p in docs if p in old_files and p not in changed]
+
+        if added or changed or deleted:
+            stale_ids: set[int] = set()
+            for p in changed + deleted:
+                stale_ids.update(old_files.pop(p)["chunk_ids"])
+            # 중복 제거로 다른 파일과 공유 중인 청크는 남겨둔다
+            for entry in old_files.values():
+                stale_ids.difference_update(entry["chunk_ids"])
+            try:
+                self._remove_ids(sorted(stale_ids))
+                self._add_files({p: docs[p] for p in added + changed})
+                self._save()
+            except BaseException:
+                self.store.rollback()
+                raise
+
+        return {
+            "added": added,
+            "changed": changed,
+            "deleted": deleted,
+            "unchanged": unchanged,
+            "rebuilt": False,
+        }
 
-        if not chunks:
-            raise ValueError("생성된 청크가 없습니다. 입력 텍스트를 확인해주세요.")
+    def load(self):
+        """
+        저장된 FAISS 인덱스를 로드하고 청크 저장소를 연다. (청크 텍스트는 검색 시 필요한 것만 조회)
+        app.py에서 RAGEngine() 생성 후 바로 호출.
+        """
+        has_store = os.path.exists(self.store_path) or os.path.exists(self.meta_path)
+        if not os.path.exists(self.index_path) or not has_store:
+            raise FileNotFoundError("인덱스/청크 저장소가 없음. 먼저 ingest.py 실행 필요")
+
+        info = self._load_info()
+        built_with = (info or {}).get("embedding_backend")
+        if built_with is not None and built_with != self.embedder.backend_id:
+            raise ValueError(
+                f"인덱스는 '{built_with}' 임베딩으로 생성됨 (현재 설정: '{self.embedder.backend_id}'). "
+                "config.EMBEDDING_BACKEND를 맞추거나 `python ingest.py --rebuild` 실행 필요"
+            )
+
+        index = faiss.read_index(self.index_path)
+        if info is None:
+            # 버전 스탬프가 없는 예전 인덱스: 만든 백엔드 이름은 모르므로 벡터 차원으로 확인
+            expected = self.embedder.dim
+            if expected is not None and expected != index.d:
+                raise ValueError(
+                    f"인덱스는 {index.d}차원 임베딩으로 생성됨 "
+                    f"(현재 설정: '{self.embedder.backend_id}', {expected}차원). "
+                    "config.EMBEDDING_BACKEND를 맞추거나 `python ingest.py --rebuild` 실행 필요"
+                )
+        self.index = index
+        configure_search(self.index)
+
+        if os.path.exists(self.store_path):
+            self._open_store()
+        else:
+            self._migrate_meta_json()
+
+    # ------------------------------------------------------------------
+    # 인덱스 구축/갱신 내부 함수
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _read_files(file_paths: List[str]) -> dict:
+        """파일 경로 → (sha256, 텍스트) 딕셔너리. manifest 키로 쓰이므로 경로를 정규화."""
+        docs: dict[str, tuple[str, str]] = {}
+        for p in file_paths:
+            with open(p, "rb") as f:
+                raw = f.read()
+            docs[os.path.normpath(p)] = (hashlib.sha256(raw).hexdigest(), raw.decode("utf-8"))
+        return docs
 
-        vectors = self._embed(chunks)
-        dim = vectors.shape[1]
+    def _add_files(self, docs: dict):
+        """
+        파일들을 chunking → 임베딩하여 새 청크 ID로 인덱스/메타/manifest에 추가.
+        이미 있는 청크와 내용이 같은 청크는 새로 추가하지 않고 기존 ID를 공유한다.
+        """
+        next_id = self.manifest["next_id"]
+        chunks_by_path = {
+            path: chunk_text(text, chunk_size=self.chunk_size, overlap=self.chunk_overlap)
+            for path, (_, text) in docs.items()
+        }
+        id_by_text = self.store.find_ids([c["chunk"] for cs in chunks_by_path.values() for c in cs])
+        new_entries: List[dict] = []
+
+        for path, (sha, _) in docs.items():
+            ids: List[int] = []
+            for c in chunks_by_path[path]:
+                chunk_id = id_by_text.get(c["chunk"])
+                if chunk_id is None:
+                    chunk_id = next_id
+                    next_id += 1
+                    id_by_text[c["chunk"]] = chunk_id
+                    new_entries.append({"id": chunk_id, "source": path, **c})
+                if chunk_id not in ids:
+                    ids.append(chunk_id)
+
+            self.manifest["files"][path] = {"sha256": sha, "chunk_ids": ids}
+
+        self.manifest["next_id"] = next_id
+        if not new_entries:
+            return
+
+        new_chunks = [e["chunk"] for e in new_entries]
+        new_ids = [e["id"] for e in new_entries]
+
+        vectors = self._embed(new_chunks)
 
         # Inner Product + L2 Normalize → cosine 유사도와 동일
-        self.index = faiss.IndexFlatIP(dim)
+        # 첫 추가 시 config.INDEX_TYPE 인덱스를 생성/학습, 이후에는 청크 ID로 추가
         faiss.normalize_L2(vectors)
-        self.index.add(vectors)
-
-        self.meta = [{"chunk": c} for c in chunks]
-
-        # 저장
+        ids = np.array(new_ids, dtype="int64")
+        if self.index is None:
+            self.index = build_index(vectors, ids, self.index_type)
+        else:
+            self.index.add_with_ids(vectors, ids)
+
+        # 청크 텍스트 + 출처 파일/원문 offset + BM25 역색인 + 원본 벡터(재정렬용) (commit은 _save에서)
+        self.store.add_many(new_entries, vectors)
+
+    def _remove_ids(self, ids: List[int]):
+        if not ids:
+            return
+        self.store.delete_many(ids)
+
+        if supports_remove(self.index):
+            self.index.remove_ids(np.array(ids, dtype="int64"))
+            return
+
+        # 삭제를 지원하지 않는 인덱스(HNSW)는 남은 청크로 재구축
+        # 벡터는 저장소에 보관된 정규화 벡터를 그대로 사용 (벡터가 없는 예전 청크만 다시 임베딩)
+        self.index = None
+        remaining = list(self.store.iter_chunks())
+        if remaining:
+            ids_left = [cid for cid, _ in remaining]
+            stored = self.store.get_vectors(ids_left)
+            missing = [(cid, chunk) for cid, chunk in remaining if cid not in stored]
+            if missing:
+                embedded = self._embed([chunk for _, chunk in missing])
+                faiss.normalize_L2(embedded)
+                stored.update({cid: embedded[row] for row, (cid, _) in enumerate(missing)})
+            vectors = np.stack([stored[cid] for cid in ids_left]).astype("float32")
+            self.index = build_index(vectors, np.array(ids_left, dtype="int64"), self.index_type)
+
+    def _open_store(self):
+        if self.store is None:
+            self.store = ChunkStore(self.store_path)
+            self.lexical = BM25Index(self.store)
+
+    def _migrate_meta_json(self):
+        """예전 meta.json(청크 리스트)을 chunks.sqlite로 한 번 옮긴다. (id가 없으면 순번이 ID)"""
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        self._open_store()
+        self.store.add_many([{**m, "id": m.get("id", i)} for i, m in enumerate(meta)])
+        self.store.commit()
+
+    def _load_info(self) -> dict | None:
+        if not os.path.exists(self.info_path):
+            return None
+        with open(self.info_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _load_manifest(self) -> dict | None:
+        if not os.path.exists(self.manifest_path):
+            return None
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save(self):
+        """인덱스/메타/manifest 저장. 임시 파일에 쓴 뒤 교체해서 중간 상태가 남지 않게 한다."""
         os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
-        faiss.write_index(self.index, self.index_path)
-        with open(self.meta_path, "w", encoding="utf-8") as f:
-            json.dump(self.meta, f, ensure_ascii=False, indent=2)
 
-    def load(self):
+        # 청크 저장소는 트랜잭션 commit으로 한 번에 반영. 인덱스 교체보다 먼저 commit되므로
+        # 재로드 전까지 실행 중인 엔진은 예전 인덱스 + 새 저장소로 검색한다.
+        # 청크 ID는 재구축/증분 모두 재사용하지 않으므로(_add_files, build_from_text_files)
+        # 예전 ID는 지워진 청크를 가리킬 뿐이고, 검색 쪽은 저장소에 없는 ID를 건너뛴다
+        # (그 사이 결과가 잠깐 적어질 수는 있어도 다른 청크 텍스트가 섞이지는 않음).
+        self.store.commit()
+
+        tmp_index = self.index_path + ".tmp"
+        faiss.write_index(self.index, tmp_index)
+        os.replace(tmp_index, self.index_path)
+
+        _atomic_write_json(self.manifest_path, self.manifest)
+
+        # 버전 스탬프는 항상 마지막에 기록 → SharedRAGEngine이 이 파일 변경을 보고 재로드
+        _atomic_write_json(
+            self.info_path,
+            {
+                "version": uuid.uuid4().hex,
+                "built_at": datetime.now().isoformat(),
+                "num_chunks": len(self.store),
+                "embedding_backend": self.embedder.backend_id,
+                "dim": int(self.index.d),
+                "index_type": self.index_type,
+                "pca_dim": getattr(config, "INDEX_PCA_DIM", 0),
+                "chunk_size": self.chunk_size,
+                "chunk_overlap": self.chunk_overlap,
+            },
+        )
+
+    def retrieve(
+        self,
+        query: str,
+        k: int | None = None,
+        mode: str | None = None,
+        trace: Trace | None = None,
+    ) -> List[str]:
+        """retrieve_hits()에서 청크 텍스트만 꺼낸 리스트."""
+        return [h["chunk"] for h in self.retrieve_hits(query, k=k, mode=mode, trace=trace)]
+
+    def retrieve_hits(
+        self,
+        query: str,
+        k: int | None = None,
+        mode: str | None = None,
+        trace: Trace | None = None,
+    ) -> List[dict]:
         """
-        저장된 FAISS 인덱스와 메타 정보를 로드.
-        app.py에서 RAGEngine() 생성 후 바로 호출.
+        쿼리와 관련된 상위 k개 청크를 검색. [{"id", "chunk", "source", "score"}, ...] 점수 내림차순
+        (score는 dense면 cosine, lexical이면 BM25, hybrid면 RRF 점수)
+        k가 None이면 config.TOP_K, mode가 None이면 config.RETRIEVER 사용.
+          - "dense": 쿼리 임베딩 → FAISS 검색
+          - "lexical": 문자 n-gram BM25 (임베딩/네트워크 불필요)
+          - "hybrid": 두 결과를 RRF(reciprocal rank fusion)로 합침
+        trace를 넘기면 embed_query / faiss_search / lexical_search 구간 시간이 기록된다.
+        """
+        k = k or config.TOP_K
+        mode = mode or getattr(config, "RETRIEVER", "dense")
+        trace = trace or Trace()
+
+        if mode == "dense":
+            hits = self._dense_search(query, k, trace)
+        elif mode == "lexical":
+            with trace.span("lexical_search"):
+                hits = self.lexical.search(query, k)
+        elif mode == "hybrid":
+            # 각 검색기에서 k보다 넉넉히 뽑아 합친 뒤 상위 k개만 사용
+            n = k * getattr(config, "HYBRID_CANDIDATES_MULT", 3)
+            dense_hits = self._dense_search(query, n, trace)
+            with trace.span("lexical_search"):
+                lexical_hits = self.lexical.search(query, n)
+            hits = reciprocal_rank_fusion(
+                [dense_hits, lexical_hits],
+                rrf_k=getattr(config, "RRF_K", 60),
+            )[:k]
+        else:
+            raise ValueError(f"알 수 없는 RETRIEVER: {mode} (dense / lexical / hybrid)")
+
+        # 필요한 k개 청크만 저장소에서 ID로 조회
+        rows = self.store.get_many([i for i, _ in hits])
+        return [
+            {"id": i, "chunk": rows[i]["chunk"], "source": rows[i]["source"], "score": score}
+            for i, score in hits
+            if i in rows
+        ]
+
+    def retrieve_async(
+        self,
+        query: str,
+        k: int | None = None,
+        mode: str | None = None,
+        trace: Trace | None = None,
+    ) -> "Future[List[dict]]":
         """
-        if not os.path.exists(self.index_path) or not os.path.exists(self.meta_path):
-            raise FileNotFoundError("인덱스/메타가 없음. 먼저 ingest.py 실행 필요")
+        retrieve_hits()를 스레드 풀에서 실행하고 Future를 반환.
+        쿼리 임베딩/검색은 업로드 파일과 무관하므로 파일 파싱/요약과 겹쳐서 돌릴 수 있다.
+        trace에는 실제 검색에 걸린 시간이 retrieval 구간으로 기록된다.
+        """
+        trace = trace or Trace()
 
-        self.index = faiss.read_index(self.index_path)
-        with open(self.meta_path, "r", encoding="utf-8") as f:
-            self.meta = json.load(f)
+        def run() -> List[dict]:
+            with trace.span("retrieval"):
+                return self.retrieve_hits(query, k=k, mode=mode, trace=trace)
 
-    def retrieve(self, query: str, k: int | None = None) -> List[str]:
+        return get_executor().submit(run)
+
+    def _dense_search(self, query: str, k: int, trace: Trace | None = None) -> List[tuple[int, float]]:
         """
-        쿼리 문장을 임베딩하여 FAISS 인덱스에서 상위 k개 청크를 검색.
-        k가 None이면 config.TOP_K 사용.
+        쿼리 임베딩 → FAISS 검색. [(청크 ID, cosine 점수), ...]
+        양자화/PCA 인덱스는 k × RERANK_CANDIDATES_MULT개 후보를 뽑아 저장소의 원본 벡터로 다시 채점.
         """
         if self.index is None:
             raise RuntimeError("인덱스가 로드되지 않았습니다. 먼저 load()를 호출하세요.")
+        trace = trace or Trace()
 
-        k = k or config.TOP_K
-
-        qv = self._embed([query])
+        with trace.span("embed_query"):
+            qv = self._embed([query], trace)
         faiss.normalize_L2(qv)
-        scores, idx = self.index.search(qv, k)
-
-        results: List[str] = []
-        for i in idx[0]:
-            if i == -1:
-                continue
-            results.append(self.meta[i]["chunk"])
-        return results
-
-    def answer(self, user_question: str, stats_summary: str, retrieved_chunks: List[str]) -> str:
+        self._remember_query_vector(query, qv[0])
+
+        rerank = getattr(config, "EXACT_RERANK", True) and is_lossy(self.index)
+        n = k * getattr(config, "RERANK_CANDIDATES_MULT", 4) if rerank else k
+        with trace.span("faiss_search"):
+            scores, idx = self.index.search(qv, n)
+        hits = [(int(i), float(sc)) for sc, i in zip(scores[0], idx[0]) if i != -1]
+
+        if rerank and hits:
+            with trace.span("rerank"):
+                hits = self._rerank(qv[0], hits)
+        return hits[:k]
+
+    def _remember_query_vector(self, query: str, qv: np.ndarray):
+        with self._query_vectors_lock:
+            self._query_vectors[query] = qv
+            self._query_vectors.move_to_end(query)
+            while len(self._query_vectors) > _QUERY_VECTOR_MEMO:
+                self._query_vectors.popitem(last=False)
+
+    def _query_vector(self, query: str) -> np.ndarray | None:
+        with self._query_vectors_lock:
+            return self._query_vectors.get(query)
+
+    def _rerank(self, qv: np.ndarray, hits: List[tuple[int, float]]) -> List[tuple[int, float]]:
+        """후보를 원본 벡터와의 정확한 cosine으로 재정렬. 벡터가 없는 예전 저장소면 그대로 반환."""
+        vecs = self.store.get_vectors([i for i, _ in hits])
+        if len(vecs) < len(hits):
+            return hits
+        ids = [i for i, _ in hits]
+        exact = np.stack([vecs[i] for i in ids]) @ qv
+        order = np.argsort(-exact, kind="stable")
+        return [(ids[j], float(exact[j])) for j in order]
+
+    def answer(
+        self,
+        user_question: str,
+        stats_summary: dict | str,
+        retrieved_chunks: List,
+        trace: Trace | None = None,
+    ) -> str:
         """
         데이터 요약 + 검색된 컨텍스트 + 사용자 질문을 합쳐
         LLM에게 질의하고 한국어 답변을 생성.
+        프롬프트는 MAX_INPUT_TOKENS, 출력은 MAX_OUTPUT_TOKENS 이내로 제한. (prompt_builder.build_prompt)
+        retrieved_chunks는 retrieve() 결과(문자열) 또는 retrieve_hits() 결과(점수 포함 dict).
+        답변 캐시에 비슷한 질문이 있으면 LLM 호출 없이 그 답변을 반환.
         """
-        context = "\n\n---\n\n".join(retrieved_chunks)
-
-        prompt = f"""
-너는 교통안전 분석가다. 아래의 '데이터 요약'과 '지식 컨텍스트'를 근거로 사용자의 질문에 답해라.
-- 근거가 부족하면 "추가 데이터 필요"를 말하고 어떤 데이터가 필요한지 제시해라.
-- 출력은 한국어로, 너무 길지 않게. (핵심 8~12줄)
-- 반드시: ①핵심 위험요인 ②왜 위험한지 ③우선 대응전략(3개) ④추가로 확인할 데이터
-
-[데이터 요약]
-{stats_summary}
+        trace = trace or Trace()
+        bucket, qvec, cached = self._lookup_answer(user_question, stats_summary, retrieved_chunks, trace)
+        if cached is not None:
+            return cached
 
-[지식 컨텍스트]
-{context}
-
-[사용자 질문]
-{user_question}
-""".strip()
+        prompt, _ = build_prompt(user_question, stats_summary, retrieved_chunks)
 
         resp = self.client.chat.completions.create(
             model=self.chat_model,
             messages=[{"role": "user", "content": prompt}],
             temperature=config.TEMPERATURE,
-            # 필요하면 출력 길이도 통제 가능
-            # max_tokens=getattr(config, "MAX_OUTPUT_TOKENS", 400),
+            max_tokens=getattr(config, "MAX_OUTPUT_TOKENS", 400),
         )
-        return resp.choices[0].message.content.strip()
-
-    def _embed(self, texts: List[str]) -> np.ndarray:
+        answer = resp.choices[0].message.content.strip()
+        if self.answer_cache is not None:
+            self.answer_cache.put(bucket, user_question, qvec, answer)
+        return answer
+
+    def _lookup_answer(
+        self,
+        user_question: str,
+        stats_summary: dict | str,
+        retrieved_chunks: List,
+        trace: Trace,
+    ) -> tuple[str | None, np.ndarray | None, str | None]:
+        """
+        답변 캐시 조회. (버킷 키, 질문 벡터, 캐시된 답변 또는 None) — 캐시가 꺼져 있으면 모두 None.
+        질문 벡터는 검색(dense/hybrid) 때 만든 것을 재사용하고, 없으면(lexical 검색) 임베딩을 새로 부르지 않고
+        질문 원문을 버킷 키에 넣어 정확히 같은 질문만 찾는다.
+        """
+        if self.answer_cache is None:
+            return None, None, None
+
+        with trace.span("answer_cache"):
+            # 프롬프트/출력 설정이 바뀌면 다른 답변이 나오므로 키에 포함
+            settings = "|".join(
+                str(getattr(config, name, "")) for name in ("TEMPERATURE", "MAX_INPUT_TOKENS", "MAX_OUTPUT_TOKENS")
+            )
+            qvec = self._query_vector(user_question)
+            if qvec is None:
+                settings += "|question=" + user_question
+                qvec = _EXACT_QUESTION_VEC
+            bucket = answer_cache_key(self.chat_model, stats_summary, retrieved_chunks, extra=settings)
+            cached = self.answer_cache.get(bucket, qvec)
+
+        trace.incr("answer_cache_hits" if cached is not None else "answer_cache_misses")
+        return bucket, qvec, cached
+
+    def answer_async(self, user_question: str, stats_summary: dict | str, retrieved_chunks: List) -> "Future[str]":
+        """answer()를 스레드 풀에서 실행하고 Future를 반환. (스트리밍이 필요 없는 배치/평가용)"""
+        return get_executor().submit(self.answer, user_question, stats_summary, retrieved_chunks)
+
+    def answer_stream(
+        self,
+        user_question: str,
+        stats_summary: dict | str,
+        retrieved_chunks: List,
+        metrics: dict | None = None,
+        trace: Trace | None = None,
+    ) -> Iterator[str]:
+        """
+        answer()의 스트리밍 버전. 생성되는 토큰 조각을 순서대로 yield.
+        metrics 딕셔너리를 넘기면 스트림이 끝난 뒤 아래 값이 채워진다.
+          - ttft_ms: 첫 토큰까지 걸린 시간
+          - llm_ms: 전체 응답 시간
+          - output_tokens: 출력 토큰 수 (API usage 기준, 없으면 스트림 조각 수)
+          - tokens_per_sec: 첫 토큰 이후 초당 출력 토큰 수
+        trace를 넘기면 prompt_build / llm_ttft / llm 구간과 prompt_tokens / output_tokens,
+        프롬프트 예산 적용 결과(context_chunks, stats_fields_dropped, context_truncated, question_truncated),
+        답변 캐시 적중 여부(answer_cache_hits / answer_cache_misses)가 기록된다.
+        캐시 적중 시에는 캐시된 답변을 한 번에 yield (output_tokens = 0).
+        """
+        trace = trace or Trace()
+        start = time.perf_counter()
+        bucket, qvec, cached = self._lookup_answer(user_question, stats_summary, retrieved_chunks, trace)
+        if cached is not None:
+            yield cached
+            if metrics is not None:
+                metrics["ttft_ms"] = metrics["llm_ms"] = int((time.perf_counter() - start) * 1000)
+                metrics["output_tokens"] = 0
+                metrics["tokens_per_sec"] = None
+            return
+
+        with trace.span("prompt_build"):
+            prompt, budget = build_prompt(user_question, stats_summary, retrieved_chunks)
+        trace.set("prompt_tokens_est", budget["prompt_tokens"])
+        trace.set("context_chunks", budget["context_chunks"])
+        trace.set("stats_fields_dropped", len(budget["dropped_stats"]))
+        trace.set("context_truncated", int(budget["context_truncated"]))
+        trace.set("question_truncated", int(budget["question_truncated"]))
+
+        start = time.perf_counter()
+        first_token_at: float | None = None
+        n_pieces = 0
+        usage = None
+        pieces: List[str] = []
+
+        stream = self.client.chat.completions.create(
+            model=self.chat_model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=config.TEMPERATURE,
+            max_tokens=getattr(config, "MAX_OUTPUT_TOKENS", 400),
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        for event in stream:
+            # include_usage를 켜면 마지막 이벤트는 choices 없이 usage만 담겨 온다
+            if getattr(event, "usage", None) is not None:
+                usage = event.usage
+            if not event.choices:
+                continue
+            piece = event.choices[0].delta.content
+            if not piece:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            n_pieces += 1
+            pieces.append(piece)
+            yield piece
+
+        end = time.perf_counter()
+        # 스트림을 끝까지 받은 경우에만 캐시 (중간에 끊기면 여기까지 오지 않음)
+        if self.answer_cache is not None and pieces:
+            self.answer_cache.put(bucket, user_question, qvec, "".join(pieces).strip())
+
+        output_tokens = usage.completion_tokens if usage is not None else n_pieces
+        trace.add_span("llm_ttft", ((first_token_at or end) - start) * 1000)
+        trace.add_span("llm", (end - start) * 1000)
+        trace.set("output_tokens", int(output_tokens))
+        if usage is not None:
+            trace.set("prompt_tokens", int(usage.prompt_tokens))
+
+        if metrics is not None:
+            gen_sec = end - first_token_at if first_token_at is not None else 0.0
+            metrics["ttft_ms"] = int(((first_token_at or end) - start) * 1000)
+            metrics["llm_ms"] = int((end - start) * 1000)
+            metrics["output_tokens"] = int(output_tokens)
+            metrics["tokens_per_sec"] = round(output_tokens / gen_sec, 1) if gen_sec > 0 else None
+
+    def _embed(self, texts: List[str], trace: Trace | None = None) -> np.ndarray:
         """
         텍스트 리스트를 임베딩 벡터(np.ndarray)로 변환.
+        캐시에 있는 텍스트는 재사용하고, 없는 텍스트만 배치로 임베딩 백엔드에 요청한 뒤 캐시에 채운다.
+        trace를 넘기면 embed_cache_hits / embed_cache_misses가 누적된다.
         """
-        resp = self.client.embeddings.create(model=self.embed_model, input=texts)
-        vecs = np.array([d.embedding for d in resp.data], dtype="float32")
-        return vecs
+        cache_key = self.embedder.backend_id
+        if self.embed_cache is not None:
+            cached = self.embed_cache.get_many(cache_key, texts)
+        else:
+            cached = [None] * len(texts)
+
+        # 캐시 미스 텍스트 (중복 제거, 순서 유지)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+        if trace is not None:
+            trace.incr("embed_cache_hits", len(texts) - sum(v is None for v in cached))
+            trace.incr("embed_cache_misses", len(missing))
+        fresh: dict[str, np.ndarray] = {}
+        if missing:
+            vecs = self.embedder.embed(missing)
+            if self.embed_cache is not None:
+                self.embed_cache.put_many(cache_key, missing, vecs)
+            fresh = dict(zip(missing, vecs))
+
+        rows = [v if v is not None else fresh[t] for t, v in zip(texts, cached)]
+        return np.array(rows, dtype="float32")
+
+
+class SharedRAGEngine:
+    """
+    프로세스 전체에서 RAGEngine 하나를 공유하기 위한 래퍼. (Streamlit st.cache_resource 용)
+    - get()은 인덱스/버전 스탬프 파일의 (mtime, size)가 바뀌었을 때만 새로 로드
+    - 새 엔진을 완전히 로드한 뒤 참조를 교체하므로, 요청 중인 쪽은 기존 엔진을 그대로 사용
+    - 임베딩 백엔드/임베딩·답변 캐시는 재로드 사이에 재사용 (OpenAI 클라이언트는 프로세스 공유)
+      engine_kwargs로 넘기면 그 객체를 사용 (KB 샤드끼리 공유할 때, kb_shards.ShardedRAGEngine)
+    """
+
+    # ingest가 파일을 쓰는 도중에 읽었을 때 재시도 횟수
+    _MAX_LOAD_ATTEMPTS = 3
+
+    def __init__(self, **engine_kwargs):
+        self._engine_kwargs = engine_kwargs
+        self._lock = threading.Lock()
+        self._engine: RAGEngine | None = None
+        self._stamp: tuple | None = None
+
+        probe = RAGEngine(**engine_kwargs)
+        self._paths = (probe.info_path, probe.index_path)
+        self._embed_cache = probe.embed_cache
+        self._answer_cache = probe.answer_cache
+        self._embedder = probe.embedder
+
+    def _current_stamp(self) -> tuple:
+        stamp = []
+        for p in self._paths:
+            try:
+                st = os.stat(p)
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def get(self) -> RAGEngine:
+        """최신 인덱스가 로드된 RAGEngine 반환. 인덱스가 없으면 FileNotFoundError."""
+        stamp = self._current_stamp()
+        engine = self._engine
+        if engine is not None and stamp == self._stamp:
+            return engine
+
+        with self._lock:
+            # 다른 스레드가 먼저 재로드했을 수 있으므로 다시 확인
+            stamp = self._current_stamp()
+            if self._engine is not None and stamp == self._stamp:
+                return self._engine
+
+            for _ in range(self._MAX_LOAD_ATTEMPTS):
+                engine = RAGEngine(
+                    **{
+                        **self._engine_kwargs,
+                        "embed_cache": self._embed_cache,
+                        "answer_cache": self._answer_cache,
+                        "embedder": self._embedder,
+                    }
+                )
+                engine.load()
+                after = self._current_stamp()
+                if after == stamp:
+                    break
+                # 로드 중에 ingest가 파일을 교체함 → 새 스탬프 기준으로 다시 로드
+                stamp = after
+                time.sleep(0.05)
+
+            self._engine, self._stamp = engine, stamp
+            return engine
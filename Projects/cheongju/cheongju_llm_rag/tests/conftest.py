@@ -0,0 +1,65 @@
+import os
+import sys
+
+import pytest
+
+# 모듈들이 프로젝트 루트 기준 import (import config 등)를 쓰므로 루트를 경로에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+from embedding_backends import HashingEmbeddingBackend  # noqa: E402
+from rag_engine import RAGEngine  # noqa: E402
+
+
+class CountingEmbedder(HashingEmbeddingBackend):
+    """hashing 백엔드 + 실제로 임베딩한 텍스트 수 기록 (유료 API 호출 횟수 대용)"""
+
+    def __init__(self, dim: int = 256):
+        super().__init__(dim=dim)
+        self.embedded = 0
+
+    def _embed_batch(self, texts):
+        self.embedded += len(texts)
+        return super()._embed_batch(texts)
+
+
+@pytest.fixture
+def make_engine(tmp_path, monkeypatch):
+    """
+    tmp_path 아래 저장소를 쓰는 RAGEngine 팩토리. 디스크 임베딩/답변 캐시는 끈다.
+    make_engine(name, docs, **kwargs) → docs(문자열 리스트)를 파일로 쓰고 build_from_text_files까지 실행.
+    """
+    monkeypatch.setattr(config, "EMBED_CACHE_PATH", None)
+    monkeypatch.setattr(config, "ANSWER_CACHE_PATH", None)
+    engines = []
+
+    def factory(name: str, docs: list[str] | None = None, **kwargs) -> RAGEngine:
+        root = tmp_path / name
+        root.mkdir(exist_ok=True)
+        kwargs.setdefault("embedder", CountingEmbedder())
+        rag = RAGEngine(
+            index_path=str(root / "faiss.index"),
+            meta_path=str(root / "meta.json"),
+            manifest_path=str(root / "manifest.json"),
+            info_path=str(root / "index_info.json"),
+            store_path=str(root / "chunks.sqlite"),
+            **kwargs,
+        )
+        engines.append(rag)
+        if docs is not None:
+            rag.build_from_text_files(write_docs(root, docs))
+        return rag
+
+    yield factory
+    for rag in engines:
+        if rag.store is not None:
+            rag.store.close()
+
+
+def write_docs(root, docs: list[str]) -> list[str]:
+    files = []
+    for i, text in enumerate(docs):
+        path = root / f"doc{i}.txt"
+        path.write_text(text, encoding="utf-8")
+        files.append(str(path))
+    return files
@@ -0,0 +1,82 @@
+import re
+
+from chunker import chunk_text
+from tokens import count_tokens
+
+SENTENCES = [f"{i}번 교차로는 신호 주기가 짧아 보행자 사고가 자주 난다." for i in range(1, 13)]
+TEXT = " ".join(SENTENCES[:6]) + "\n\n" + " ".join(SENTENCES[6:])
+
+
+def _sentence_spans(text: str) -> list[tuple[int, int]]:
+    return [(m.start(), m.end()) for m in re.finditer(r"\S[^.]*\.", text)]
+
+
+def test_chunks_are_exact_slices_within_budget():
+    for size, overlap in [(24, 0), (40, 12), (80, 30)]:
+        chunks = chunk_text(TEXT, chunk_size=size, overlap=overlap)
+        for c in chunks:
+            assert c["chunk"] == TEXT[c["start"] : c["end"]]
+            assert count_tokens(c["chunk"]) <= size
+        # 원문 전체(공백 제외)를 빠짐없이 덮음
+        covered = set()
+        for c in chunks:
+            covered.update(range(c["start"], c["end"]))
+        assert all(i in covered for i, ch in enumerate(TEXT) if not ch.isspace())
+
+
+def test_chunks_start_and_end_on_sentence_boundaries():
+    spans = _sentence_spans(TEXT)
+    starts, ends = {s for s, _ in spans}, {e for _, e in spans}
+    for c in chunk_text(TEXT, chunk_size=40, overlap=12):
+        assert c["start"] in starts
+        assert c["end"] in ends
+
+
+def test_new_paragraph_starts_new_chunk_when_half_full():
+    # 두 문단을 합쳐도 예산 안이지만 첫 문단이 이미 절반 이상이면 문단 경계에서 끊음
+    text = " ".join(SENTENCES[:6]) + "\n\n" + " ".join(SENTENCES[6:8])
+    size = count_tokens(text) + 10
+    assert count_tokens(" ".join(SENTENCES[:6])) >= size // 2
+    chunks = chunk_text(text, chunk_size=size, overlap=0)
+    assert [c["start"] for c in chunks] == [0, text.index(SENTENCES[6])]
+
+    # 첫 문단이 절반 미만이면 다음 문단과 한 청크로 묶음
+    text = SENTENCES[0] + "\n\n" + " ".join(SENTENCES[1:8])
+    assert len(chunk_text(text, chunk_size=count_tokens(text) + 10, overlap=0)) == 1
+
+
+def test_overlap_shares_trailing_sentences_within_budget():
+    no_overlap = chunk_text(TEXT, chunk_size=40, overlap=0)
+    for a, b in zip(no_overlap, no_overlap[1:]):
+        assert b["start"] >= a["end"]
+
+    chunks = chunk_text(TEXT, chunk_size=40, overlap=20)
+    shared = 0
+    for a, b in zip(chunks, chunks[1:]):
+        if b["start"] < a["end"]:
+            shared += 1
+            # 겹친 부분은 직전 청크의 끝 문장들이고 overlap 토큰 이내, 직전 청크 전체는 아님
+            assert a["start"] < b["start"]
+            assert count_tokens(TEXT[b["start"] : a["end"]]) <= 20
+    assert shared > 0
+
+
+def test_bullets_are_kept_whole():
+    text = "대응 전략\n- 교차로 신호 최적화. 좌회전 전용 신호 도입\n- 야간 조명 강화. 횡단보도 집중 조명\n- 과속 단속"
+    items = [line for line in text.split("\n") if line.startswith("- ")]
+    for c in chunk_text(text, chunk_size=24, overlap=0):
+        for item in items:
+            start = text.index(item)
+            # 글머리표 항목은 청크 경계로 중간이 잘리지 않음
+            assert not (c["start"] < start + len(item) <= c["end"] and c["start"] > start)
+            assert not (c["start"] <= start < c["end"] < start + len(item))
+
+
+def test_long_sentence_is_split_into_budget_sized_pieces():
+    text = " ".join(["청원구"] * 200) + "."
+    chunks = chunk_text(text, chunk_size=32, overlap=0)
+    assert len(chunks) > 1
+    assert all(count_tokens(c["chunk"]) <= 32 for c in chunks)
+    assert chunks[0]["start"] == 0 and chunks[-1]["end"] == len(text)
+    for a, b in zip(chunks, chunks[1:]):
+        assert text[a["end"] : b["start"]].strip() == ""
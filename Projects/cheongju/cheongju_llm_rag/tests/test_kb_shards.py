@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from kb_shards import MultiKBEngine
+
+TRAFFIC = [
+    "청원구 야간 교차로 사고는 가로등이 부족한 구간에서 집중된다. 야간 교차로 신호 개선과 조명 보강이 우선이다.",
+    "오창읍 야간 교차로에서는 우회전 차량과 보행자 충돌 사고가 많다. 교차로 횡단보도 조명을 밝게 해야 한다.",
+    "어린이 보호구역 과속 단속 카메라 설치 이후 등하교 시간 사고가 줄었다.",
+]
+# 관련 없는 샤드도 "교차로" 한 단어는 걸리게 해서 샤드 안 1등이 생기도록
+COOKING = [
+    "교차로 앞 식당의 된장찌개는 멸치 육수에 된장을 풀고 두부와 애호박을 넣어 끓인다.",
+    "김치볶음밥은 잘 익은 김치를 잘게 썰어 밥과 함께 센 불에 볶는다.",
+    "잡채는 당면을 삶아 간장과 참기름으로 무치고 볶은 채소를 섞는다.",
+]
+
+
+@pytest.fixture
+def engine(make_engine):
+    return MultiKBEngine(
+        {
+            "traffic": make_engine("traffic", TRAFFIC, index_type="flat"),
+            "cooking": make_engine("cooking", COOKING, index_type="flat"),
+        }
+    )
+
+
+@pytest.mark.parametrize("mode", ["lexical", "hybrid"])
+def test_irrelevant_shard_does_not_tie_with_strong_match(engine, mode):
+    """관련 문서가 없는 샤드의 1등이 관련 샤드의 좋은 결과와 동점으로 끼어들지 않는다."""
+    hits = engine.retrieve_hits("야간 교차로 사고 대책", k=2, mode=mode)
+
+    assert [h["kb"] for h in hits] == ["traffic", "traffic"]
+    assert all(os.path.basename(h["source"]) in ("doc0.txt", "doc1.txt") for h in hits)
+
+
+def test_lexical_scores_are_comparable_across_shards(engine):
+    hits = engine.retrieve_hits("야간 교차로 사고 대책", k=6, mode="lexical")
+    best = {}
+    for h in hits:
+        best.setdefault(h["kb"], h["score"])
+
+    assert 0 < best["traffic"] <= 1
+    assert best.get("cooking", 0.0) < best["traffic"] / 2
@@ -0,0 +1,136 @@
+import io
+
+import pandas as pd
+import pytest
+
+import config
+import preprocess
+from preprocess import SummaryAccumulator, _normalize, basic_summary, load_accidents_csv, stream_summary
+
+
+def _district_frame(n: int = 300) -> pd.DataFrame:
+    gu = ["상당구", "서원구", "흥덕구", "청원구", "청주시 외"]
+    return pd.DataFrame(
+        {
+            "구": [gu[i % len(gu)] for i in range(n)],
+            "사고건수": [(i * 7) % 23 + 1 for i in range(n)],
+            "사망자수": [i % 3 for i in range(n)],
+            "부상신고자수": [(i * 5) % 11 for i in range(n)],
+            "사상자수": [(i * 3) % 17 for i in range(n)],
+        }
+    )
+
+
+def _old_loader_summary(data: bytes) -> dict:
+    """최적화 전 로더: utf-8-sig → cp949 순서로 pd.read_csv 후 정규화"""
+    for enc in ("utf-8-sig", "cp949"):
+        try:
+            df = pd.read_csv(io.BytesIO(data), encoding=enc)
+            break
+        except UnicodeDecodeError:
+            continue
+    return basic_summary(_normalize(df, verbose=False))
+
+
+@pytest.fixture
+def csv_files(tmp_path):
+    text = _district_frame().to_csv(index=False)
+    paths = {}
+    for enc in ("utf-8", "utf-8-sig", "cp949"):
+        path = tmp_path / f"accidents_{enc}.csv"
+        path.write_bytes(text.encode(enc))
+        paths[enc] = path
+    return paths
+
+
+@pytest.mark.parametrize("enc", ["utf-8", "utf-8-sig", "cp949"])
+def test_loader_matches_old_loader(csv_files, monkeypatch, tmp_path, enc):
+    monkeypatch.setattr(config, "UPLOAD_CACHE_DIR", str(tmp_path / "cache"))
+    # 조각 경계가 멀티바이트 문자 중간에 걸리도록 작게
+    monkeypatch.setattr(preprocess, "_ENCODING_CHECK_BYTES", 7)
+    path = csv_files[enc]
+    expected = _old_loader_summary(path.read_bytes())
+
+    parsed = basic_summary(load_accidents_csv(str(path)))
+    cached = basic_summary(load_accidents_csv(str(path)))  # Parquet 캐시 경로 (pyarrow 있을 때)
+
+    assert parsed == expected
+    assert cached == expected
+    assert expected["total_accidents"] > 0
+
+
+def test_cp949_reads_without_pyarrow_engine(csv_files, monkeypatch):
+    engines = []
+    read_csv = pd.read_csv
+
+    def spy(*args, **kwargs):
+        engines.append((kwargs.get("engine"), kwargs.get("encoding")))
+        return read_csv(*args, **kwargs)
+
+    monkeypatch.setattr(preprocess.pd, "read_csv", spy)
+    preprocess._read_raw(csv_files["cp949"].read_bytes(), ".csv")
+    assert engines == [("c", "cp949")]
+
+
+def test_non_utf8_tail_falls_back_to_cp949(monkeypatch):
+    monkeypatch.setattr(preprocess, "_ENCODING_SAMPLE_BYTES", 64)
+    # 샘플(앞 64바이트)은 ASCII뿐이라 utf-8로 판별되지만 뒤쪽 행은 cp949
+    text = "date,region\n" + "2025-01-01,A\n" * 10 + "2025-01-02,상당구\n"
+    data = text.encode("cp949")
+    assert preprocess._detect_encoding(data[:64]) == "utf-8"
+
+    df = preprocess._read_raw(data, ".csv")
+    assert df["region"].iloc[-1] == "상당구"
+
+
+def test_undecodable_csv_raises_value_error():
+    with pytest.raises(ValueError, match="인코딩"):
+        preprocess._read_raw(b"a,b\n\xff\xff,\x80\x80\n", ".csv")
+
+
+def _incident_frame(n: int = 240) -> pd.DataFrame:
+    # 앞쪽/뒤쪽 청크에서 많이 나오는 값이 달라서 청크별 top5만 합치면 전체 top5와 달라지는 데이터
+    regions = [f"동{i % 9}" if i < n // 2 else f"동{8 - i % 4}" for i in range(n)]
+    kinds = ["사고", "공사", "고장", "행사", "기상", "낙하물", "기타"]
+    return pd.DataFrame(
+        {
+            "region": regions,
+            "돌발분류명": [kinds[(i * i) % len(kinds)] for i in range(n)],
+            "연월": [f"2024{(i // 20) % 12 + 1:02d}" for i in range(n)],
+            "accident_count": [1 + i % 3 for i in range(n)],
+            "mode": "detail",
+        }
+    )
+
+
+@pytest.mark.parametrize("frame", [_district_frame, _incident_frame])
+def test_merged_chunk_summaries_match_basic_summary(frame):
+    df = frame()
+    if "mode" not in df.columns:
+        df = _normalize(df, verbose=False)
+    expected = basic_summary(df)
+
+    bounds = [0, 7, 50, 51, 130, len(df)]
+    parts = [SummaryAccumulator().update(df.iloc[a:b]) for a, b in zip(bounds, bounds[1:])]
+    # 순서대로 한쪽으로 합치기 / 둘씩 묶어서 합치기 모두 같은 결과
+    left = SummaryAccumulator()
+    for part in parts:
+        left.merge(part)
+    pairs = [parts[0].merge(parts[1]), parts[2].merge(parts[3]), parts[4]]
+    tree = pairs[0].merge(pairs[1]).merge(pairs[2])
+
+    assert left.result() == expected
+    assert tree.result() == expected
+
+
+def test_merge_with_empty_accumulator_keeps_first_chunk_metadata():
+    df = _normalize(_district_frame(20), verbose=False)
+    acc = SummaryAccumulator().merge(SummaryAccumulator().update(df))
+    assert acc.merge(SummaryAccumulator()).result() == basic_summary(df)
+
+
+def test_stream_summary_matches_basic_summary(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_CACHE_DIR", None)
+    path = tmp_path / "accidents.csv"
+    path.write_bytes(_district_frame(500).to_csv(index=False).encode("cp949"))
+    assert stream_summary(str(path), chunk_rows=64) == basic_summary(load_accidents_csv(str(path)))
@@ -0,0 +1,100 @@
+import pytest
+
+from prompt_builder import STATS_DROP_ORDER, build_prompt
+from tokens import count_tokens
+
+STATS = {
+    "mode": "detail",
+    "rows": 1200,
+    "columns": ["date", "time", "region", "road_type", "weather", "severity", "accident_type", "mode"],
+    "total_accidents": 1200,
+    "top_regions_by_accidents": {"청주시 흥덕구": 410, "청주시 상당구": 320, "청주시 서원구": 250},
+    "top_weekdays_by_accidents": {"금": 220, "토": 200, "목": 180},
+    "top_incident_types": {"사고": 300, "공사": 120, "고장": 80},
+    "top_year_months": {"202401": 110, "202402": 95, "202403": 90},
+}
+
+_TOPICS = [
+    "교차로 신호 최적화와 좌회전 전용 신호 도입 이후 직각 충돌이 줄었다",
+    "야간 조명 강화와 횡단보도 집중 조명으로 보행자 인지 거리가 늘었다",
+    "빗길 미끄럼 방지 포장과 배수 개선으로 우천 시 추돌이 감소했다",
+    "어린이보호구역 무인 단속 카메라 설치 후 등하교 시간 과속이 줄었다",
+    "이륜차 헬멧 착용 단속과 배달 업체 안전 교육으로 중상 비율이 낮아졌다",
+]
+HITS = [{"chunk": f"{i}번 근거: {topic}. " * 3, "score": 1.0 - i / 10} for i, topic in enumerate(_TOPICS)]
+QUESTION = "흥덕구 야간 교차로 사고를 줄이려면 무엇부터 해야 해?"
+
+
+def _full_tokens() -> int:
+    return build_prompt(QUESTION, STATS, HITS, max_input_tokens=100_000)[1]["prompt_tokens"]
+
+
+def test_fits_without_dropping_anything():
+    prompt, info = build_prompt(QUESTION, STATS, HITS, max_input_tokens=100_000)
+    assert info["dropped_stats"] == [] and info["context_chunks"] == len(HITS)
+    assert not info["context_truncated"] and not info["question_truncated"]
+    assert info["prompt_tokens"] == count_tokens(prompt)
+
+
+def test_stats_fields_are_dropped_in_order_before_context():
+    full = _full_tokens()
+    prompt, info = build_prompt(QUESTION, STATS, HITS, max_input_tokens=full - 5)
+    assert info["dropped_stats"] == ["columns"]
+    assert info["context_chunks"] == len(HITS)
+    assert info["prompt_tokens"] <= full - 5
+
+    # 더 줄이면 STATS_DROP_ORDER 앞부분부터 차례로 빠지고 합계/지역 top은 끝까지 남음
+    previous = []
+    for budget in range(full - 5, 0, -40):
+        try:
+            prompt, info = build_prompt(QUESTION, STATS, HITS, max_input_tokens=budget)
+        except ValueError:
+            break
+        dropped = info["dropped_stats"]
+        assert dropped == STATS_DROP_ORDER[: len(dropped)]
+        assert len(dropped) >= len(previous)
+        if info["context_chunks"] < len(HITS):
+            assert dropped == STATS_DROP_ORDER  # 청크는 stats를 다 줄인 뒤에야 뺀다
+        assert "total_accidents" in prompt and "청주시 흥덕구" in prompt
+        assert info["prompt_tokens"] <= budget
+        previous = dropped
+    # 원래 stats dict는 건드리지 않음
+    assert "columns" in STATS
+
+
+def test_low_score_chunks_are_dropped_first_and_last_one_truncated():
+    # 청크를 빼기 전에 stats는 STATS_DROP_ORDER 필드가 모두 빠진 상태
+    kept_stats = {k: v for k, v in STATS.items() if k not in STATS_DROP_ORDER}
+    no_context = build_prompt(QUESTION, kept_stats, [], max_input_tokens=100_000)[1]["prompt_tokens"]
+    one_chunk = count_tokens(HITS[0]["chunk"])
+    budget = no_context + one_chunk + 40  # 청크 하나 + 다음 청크 일부가 들어갈 만큼
+
+    shuffled = [HITS[3], HITS[0], HITS[4], HITS[1], HITS[2]]
+    prompt, info = build_prompt(QUESTION, STATS, shuffled, max_input_tokens=budget)
+    assert info["prompt_tokens"] <= budget
+    assert info["dropped_stats"] == STATS_DROP_ORDER
+    assert info["context_chunks"] == 2 and info["context_truncated"]
+    assert HITS[0]["chunk"] in prompt  # 점수 가장 높은 청크는 통째로
+    assert "1번 근거" in prompt  # 두 번째 청크는 잘려서
+    assert HITS[1]["chunk"] not in prompt
+    assert all(f"{i}번 근거" not in prompt for i in (2, 3, 4))
+
+
+def test_duplicate_chunks_are_removed():
+    dup = [HITS[0], {"chunk": HITS[0]["chunk"], "score": 0.1}, HITS[1]]
+    assert build_prompt(QUESTION, STATS, dup, max_input_tokens=100_000)[1]["context_chunks"] == 2
+
+
+def test_long_question_is_truncated_when_nothing_else_fits():
+    question = "청원구 오창읍 교차로에서 밤마다 사고가 나는 이유와 대책을 알려줘. " * 200
+    base = build_prompt("", STATS, [], max_input_tokens=100_000)[1]["prompt_tokens"]
+    prompt, info = build_prompt(question, STATS, HITS, max_input_tokens=base + 300)
+    assert info["question_truncated"] and info["context_chunks"] == 0
+    assert info["dropped_stats"] == STATS_DROP_ORDER
+    assert info["prompt_tokens"] <= base + 300
+    assert question[:30] in prompt
+
+
+def test_budget_too_small_raises_value_error():
+    with pytest.raises(ValueError, match="MAX_INPUT_TOKENS"):
+        build_prompt(QUESTION * 20, STATS, HITS, max_input_tokens=50)
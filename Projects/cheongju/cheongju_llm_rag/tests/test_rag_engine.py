@@ -0,0 +1,130 @@
+import os
+
+import numpy as np
+
+from conftest import write_docs
+
+DOCS = [
+    "청원구 야간 교차로 사고는 가로등이 부족한 구간에서 집중된다.",
+    "오창읍 우회전 차량과 보행자 충돌 사고가 많다.",
+    "어린이 보호구역 과속 단속 이후 등하교 시간 사고가 줄었다.",
+]
+
+
+def test_hnsw_removal_rebuilds_from_stored_vectors(make_engine, tmp_path):
+    """삭제를 지원하지 않는 인덱스(HNSW)를 재구축할 때 남은 청크를 다시 임베딩하지 않는다."""
+    rag = make_engine("kb", DOCS, index_type="hnsw", chunk_size=64)
+    before = rag.embedder.embedded
+
+    files = write_docs(tmp_path / "kb", DOCS[:2])  # 세 번째 문서 삭제
+    result = rag.update_from_text_files(files)
+
+    assert result["deleted"] and not result["rebuilt"]
+    assert rag.embedder.embedded == before
+    assert rag.index.ntotal == len(rag.store)
+
+    query = rag._embed([DOCS[0]])
+    scores, ids = rag.index.search(query / np.linalg.norm(query), 1)
+    assert rag.store.get_many([int(ids[0][0])])[int(ids[0][0])]["chunk"] == DOCS[0]
+
+
+def _with_answer_cache(rag, tmp_path):
+    from answer_cache import AnswerCache
+
+    rag.answer_cache = AnswerCache(str(tmp_path / "answers.sqlite"))
+    return rag
+
+
+def test_answer_cache_lookup_does_not_embed_for_lexical_retrieval(make_engine, tmp_path):
+    from tracing import Trace
+
+    rag = _with_answer_cache(make_engine("kb", DOCS, chunk_size=64), tmp_path)
+    question = "야간 교차로 사고 원인은?"
+    hits = rag.retrieve_hits(question, k=2, mode="lexical")
+    before = rag.embedder.embedded
+
+    bucket, qvec, cached = rag._lookup_answer(question, {}, hits, Trace())
+    assert cached is None
+    rag.answer_cache.put(bucket, question, qvec, "답변")
+
+    assert rag._lookup_answer(question, {}, hits, Trace())[2] == "답변"
+    assert rag._lookup_answer("다른 질문", {}, hits, Trace())[2] is None
+    assert rag.embedder.embedded == before
+
+
+def test_answer_cache_lookup_reuses_retrieval_query_vector(make_engine, tmp_path):
+    from tracing import Trace
+
+    rag = _with_answer_cache(make_engine("kb", DOCS, chunk_size=64), tmp_path)
+    question = "야간 교차로 사고 원인은?"
+    hits = rag.retrieve_hits(question, k=2, mode="dense")
+    before = rag.embedder.embedded
+
+    _, qvec, _ = rag._lookup_answer(question, {}, hits, Trace())
+
+    assert rag.embedder.embedded == before
+    assert qvec.shape == (rag.embedder.dim,)
+
+
+def test_full_rebuild_does_not_reuse_chunk_ids(make_engine, tmp_path):
+    """재구축 후에도 예전 인덱스의 ID가 새 청크 텍스트로 연결되지 않는다 (재로드 전 엔진 보호)."""
+    rag = make_engine("kb", DOCS, chunk_size=64)
+    old_ids = set(rag.store.get_many(list(range(100))))
+
+    rag.build_from_text_files(write_docs(tmp_path / "kb", ["완전히 새로운 문서 내용입니다."]))
+
+    new_ids = set(rag.store.get_many(list(range(100))))
+    assert new_ids and not (old_ids & new_ids)
+
+
+def test_legacy_index_with_other_embedding_dim_is_rejected_on_load(make_engine, tmp_path):
+    """index_info.json이 없는 예전 인덱스도 현재 임베딩과 차원이 다르면 검색 전에 ValueError."""
+    import faiss
+    import pytest
+
+    rag = make_engine("kb", DOCS, chunk_size=64)
+    legacy = faiss.IndexFlatIP(1536)
+    faiss.write_index(legacy, rag.index_path)
+    (tmp_path / "kb" / "index_info.json").unlink()
+
+    fresh = make_engine("kb")
+    with pytest.raises(ValueError, match="ingest.py --rebuild"):
+        fresh.load()
+
+
+def _store_ids(rag) -> set[int]:
+    return {i for i, _ in rag.store.iter_chunks()}
+
+
+def test_incremental_ingest_adds_modifies_and_removes_files(make_engine, tmp_path):
+    rag = make_engine("kb", DOCS, chunk_size=64)
+    manifest = rag._load_manifest()["files"]
+    old_ids = {os.path.basename(p): set(e["chunk_ids"]) for p, e in manifest.items()}
+    assert _store_ids(rag) == set().union(*old_ids.values())
+    before = rag.embedder.embedded
+
+    # doc0 그대로, doc1 수정, doc2 삭제, doc3 추가
+    docs = [DOCS[0], "오창읍 우회전 차량 일시정지 위반 단속을 시작했다.", "", "흥덕구 빗길 추돌 사고가 늘었다."]
+    files = write_docs(tmp_path / "kb", docs)
+    del files[2]
+    result = rag.update_from_text_files(files)
+
+    assert not result["rebuilt"]
+    assert [os.path.basename(p) for p in result["unchanged"]] == ["doc0.txt"]
+    assert [os.path.basename(p) for p in result["changed"]] == ["doc1.txt"]
+    assert [os.path.basename(p) for p in result["deleted"]] == ["doc2.txt"]
+    assert [os.path.basename(p) for p in result["added"]] == ["doc3.txt"]
+    # 바뀐/새 파일만 임베딩
+    assert rag.embedder.embedded - before == 2
+
+    new_ids = {os.path.basename(p): set(e["chunk_ids"]) for p, e in rag._load_manifest()["files"].items()}
+    assert new_ids["doc0.txt"] == old_ids["doc0.txt"]
+    assert "doc2.txt" not in new_ids
+    # 새 청크는 예전 ID를 재사용하지 않음
+    assert min(new_ids["doc1.txt"] | new_ids["doc3.txt"]) > max(set().union(*old_ids.values()))
+    assert _store_ids(rag) == set().union(*new_ids.values())
+    assert rag.index.ntotal == len(rag.store)
+
+    # 변경 없이 다시 실행하면 아무것도 하지 않음
+    assert rag.update_from_text_files(files)["unchanged"] == files
+    assert rag.embedder.embedded - before == 2
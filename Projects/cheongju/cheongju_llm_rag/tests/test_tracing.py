@@ -0,0 +1,33 @@
+import tracing
+from tracing import Trace
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_elapsed_ms_covers_overlapping_spans_only(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(tracing.time, "perf_counter", clock)
+    trace = Trace()
+
+    # retrieval(0~0.3s)이 parse(0~0.2s) + summary(0.2~0.25s)와 겹쳐 실행된 경우
+    retrieval = trace.span("retrieval")
+    retrieval.__enter__()
+    with trace.span("parse"):
+        clock.now = 0.2
+    with trace.span("summary"):
+        clock.now = 0.25
+    clock.now = 0.3
+    retrieval.__exit__(None, None, None)
+    clock.now = 1.0  # 이후 화면 출력 등은 포함되지 않음
+
+    spans = trace.to_dict()["spans"]
+    assert spans == {"parse": 200.0, "summary": 50.0, "retrieval": 300.0}
+    assert round(trace.elapsed_ms("parse", "summary", "retrieval"), 1) == 300.0
+    assert round(trace.elapsed_ms("parse", "summary"), 1) == 250.0
+    assert trace.elapsed_ms("llm") is None
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from vector_index import INDEX_TYPES, build_index, effective_index_type
+
+
+def _unit_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    x = np.random.default_rng(seed).standard_normal((n, dim)).astype("float32")
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+@pytest.mark.parametrize("n", [1, 2, 3, 5])
+def test_tiny_corpus_builds_and_searches(index_type, n):
+    """청크가 몇 개뿐인 KB(예: 문서 하나 = 청크 하나)에서도 모든 인덱스 타입이 만들어지고 검색된다."""
+    vectors = _unit_vectors(n, 32)
+    ids = np.arange(100, 100 + n)
+
+    index = build_index(vectors, ids, index_type, pca=0)
+    scores, found = index.search(vectors[:1], n)
+
+    assert index.ntotal == n
+    assert set(found[0]) == set(ids)
+
+
+def test_pq_falls_back_when_codebook_cannot_be_trained():
+    assert effective_index_type("pq", 1) == "flat"
+    assert effective_index_type("ivfpq", 1) == "flat"
+    assert effective_index_type("pq", 2) == "pq"
@@ -0,0 +1,55 @@
+import config  # CHAT_MODEL
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken이 없으면 글자 수 기반 근사치 사용
+    tiktoken = None
+
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.encoding_for_model(config.CHAT_MODEL)
+        except KeyError:
+            _encoding = tiktoken.get_encoding("o200k_base")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    CHAT_MODEL 기준 토큰 수.
+    tiktoken이 없으면 근사치: ASCII는 4글자당 1토큰, 한글 등 비ASCII는 글자당 0.8토큰.
+    """
+    if not text:
+        return 0
+    enc = _get_encoding()
+    if enc is not None:
+        return len(enc.encode(text))
+
+    n_ascii = sum(1 for ch in text if ord(ch) < 128)
+    return max(1, round(n_ascii / 4 + (len(text) - n_ascii) * 0.8))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """앞에서부터 max_tokens 토큰 이내로 자름. (tiktoken이 없으면 근사치 기준 이진 탐색)"""
+    if max_tokens <= 0:
+        return ""
+    enc = _get_encoding()
+    if enc is not None:
+        ids = enc.encode(text)
+        return text if len(ids) <= max_tokens else enc.decode(ids[:max_tokens])
+
+    if count_tokens(text) <= max_tokens:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo]
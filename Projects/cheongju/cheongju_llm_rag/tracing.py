@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class Trace:
+    """
+    요청 하나의 구간(span)별 소요 시간(ms)과 카운터(토큰 수, 캐시 적중 등)를 모으는 객체.
+    같은 이름의 span이 여러 번 열리면 시간이 누적된다.
+    span()으로 잰 구간은 시작/끝 시각(perf_counter)도 남겨서 겹쳐 실행된 구간들의 실제 경과 시간을 계산할 수 있다.
+    """
+
+    def __init__(self):
+        self.spans: dict[str, float] = {}
+        self.counters: dict[str, int | float] = {}
+        self.windows: dict[str, tuple[float, float]] = {}  # span 이름 → (처음 시작, 마지막 끝)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.add_span(name, (end - start) * 1000)
+            with self._lock:
+                first, last = self.windows.get(name, (start, end))
+                self.windows[name] = (min(first, start), max(last, end))
+
+    def add_span(self, name: str, ms: float):
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + ms
+
+    def incr(self, name: str, n: int | float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set(self, name: str, value):
+        with self._lock:
+            self.counters[name] = value
+
+    def elapsed_ms(self, *names: str) -> float | None:
+        """주어진 span들 중 가장 먼저 시작한 시각 ~ 가장 늦게 끝난 시각 (ms). 기록된 구간이 없으면 None"""
+        with self._lock:
+            windows = [self.windows[n] for n in names if n in self.windows]
+        if not windows:
+            return None
+        return (max(end for _, end in windows) - min(start for start, _ in windows)) * 1000
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "spans": {k: round(v, 1) for k, v in self.spans.items()},
+                "counters": dict(self.counters),
+            }
+
+
+def _rotated_paths(path: str, backups: int) -> list[str]:
+    """가장 오래된 파일부터: path.N, ..., path.1, path"""
+    return [f"{path}.{i}" for i in range(backups, 0, -1)] + [path]
+
+
+def append_jsonl(path: str, record: dict, max_bytes: int = 0, backups: int = 3):
+    """
+    jsonl 파일에 한 줄 추가. max_bytes를 넘으면 path → path.1 → ... → path.N 으로 밀어내고
+    가장 오래된 파일은 삭제해서 로그 전체 크기를 (backups + 1) × max_bytes 이내로 유지.
+    """
+    log_dir = os.path.dirname(path)
+    if log_dir and not os.path.exists(log_dir):
+        os.makedirs(log_dir, exist_ok=True)
+
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+
+    if max_bytes and os.path.exists(path) and os.path.getsize(path) + len(line.encode("utf-8")) > max_bytes:
+        if backups > 0:
+            for i in range(backups - 1, 0, -1):
+                src = f"{path}.{i}"
+                if os.path.exists(src):
+                    os.replace(src, f"{path}.{i + 1}")
+            os.replace(path, f"{path}.1")
+        else:
+            os.remove(path)
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+def read_jsonl(path: str, backups: int = 3) -> Iterator[dict]:
+    """회전된 파일까지 포함해 오래된 순서대로 레코드를 읽음. 깨진 줄은 건너뜀."""
+    for p in _rotated_paths(path, backups):
+        if not os.path.exists(p):
+            continue
+        with open(p, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
@@ -0,0 +1,153 @@
+import math
+
+import numpy as np
+import faiss
+
+import config  # INDEX_TYPE, INDEX_PCA_DIM, HNSW_*, IVF_*, PQ_*
+
+
+INDEX_TYPES = ("flat", "hnsw", "ivf", "ivfpq", "sq8", "pq")
+
+# faiss 권장: IVF 학습 벡터 수는 클러스터 수의 39배 이상
+_MIN_POINTS_PER_CENTROID = 39
+
+# PQ 코드북은 최소 2개(1비트) 중심점이 필요 → 학습 벡터가 2개 미만이면 PQ 불가
+_MIN_PQ_TRAIN = 2
+
+
+def _ivf_nlist(n_train: int) -> int:
+    """학습 벡터가 적을 때는 nlist를 줄여서 빈 클러스터가 생기지 않게 한다."""
+    nlist = getattr(config, "IVF_NLIST", 256)
+    return max(1, min(nlist, n_train // _MIN_POINTS_PER_CENTROID))
+
+
+def _pq_params(dim: int, n_train: int, m: int | None = None) -> tuple[int, int]:
+    """
+    PQ 서브벡터 개수 m(dim의 약수)과 코드 비트 수 nbits 결정.
+    nbits는 학습 벡터 수보다 코드북(2^nbits)이 커지지 않도록 제한 (2^nbits <= n_train).
+    n_train < _MIN_PQ_TRAIN이면 가능한 nbits가 없으므로 effective_index_type에서 먼저 걸러야 한다.
+    """
+    if n_train < _MIN_PQ_TRAIN:
+        raise ValueError(f"PQ 학습 벡터가 부족함: {n_train}개 (최소 {_MIN_PQ_TRAIN}개)")
+    m = m or getattr(config, "PQ_M", 16)
+    while dim % m != 0:
+        m -= 1
+    nbits = getattr(config, "PQ_NBITS", 8)
+    nbits = min(nbits, int(math.log2(n_train)))
+    return m, nbits
+
+
+def pca_dim(dim: int, n_train: int, requested: int | None = None) -> int:
+    """
+    PCA 출력 차원 (0이면 PCA 안 함). config.INDEX_PCA_DIM 기준.
+    원래 차원 이상이면 의미가 없고, 학습 벡터 수가 출력 차원보다 적으면 PCA 학습이 불가능하므로 생략.
+    """
+    requested = getattr(config, "INDEX_PCA_DIM", 0) if requested is None else requested
+    if not requested or requested >= dim or n_train < requested:
+        return 0
+    return requested
+
+
+def factory_string(index_type: str, dim: int, n_train: int, pca: int = 0) -> str:
+    """
+    index_type → faiss.index_factory 문자열. 모든 타입이 add_with_ids를 지원하도록 구성.
+    pca > 0이면 PCA로 차원을 줄인 뒤 다시 L2 정규화 (Inner Product = cosine 유지).
+    """
+    if pca:
+        body = factory_string(index_type, pca, n_train)
+        if body.startswith("IDMap2,"):
+            return f"IDMap2,PCA{pca},L2norm,{body[len('IDMap2,'):]}"
+        return f"PCA{pca},L2norm,{body}"
+    if index_type == "flat":
+        return "IDMap2,Flat"
+    if index_type == "hnsw":
+        return f"IDMap2,HNSW{getattr(config, 'HNSW_M', 32)},Flat"
+    if index_type == "ivf":
+        return f"IVF{_ivf_nlist(n_train)},Flat"
+    if index_type == "ivfpq":
+        m, nbits = _pq_params(dim, n_train)
+        return f"IVF{_ivf_nlist(n_train)},PQ{m}x{nbits}"
+    if index_type == "sq8":
+        return "IDMap2,SQ8"  # 차원당 1바이트 (float32 대비 1/4)
+    if index_type == "pq":
+        m, nbits = _pq_params(dim, n_train, getattr(config, "PQ_STANDALONE_M", 64))
+        return f"IDMap2,PQ{m}x{nbits}"  # 벡터당 m × nbits 비트
+    raise ValueError(f"알 수 없는 INDEX_TYPE: {index_type} (가능: {', '.join(INDEX_TYPES)})")
+
+
+def effective_index_type(index_type: str, n_train: int) -> str:
+    """
+    학습이 필요한 타입은 학습 벡터가 너무 적으면 학습이 불가능하므로 flat으로 대체.
+    - ivf / ivfpq: 클러스터당 _MIN_POINTS_PER_CENTROID개 미만
+    - pq: 코드북 중심점(2^nbits, 최소 2개)보다 적음
+    """
+    if index_type in ("ivf", "ivfpq") and n_train < _MIN_POINTS_PER_CENTROID:
+        return "flat"
+    if index_type == "pq" and n_train < _MIN_PQ_TRAIN:
+        return "flat"
+    return index_type
+
+
+def build_index(
+    vectors: np.ndarray,
+    ids: np.ndarray,
+    index_type: str | None = None,
+    pca: int | None = None,
+) -> faiss.Index:
+    """
+    L2 정규화된 벡터로 index_type 인덱스를 만들고 (필요하면 학습 후) ID와 함께 추가.
+    Inner Product 기준이므로 정규화된 벡터에서는 cosine 유사도와 동일.
+    pca가 None이면 config.INDEX_PCA_DIM 사용.
+    """
+    n, dim = vectors.shape
+    index_type = effective_index_type(index_type or getattr(config, "INDEX_TYPE", "flat"), n)
+    spec = factory_string(index_type, dim, n, pca_dim(dim, n, pca))
+    index = faiss.index_factory(dim, spec, faiss.METRIC_INNER_PRODUCT)
+
+    inner = _inner_index(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efConstruction = getattr(config, "HNSW_EF_CONSTRUCTION", 80)
+
+    if not index.is_trained:
+        index.train(vectors)
+    index.add_with_ids(vectors, ids.astype("int64"))
+
+    configure_search(index)
+    return index
+
+
+def _inner_index(index: faiss.Index) -> faiss.Index:
+    """IDMap / PCA(PreTransform) 래퍼를 벗긴 실제 인덱스."""
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexPreTransform):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def is_lossy(index: faiss.Index) -> bool:
+    """
+    벡터를 근사값(양자화 또는 PCA 차원 축소)으로만 보관해서 점수가 원본 벡터의 cosine과 다른지.
+    이 경우 검색 후보를 원본 벡터로 다시 채점(재정렬)해야 정확한 순위가 나온다.
+    """
+    inner = _inner_index(index)
+    return inner.d != index.d or isinstance(inner, (faiss.IndexScalarQuantizer, faiss.IndexPQ, faiss.IndexIVFPQ))
+
+
+def index_nbytes(index: faiss.Index) -> int:
+    """인덱스가 메모리에서 차지하는 크기 (직렬화 크기로 근사)."""
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def configure_search(index: faiss.Index):
+    """검색 시점 파라미터 (HNSW efSearch, IVF nprobe) 적용. 인덱스 로드 후에도 호출."""
+    inner = _inner_index(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = getattr(config, "HNSW_EF_SEARCH", 64)
+    elif isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = getattr(config, "IVF_NPROBE", 16)
+
+
+def supports_remove(index: faiss.Index) -> bool:
+    """HNSW 그래프는 개별 벡터 삭제를 지원하지 않음 → 증분 갱신 시 인덱스 재구축 필요."""
+    return not isinstance(_inner_index(index), faiss.IndexHNSW)
@@ -0,0 +1,127 @@
+import os
+import time
+import sqlite3
+
+
+COMMENT_FIELDS = ["contents", "like", "dislike", "reply_count", "user_id", "mod_time", "reg_time"]
+
+
+class CommentCheckpoint:
+    """
+    댓글 크롤링 체크포인트 (SQLite).
+    - articles: 기사별 진행 상태 (지금까지 본 가장 최신 regTime, 끝까지 수집했는지, 마지막으로 끝낸 페이지)
+    - comments: 수집한 댓글 (기사 URL + commentNo 기준 중복 제거)
+    다시 실행하면 새 댓글만 받고, 중간에 끊긴 기사는 끊긴 페이지부터 이어서 받는다.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                url TEXT PRIMARY KEY,
+                newest_reg_time TEXT,
+                backfill_page INTEGER NOT NULL DEFAULT 0,
+                backfill_done INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS comments (
+                article_url TEXT NOT NULL,
+                comment_no TEXT NOT NULL,
+                contents TEXT,
+                "like" INTEGER,
+                dislike INTEGER,
+                reply_count INTEGER,
+                user_id TEXT,
+                mod_time TEXT,
+                reg_time TEXT,
+                PRIMARY KEY (article_url, comment_no)
+            );
+            """
+        )
+        self.conn.commit()
+
+    def article(self, url: str) -> dict:
+        """기사 진행 상태. 처음 보는 기사면 기본값"""
+        row = self.conn.execute(
+            "SELECT newest_reg_time, backfill_page, backfill_done FROM articles WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return {"newest_reg_time": None, "backfill_page": 0, "backfill_done": False}
+        return {"newest_reg_time": row[0], "backfill_page": row[1], "backfill_done": bool(row[2])}
+
+    def seen(self, url: str, comment_nos: list) -> set:
+        """comment_nos 중 이미 저장된 댓글 번호"""
+        if not comment_nos:
+            return set()
+        placeholders = ",".join("?" * len(comment_nos))
+        rows = self.conn.execute(
+            f"SELECT comment_no FROM comments WHERE article_url = ? AND comment_no IN ({placeholders})",
+            [url, *comment_nos],
+        ).fetchall()
+        return {r[0] for r in rows}
+
+    def save_page(self, url: str, rows: list, backfill_page: int | None = None, backfill_done: bool | None = None):
+        """
+        댓글 저장(이미 있으면 공감 수 등 갱신) + 기사 진행 상태 갱신을 한 트랜잭션으로 commit.
+        중간에 죽어도 commit된 페이지까지는 다음 실행에서 다시 받지 않는다.
+        """
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO comments (article_url, comment_no, contents, "like", dislike, reply_count,
+                                      user_id, mod_time, reg_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(article_url, comment_no) DO UPDATE SET
+                    contents = excluded.contents,
+                    "like" = excluded."like",
+                    dislike = excluded.dislike,
+                    reply_count = excluded.reply_count,
+                    mod_time = excluded.mod_time
+                """,
+                [(url, str(r["comment_no"]), *(r[f] for f in COMMENT_FIELDS)) for r in rows],
+            )
+            newest = max((r["reg_time"] for r in rows if r.get("reg_time")), default=None)
+            self.conn.execute(
+                """
+                INSERT INTO articles (url, newest_reg_time, backfill_page, backfill_done, updated_at)
+                VALUES (?, ?, COALESCE(?, 0), COALESCE(?, 0), ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    newest_reg_time = MAX(
+                        COALESCE(newest_reg_time, excluded.newest_reg_time),
+                        COALESCE(excluded.newest_reg_time, newest_reg_time)
+                    ),
+                    backfill_page = COALESCE(?, backfill_page),
+                    backfill_done = COALESCE(?, backfill_done),
+                    updated_at = excluded.updated_at
+                """,
+                (url, newest, backfill_page, backfill_done, time.time(), backfill_page, backfill_done),
+            )
+
+    def frontier(self, url: str) -> dict:
+        """이어 받기 기준: 저장된 댓글 수와 그중 가장 오래된 댓글의 regTime"""
+        count, oldest = self.conn.execute(
+            "SELECT COUNT(*), MIN(reg_time) FROM comments WHERE article_url = ?", (url,)
+        ).fetchone()
+        return {"count": count, "oldest_reg_time": oldest}
+
+    def reset(self, urls: list):
+        """--full: 기사 진행 상태를 지워 처음부터 다시 수집 (저장된 댓글은 유지, 중복은 갱신)"""
+        with self.conn:
+            self.conn.executemany("DELETE FROM articles WHERE url = ?", [(u,) for u in urls])
+
+    def comments(self, url: str) -> list:
+        """기사의 저장된 댓글 (최신순)"""
+        rows = self.conn.execute(
+            """
+            SELECT contents, "like", dislike, reply_count, user_id, mod_time, reg_time
+            FROM comments WHERE article_url = ? ORDER BY reg_time DESC
+            """,
+            (url,),
+        ).fetchall()
+        return [dict(zip(COMMENT_FIELDS, r)) for r in rows]
+
+    def close(self):
+        self.conn.close()
@@ -1,10 +1,41 @@
-import requests
 import json
-import pandas as pd
-import time
+import math
 import os
+import time
+import random
+import asyncio
+import argparse
 from urllib.parse import urlparse
 
+import aiohttp
+import pandas as pd
+
+from comment_checkpoint import CommentCheckpoint
+from rate_limiter import get_limiter, limiter_for
+
+
+API_URL = "https://apis.naver.com/commentBox/cbox/web_naver_list_jsonp.json"
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+PAGE_SIZE = 20
+PAGE_WINDOW = 5  # 증분 수집에서 한 번에 동시에 요청하는 페이지 수
+
+# 동시 요청 제한: 전체 / 호스트당 (댓글 API는 한 호스트라 사실상 호스트당 값이 상한)
+MAX_CONCURRENCY = 16
+MAX_PER_HOST = 8
+
+# 초당 요청 수: 시작 값에서 응답 상태를 보며 자동 조절 (rate_limiter.py)
+START_RATE = 10.0
+MAX_RATE = 50.0
+
+# 재시도: 429 / 5xx / 연결 오류 → 지수 백오프 + jitter (Retry-After 헤더가 있으면 우선)
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 10.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+REQUEST_TIMEOUT = 15
+
+COMMENT_COLUMNS = ["contents", "like", "dislike", "reply_count", "user_id", "mod_time", "reg_time"]
+
 
 def extract_oid_aid(url: str):
     path = urlparse(url).path
@@ -13,92 +44,347 @@ def extract_oid_aid(url: str):
     aid = parts[-1]
     return oid, aid
 
-def get_comments_from_article(url, max_pages=30):
+
+def build_api_url(oid: str, aid: str, page: int, newest_first: bool = False) -> str:
+    """
+    댓글 API URL. 전체 수집은 기본 정렬 그대로 (기존 결과와 같은 순서),
+    증분 수집만 newest_first=True로 최신순(sort=NEW)을 요청해 새 댓글이 앞 페이지에 오게 한다.
+    """
+    url = (
+        f"{API_URL}"
+        f"?ticket=news&templateId=default&pool=cbox5&lang=ko&country=KR"
+        f"&objectId=news{oid},{aid}&pageSize={PAGE_SIZE}&page={page}"
+    )
+    return url + "&sort=NEW" if newest_first else url
+
+
+def parse_jsonp(text: str) -> dict:
+    """callback( {...} ); 형태 응답에서 JSON 부분만 파싱"""
+    start = text.find("(") + 1
+    end = text.rfind(")")
+    return json.loads(text[start:end])
+
+
+def to_rows(comment_list: list) -> list:
+    return [
+        {
+            "comment_no": c.get("commentNo"),
+            "contents": c.get("contents"),
+            "like": c.get("sympathyCount"),
+            "dislike": c.get("antipathyCount"),
+            "reply_count": c.get("replyCount"),
+            "user_id": c.get("userIdNo"),
+            "mod_time": c.get("modTime"),
+            "reg_time": c.get("regTime"),
+        }
+        for c in comment_list
+    ]
+
+
+def _backoff(attempt: int, retry_after: str | None) -> float:
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    # full jitter: 여러 요청이 동시에 실패해도 재시도 시점이 흩어지도록
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+async def fetch_page(
+    session: aiohttp.ClientSession,
+    sem: asyncio.Semaphore,
+    oid: str,
+    aid: str,
+    page: int,
+    newest_first: bool = False,
+):
+    """댓글 한 페이지(JSON). 재시도해도 실패하면 None"""
+    url = build_api_url(oid, aid, page, newest_first)
+    limiter = limiter_for(url)
+
+    for attempt in range(MAX_RETRIES + 1):
+        retry_after = None
+        await limiter.acquire_async()
+        try:
+            # 대기(backoff) 중에는 슬롯을 잡지 않도록 요청 구간만 세마포어 안에서 실행
+            async with sem:
+                start = time.monotonic()  # 슬롯 수 <= 호스트당 연결 수라 연결 대기 없이 바로 요청
+                async with session.get(url) as res:
+                    limiter.record(res.status, time.monotonic() - start)
+                    if res.status == 200:
+                        return parse_jsonp(await res.text())
+                    if res.status not in RETRY_STATUS:
+                        print(f"[WARN] 요청 실패: status={res.status}, {oid}/{aid} page={page}")
+                        return None
+                    retry_after = res.headers.get("Retry-After")
+                    reason = f"status={res.status}"
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            limiter.record(error=True)
+            reason = type(e).__name__
+        except json.JSONDecodeError as e:
+            reason = type(e).__name__
+
+        if attempt == MAX_RETRIES:
+            print(f"[WARN] 재시도 초과({reason}): {oid}/{aid} page={page}")
+            return None
+        await asyncio.sleep(_backoff(attempt, retry_after))
+
+
+async def crawl_article(session: aiohttp.ClientSession, sem: asyncio.Semaphore, url: str, max_pages: int = 30):
+    """
+    기사 하나의 댓글 전체 (최대 max_pages 페이지, 체크포인트 없이).
+    1페이지에서 총 댓글 수를 보고 필요한 나머지 페이지를 한꺼번에 요청한다.
+    총 댓글 수를 모르면 예전처럼 빈 페이지가 나올 때까지 순서대로 요청.
+    """
     oid, aid = extract_oid_aid(url)
 
-    all_comments = []
+    first = await fetch_page(session, sem, oid, aid, 1)
+    if first is None:
+        return pd.DataFrame(columns=COMMENT_COLUMNS)
 
-    for page in range(1, max_pages + 1):
-        api_url = (
-            "https://apis.naver.com/commentBox/cbox/web_naver_list_jsonp.json"
-            f"?ticket=news&templateId=default&pool=cbox5&lang=ko&country=KR"
-            f"&objectId=news{oid},{aid}&pageSize=20&page={page}"
-        )
+    result = first.get("result", {})
+    rows = to_rows(result.get("commentList", []))
+    total_count = result.get("count", {}).get("comment")
+    if not rows:
+        return pd.DataFrame(rows, columns=COMMENT_COLUMNS)
 
-        res = requests.get(api_url, headers={"User-Agent": "Mozilla/5.0"})
-        print(f"[DEBUG] status_code={res.status_code}, page={page}")  # ★ 추가
+    if isinstance(total_count, int):
+        n_pages = min(max_pages, math.ceil(total_count / PAGE_SIZE))
+        pages = await asyncio.gather(*(fetch_page(session, sem, oid, aid, p) for p in range(2, n_pages + 1)))
+        for data in pages:
+            if data is not None:
+                rows.extend(to_rows(data.get("result", {}).get("commentList", [])))
+    else:
+        for page in range(2, max_pages + 1):
+            data = await fetch_page(session, sem, oid, aid, page)
+            comment_list = (data or {}).get("result", {}).get("commentList", [])
+            if not comment_list:
+                break
+            rows.extend(to_rows(comment_list))
 
-        if res.status_code != 200:
-            print("요청 실패:", res.status_code)
-            break
+    return pd.DataFrame(rows, columns=COMMENT_COLUMNS)
+
+
+async def crawl_article_incremental(
+    session: aiohttp.ClientSession,
+    sem: asyncio.Semaphore,
+    store: CommentCheckpoint,
+    url: str,
+    max_pages: int = 30,
+) -> int:
+    """
+    체크포인트 기준으로 기사 하나의 새 댓글만 받아 store에 저장하고, 새로 추가된 댓글 수를 반환.
+    댓글은 최신순(sort=NEW)으로 받으므로
+      1) 1페이지부터 읽다가 이미 저장된 댓글(또는 본 적 있는 regTime보다 오래된 댓글)이 나오면 멈춘다
+      2) 이전 실행이 기사 끝까지 가지 못했다면(중간에 중단) 저장된 가장 오래된 댓글 위치부터 이어 받는다
+         (그 사이 새 댓글/삭제된 댓글만큼 위치가 밀리거나 당겨지므로 한 페이지 앞에서 시작하고,
+          그 페이지가 저장된 가장 오래된 댓글보다 뒤쪽이면 더 앞으로 당김 → 겹친 댓글은 ID로 제거)
+    페이지마다 저장과 진행 상태 갱신을 한 번에 commit하므로 중간에 죽어도 다음 실행에서 이어진다.
+    1페이지를 먼저 받아 총 댓글 수(count.comment)로 페이지 수를 계산하고, 그 이상은 요청하지 않는다.
+    """
+    oid, aid = extract_oid_aid(url)
+    state = store.article(url)
+    known = state["newest_reg_time"] is not None
+    added = 0
+    n_pages = None  # 총 댓글 수로 계산한 페이지 수 (모르면 None → 빈 페이지가 나올 때까지)
 
-        text = res.text
-        start = text.find("(") + 1
-        end = text.rfind(")")
-        json_str = text[start:end]
+    async def walk(start: int, window: int, stop_on_seen: bool):
+        """start 페이지부터 window개씩 동시에 받아 페이지 순서대로 저장. 반환: (멈춘 이유, 페이지)"""
+        nonlocal added, n_pages
+        page = start
+        while page <= max_pages:
+            # 1페이지는 혼자 받아서 페이지 수를 먼저 알아낸다
+            last = page if page == 1 else min(page + window - 1, max_pages, n_pages or max_pages)
+            batch = list(range(page, max(page, last) + 1))
+            results = await asyncio.gather(
+                *(fetch_page(session, sem, oid, aid, p, newest_first=True) for p in batch)
+            )
+            for p, data in zip(batch, results):
+                if data is None:
+                    return "error", p  # 진행 상태를 그대로 두고 다음 실행에서 다시
+                result = data.get("result", {})
+                total_count = result.get("count", {}).get("comment")
+                if isinstance(total_count, int):
+                    n_pages = math.ceil(total_count / PAGE_SIZE)
+                rows = to_rows(result.get("commentList", []))
+                if not rows:
+                    store.save_page(url, [], backfill_done=True)
+                    return "end", p
 
-        data = json.loads(json_str)
-        print("[DEBUG JSON]", json_str[:500])
+                seen = store.seen(url, [str(r["comment_no"]) for r in rows])
+                added += sum(str(r["comment_no"]) not in seen for r in rows)
+                oldest = min((r["reg_time"] for r in rows if r.get("reg_time")), default=None)
+                hit = stop_on_seen and (
+                    bool(seen) or (oldest is not None and oldest < state["newest_reg_time"])
+                )
 
+                # 마지막 페이지: max_pages에 도달했거나, 계산한 마지막 페이지가 덜 찼을 때
+                # (받는 사이 새 댓글로 밀려 꽉 찼으면 다음 페이지를 한 번 더 확인)
+                last_page = n_pages is not None and p >= n_pages and len(rows) < PAGE_SIZE
+                done = True if p == max_pages or last_page else None
+                store.save_page(url, rows, backfill_page=max(p, store.article(url)["backfill_page"]), backfill_done=done)
+                if done:
+                    return "end", p
+                if hit:
+                    return "seen", p
+            page = batch[-1] + 1
+        return "end", page
 
-        # ★ 페이지 1에서 총 댓글 수 출력
-        if page == 1:
-            total_count = data.get("result", {}).get("count", {}).get("comment", "알 수 없음")
-            print(f"[DEBUG] 이 기사 총 댓글 수: {total_count}")
+    # 1) 새 댓글: 이미 아는 기사는 보통 1~2페이지에서 멈추므로 한 페이지씩
+    reason, page = await walk(1, 1 if known else PAGE_WINDOW, stop_on_seen=known)
 
-        comment_list = data.get("result", {}).get("commentList", [])
-        if not comment_list:
-            # 더 이상 댓글이 없으면 종료
+    # 2) 중간에 끊겼던 기사 이어 받기
+    if reason == "seen" and not state["backfill_done"]:
+        resume = await find_resume_page(session, sem, store, url, oid, aid)
+        if resume is not None:
+            await walk(max(resume, page + 1), PAGE_WINDOW, stop_on_seen=False)
+
+    return added
+
+
+async def find_resume_page(
+    session: aiohttp.ClientSession,
+    sem: asyncio.Semaphore,
+    store: CommentCheckpoint,
+    url: str,
+    oid: str,
+    aid: str,
+) -> int | None:
+    """
+    이어 받기 시작 페이지. 저장된 댓글 수로 가장 오래된 저장 댓글의 위치를 추정해 한 페이지 앞에서 시작하고,
+    그 페이지의 가장 최신 댓글이 가장 오래된 저장 댓글보다도 오래됐으면(삭제된 댓글이 한 페이지보다 많음)
+    한 페이지씩 앞으로 당긴다. 요청 실패면 None (다음 실행에서 다시).
+    """
+    frontier = store.frontier(url)
+    if frontier["oldest_reg_time"] is None:
+        return 1
+    page = max(1, (frontier["count"] - 1) // PAGE_SIZE)
+    while page > 1:
+        data = await fetch_page(session, sem, oid, aid, page, newest_first=True)
+        if data is None:
+            return None
+        rows = to_rows(data.get("result", {}).get("commentList", []))
+        newest = max((r["reg_time"] for r in rows if r.get("reg_time")), default=None)
+        if newest is not None and newest >= frontier["oldest_reg_time"]:
             break
+        page -= 1
+    return page
 
-        for c in comment_list:
-            all_comments.append({
-                "contents": c.get("contents"),
-                "like": c.get("sympathyCount"),
-                "dislike": c.get("antipathyCount"),
-                "reply_count": c.get("replyCount"),
-                "user_id": c.get("userIdNo"),
-                "mod_time": c.get("modTime"),
-                "reg_time": c.get("regTime"),
-            })
 
-        time.sleep(0.3)
+def make_session(concurrency: int = MAX_CONCURRENCY, per_host: int = MAX_PER_HOST) -> aiohttp.ClientSession:
+    """연결을 재사용하는 HTTP 클라이언트 (전체 / 호스트당 연결 수 제한)"""
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host, ttl_dns_cache=300)
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers=HEADERS,
+        timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+    )
 
-    return pd.DataFrame(all_comments)
 
+def make_semaphore(concurrency: int = MAX_CONCURRENCY, per_host: int = MAX_PER_HOST) -> asyncio.Semaphore:
+    """
+    동시 요청 슬롯. 댓글 API는 한 호스트라 슬롯을 호스트당 연결 수보다 많이 주면
+    슬롯을 잡고도 커넥터에서 연결을 기다리게 되고, 그 대기 시간이 응답 지연으로 잡혀
+    rate limiter가 스스로 만든 지연 때문에 속도를 줄인다 → 호스트당 연결 수 이하로 제한.
+    """
+    return asyncio.Semaphore(min(concurrency, per_host))
 
 
-if __name__ == "__main__":
-    os.makedirs("../data/raw", exist_ok=True)
+async def crawl_articles(
+    news_df: pd.DataFrame,
+    max_pages: int = 30,
+    concurrency: int = MAX_CONCURRENCY,
+    per_host: int = MAX_PER_HOST,
+    store: CommentCheckpoint | None = None,
+) -> list:
+    """
+    news_df(url, section_id, title)의 기사들을 동시에 크롤링. 기사 순서대로 DataFrame 리스트 반환.
+    store를 넘기면 새 댓글만 받아 체크포인트에 쌓고, 결과는 체크포인트에 저장된 기사별 전체 댓글.
+    """
+    sem = make_semaphore(concurrency, per_host)
+    done = 0
 
-    # 1) 아까 저장한 뉴스 리스트 불러오기
-    news_df = pd.read_csv("../data/raw/manual_news.csv")
+    async with make_session(concurrency, per_host) as session:
 
-    all_result = []
+        async def one(row) -> pd.DataFrame | None:
+            nonlocal done
+            try:
+                if store is None:
+                    df = await crawl_article(session, sem, row["url"], max_pages)
+                    status = f"댓글 {len(df)}개"
+                else:
+                    added = await crawl_article_incremental(session, sem, store, row["url"], max_pages)
+                    df = pd.DataFrame(store.comments(row["url"]), columns=COMMENT_COLUMNS)
+                    status = f"새 댓글 {added}개 (누적 {len(df)}개)"
+            except Exception as e:
+                print("에러 발생:", row["url"], e)
+                df, status = None, "실패"
+            done += 1
+            print(f"[{done}/{len(news_df)}] {status}: {row['title']}")
+            if df is None or df.empty:
+                return None
+            df = df[COMMENT_COLUMNS].copy()
+            df["section_id"] = row["section_id"]
+            df["article_title"] = row["title"]
+            df["article_url"] = row["url"]
+            return df
 
-    for idx, row in news_df.iterrows():
-        print(f"[{idx+1}/{len(news_df)}] 기사 크롤링 중...")
-        url = row["url"]
-        section_id = row["section_id"]
-        title = row["title"]
+        results = await asyncio.gather(*(one(row) for _, row in news_df.iterrows()))
 
-        try:
-            df_comments = get_comments_from_article(url, max_pages=30)
-            if df_comments.empty:
-                continue
+    return [df for df in results if df is not None]
 
-            df_comments["section_id"] = section_id
-            df_comments["article_title"] = title
-            df_comments["article_url"] = url
 
-            all_result.append(df_comments)
-        except Exception as e:
-            print("에러 발생:", e)
-            continue
+def get_comments_from_article(url, max_pages=30):
+    """기사 하나의 댓글 (동기 호출용)"""
+
+    async def run():
+        async with make_session() as session:
+            return await crawl_article(session, make_semaphore(), url, max_pages)
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="네이버 뉴스 댓글 수집 (댓글 API, 비동기)")
+    parser.add_argument("--input", default="../data/raw/manual_news.csv", help="기사 목록 (url, section_id, title)")
+    parser.add_argument("--output", default="../data/raw/comments.csv")
+    parser.add_argument("--max-pages", type=int, default=30, help="기사당 최대 페이지 수 (페이지당 20개)")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY, help="전체 동시 요청 수")
+    parser.add_argument("--per-host", type=int, default=MAX_PER_HOST, help="호스트당 동시 연결 수")
+    parser.add_argument("--rate", type=float, default=START_RATE, help="시작 초당 요청 수 (응답을 보며 자동 조절)")
+    parser.add_argument("--max-rate", type=float, default=MAX_RATE, help="초당 요청 수 상한")
+    parser.add_argument(
+        "--checkpoint",
+        default="../data/raw/comments_checkpoint.sqlite",
+        help="증분 수집 체크포인트 (새 댓글만 받고 중단된 기사는 이어 받음)",
+    )
+    parser.add_argument("--full", action="store_true", help="체크포인트 진행 상태를 무시하고 모든 페이지를 다시 수집")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+
+    # 1) 아까 저장한 뉴스 리스트 불러오기
+    news_df = pd.read_csv(args.input)
+
+    limiter = get_limiter(urlparse(API_URL).netloc, rate=args.rate, max_rate=args.max_rate)
+
+    store = CommentCheckpoint(args.checkpoint)
+    if args.full:
+        store.reset(news_df["url"].tolist())
+    try:
+        all_result = asyncio.run(crawl_articles(news_df, args.max_pages, args.concurrency, args.per_host, store))
+    finally:
+        store.close()
+        limiter.report()
 
     if all_result:
         final_df = pd.concat(all_result, ignore_index=True)
-        final_df.to_csv("../data/raw/comments.csv", index=False, encoding="utf-8-sig")
-        print("저장 완료: ../data/raw/comments.csv")
+        final_df.to_csv(args.output, index=False, encoding="utf-8-sig")
+        print(f"저장 완료: {args.output} ({len(final_df)}개 댓글)")
     else:
         print("수집된 댓글이 없습니다.")
+
+
+if __name__ == "__main__":
+    main()
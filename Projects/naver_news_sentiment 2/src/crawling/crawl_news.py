@@ -1,8 +1,9 @@
-import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 import os
 
+from rate_limiter import throttled_get
+
 # 네이버 뉴스 섹션 URL (정치, 사회, 연예)
 SECTION_URLS = {
     "100": "https://news.naver.com/section/100",  # 정치
@@ -23,7 +24,7 @@ def get_news_list(section_id: str, limit: int = 30) -> pd.DataFrame:
     'https://n.news.naver.com/mnews/article/...' 형태의 기사 링크만 골라서 수집
     """
     url = SECTION_URLS[section_id]
-    res = requests.get(url, headers=HEADERS)
+    res = throttled_get(url, headers=HEADERS)
     res.raise_for_status()
 
     soup = BeautifulSoup(res.text, "html.parser")
@@ -1,8 +1,9 @@
-import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 from pathlib import Path
 
+from rate_limiter import throttled_get
+
 
 SECTIONS = {
     "사회": "https://news.naver.com/section/102",
@@ -11,7 +12,7 @@ SECTIONS = {
 }
 
 def get_article_urls(section_name, url):
-    res = requests.get(url, headers={"User-Agent": "Mozilla/5.0"})
+    res = throttled_get(url, headers={"User-Agent": "Mozilla/5.0"})
     soup = BeautifulSoup(res.text, "html.parser")
 
     articles = soup.select("a.sa_text_title")  # 네이버 뉴스 제목 링크 (정확함)
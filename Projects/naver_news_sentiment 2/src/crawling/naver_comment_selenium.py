@@ -1,18 +1,55 @@
 import time
+import queue
+import argparse
+import threading
+from functools import lru_cache
+
 import pandas as pd
 from bs4 import BeautifulSoup
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support.ui import WebDriverWait
 from pathlib import Path
 
+from rate_limiter import limiter_for
+
+
+# 드라이버 풀: 브라우저 수 / 브라우저 하나로 처리할 최대 기사 수 (넘으면 새 브라우저로 교체)
+POOL_SIZE = 4
+RECYCLE_AFTER = 50
+
+# 댓글 수집에 필요 없는 리소스는 받지 않음 (이미지 / 폰트 / CSS)
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*.css",
+]
+
+# 댓글 로딩 대기: 고정 sleep 대신 댓글 수가 늘어나는지 짧은 간격으로 확인
+COMMENT_SELECTOR = ".u_cbox_text_wrap"
+COMMENT_AREA_SELECTOR = ".u_cbox_list, .u_cbox_comment_none"
+MORE_BUTTON_SELECTOR = ".u_cbox_btn_more"
+TOTAL_COUNT_SELECTOR = ".u_cbox_count"
+AREA_TIMEOUT = 5  # 댓글 영역이 뜰 때까지 최대 대기
+MORE_TIMEOUT = 3  # 더보기 클릭 후 다음 댓글 묶음 최대 대기
+SCROLL_TIMEOUT = 0.5  # 더보기 버튼이 없을 때 스크롤 후 추가 로딩 대기
+POLL_INTERVAL = 0.1
+
 
 ########################################
 # 1. 셀레니움 드라이버 실행
 ########################################
-def start_driver(headless=False):
+@lru_cache(maxsize=1)
+def resolve_driver_path() -> str:
+    """chromedriver 경로 (다운로드/버전 확인은 프로세스당 한 번만)"""
+    return ChromeDriverManager().install()
+
+
+def start_driver(headless=False, block_resources=False):
     print("[DEBUG] Selenium 크롤러 시작됨")
     options = webdriver.ChromeOptions()
     options.add_argument("--disable-blink-features=AutomationControlled")
@@ -24,49 +61,97 @@ def start_driver(headless=False):
         # 최신 크롬에서는 --headless=new 권장
         options.add_argument("--headless=new")
 
+    if block_resources:
+        options.add_experimental_option(
+            "prefs",
+            {
+                "profile.managed_default_content_settings.images": 2,
+                "profile.managed_default_content_settings.fonts": 2,
+            },
+        )
+
     print("[DEBUG] Chrome driver 생성 시도중...")
     driver = webdriver.Chrome(
-        service=Service(ChromeDriverManager().install()),
+        service=Service(resolve_driver_path()),
         options=options
     )
+
+    if block_resources:
+        # 설정으로 막을 수 없는 CSS / 웹폰트는 네트워크 단계에서 차단
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+
     print("[DEBUG] Chrome driver 생성 완료")
     return driver
 
 
 ########################################
-# 2. 댓글 모두 펼치기 (스크롤 끝까지)
+# 2. 댓글 모두 펼치기 (더보기 / 스크롤)
 ########################################
+def count_comments(driver):
+    return len(driver.find_elements(By.CSS_SELECTOR, COMMENT_SELECTOR))
+
+
+def total_comment_count(driver):
+    """댓글 영역에 표시된 전체 댓글 수 (없거나 숫자가 아니면 None)"""
+    elements = driver.find_elements(By.CSS_SELECTOR, TOTAL_COUNT_SELECTOR)
+    if not elements:
+        return None
+    text = elements[0].text.replace(",", "").strip()
+    return int(text) if text.isdigit() else None
+
+
+def wait_for_comment_area(driver, timeout=AREA_TIMEOUT):
+    """댓글 목록(또는 '댓글 없음')이 뜰 때까지 대기. 시간 안에 안 뜨면 False"""
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(
+            lambda d: d.find_elements(By.CSS_SELECTOR, COMMENT_AREA_SELECTOR)
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
+def wait_for_more_comments(driver, before, timeout):
+    """댓글 수가 before보다 늘어날 때까지 대기. 늘어나지 않으면 False"""
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(
+            lambda d: count_comments(d) > before
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
 def scroll_to_bottom(driver):
-    last_height = driver.execute_script("return document.body.scrollHeight")
+    """
+    댓글을 끝까지 펼친다. 매 단계 '더보기' 클릭(없으면 END 스크롤) 후 댓글 수가 늘어날 때만 계속.
+    표시된 전체 댓글 수만큼 이미 떠 있으면 바로 끝 (댓글 적은 기사는 대기 없이 종료)
+    """
+    total = total_comment_count(driver)
 
     while True:
-        driver.find_element(By.TAG_NAME, "body").send_keys(Keys.END)
-        time.sleep(1.5)
+        loaded = count_comments(driver)
+        if total is not None and loaded >= total:
+            break
+
+        buttons = [b for b in driver.find_elements(By.CSS_SELECTOR, MORE_BUTTON_SELECTOR) if b.is_displayed()]
+        if buttons:
+            # 다른 요소에 가려져도 눌리도록 JS로 클릭
+            driver.execute_script("arguments[0].click();", buttons[0])
+            timeout = MORE_TIMEOUT
+        else:
+            driver.find_element(By.TAG_NAME, "body").send_keys(Keys.END)
+            timeout = SCROLL_TIMEOUT
 
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        if new_height == last_height:
+        if not wait_for_more_comments(driver, loaded, timeout):
             break
-        last_height = new_height
 
 
 ########################################
 # 3. 댓글 수집 함수
 ########################################
-def get_comments_from_url(url):
-    driver = start_driver()
-    print(f"[DEBUG] 기사 페이지 접근: {url}")
-    driver.get(url)
-    print("[DEBUG] 페이지 로딩 완료")
-
-    time.sleep(2)
-
-    print(f"[INFO] 기사 접속 완료: {url}")
-
-    # 댓글 영역까지 스크롤
-    scroll_to_bottom(driver)
-
-    # 페이지 HTML 가져오기
-    html = driver.page_source
+def parse_comments(html):
     soup = BeautifulSoup(html, "html.parser")
 
     comment_blocks = soup.select(".u_cbox_text_wrap")
@@ -101,16 +186,140 @@ def get_comments_from_url(url):
             "dislike": dislike
         })
 
-    driver.quit()
     return pd.DataFrame(comments)
 
 
+def scrape_comments(driver, url):
+    """이미 떠 있는 브라우저로 기사 하나의 댓글 수집"""
+    # 브라우저 여러 개가 같은 호스트를 치므로 페이지 로딩도 호스트 limiter를 거친다
+    limiter = limiter_for(url)
+    limiter.acquire()
+    print(f"[DEBUG] 기사 페이지 접근: {url}")
+    load_start = time.time()
+    try:
+        driver.get(url)
+    except WebDriverException:
+        limiter.record(error=True)
+        raise
+    limiter.record(latency=time.time() - load_start)
+    print("[DEBUG] 페이지 로딩 완료")
+
+    start = time.time()
+    if not wait_for_comment_area(driver):
+        print(f"[WARN] 댓글 영역을 찾지 못함: {url}")
+
+    print(f"[INFO] 기사 접속 완료: {url}")
+
+    # 댓글 끝까지 펼치기
+    scroll_to_bottom(driver)
+    print(f"[DEBUG] 댓글 로딩 {count_comments(driver)}개, {time.time() - start:.2f}s")
+
+    # 페이지 HTML 가져오기
+    return parse_comments(driver.page_source)
+
+
+def get_comments_from_url(url, driver=None):
+    """기사 하나의 댓글. driver를 넘기지 않으면 브라우저를 새로 띄웠다가 닫는다"""
+    if driver is not None:
+        return scrape_comments(driver, url)
+
+    driver = start_driver()
+    try:
+        return scrape_comments(driver, url)
+    finally:
+        driver.quit()
+
+
 ########################################
-# 4. 메인 실행
+# 4. 드라이버 풀 (브라우저 재사용)
 ########################################
-import pandas as pd
+class DriverPool:
+    """
+    headless 브라우저 N개를 띄워두고 작업 큐의 URL을 나눠 처리.
+    - 브라우저 시작(수 초)을 기사마다 하지 않고 워커당 한 번만
+    - 한 브라우저로 recycle_after개 기사를 처리하면 새 브라우저로 교체 (메모리 누수 방지)
+    - 브라우저가 죽거나 시작에 실패하면(WebDriverException) 새로 띄워서 해당 기사를 한 번 더 시도
+      (두 번 다 실패하면 그 기사는 None, 워커는 다음 URL로 계속)
+    """
+
+    def __init__(self, size=POOL_SIZE, headless=True, recycle_after=RECYCLE_AFTER, block_resources=True):
+        self.size = size
+        self.headless = headless
+        self.recycle_after = recycle_after
+        self.block_resources = block_resources
+
+    def _new_driver(self):
+        return start_driver(headless=self.headless, block_resources=self.block_resources)
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
 
-if __name__ == "__main__":
+    def _worker(self, tasks: queue.Queue, results: dict):
+        driver, pages = None, 0
+        try:
+            while True:
+                try:
+                    i, url = tasks.get_nowait()
+                except queue.Empty:
+                    return
+
+                for attempt in range(2):
+                    try:
+                        # 브라우저 시작 실패도 같은 시도 횟수로 처리 (워커 스레드가 죽으면 남은 URL이 큐에 남음)
+                        if driver is None or pages >= self.recycle_after:
+                            if driver is not None:
+                                self._quit(driver)
+                                driver = None
+                            driver, pages = self._new_driver(), 0
+                        pages += 1
+                        results[i] = scrape_comments(driver, url)
+                        break
+                    except WebDriverException as e:
+                        print(f"[WARN] 브라우저 오류, 새 브라우저로 교체 ({attempt + 1}/2): {url} {type(e).__name__}")
+                        if driver is not None:
+                            self._quit(driver)
+                        driver = None
+                    except Exception as e:
+                        print("에러 발생:", url, e)
+                        break
+        finally:
+            if driver is not None:
+                self._quit(driver)
+
+    def map(self, urls):
+        """URL 목록의 댓글 DataFrame 리스트 (입력 순서, 실패한 기사는 None)"""
+        tasks = queue.Queue()
+        for i, url in enumerate(urls):
+            tasks.put((i, url))
+
+        results = {}
+        # 드라이버 경로는 워커들이 동시에 받지 않도록 미리 한 번
+        resolve_driver_path()
+        workers = [
+            threading.Thread(target=self._worker, args=(tasks, results), daemon=True)
+            for _ in range(min(self.size, len(urls)))
+        ]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+
+        return [results.get(i) for i in range(len(urls))]
+
+
+########################################
+# 5. 메인 실행
+########################################
+def main():
+    parser = argparse.ArgumentParser(description="네이버 뉴스 댓글 수집 (Selenium)")
+    parser.add_argument("--workers", type=int, default=POOL_SIZE, help="동시에 띄울 브라우저 수")
+    parser.add_argument("--recycle-after", type=int, default=RECYCLE_AFTER, help="브라우저 하나로 처리할 최대 기사 수")
+    parser.add_argument("--show", action="store_true", help="브라우저 창 띄우기 (기본: headless)")
+    args = parser.parse_args()
 
     # 자동으로 URL 읽기
     BASE_DIR = Path(__file__).resolve().parents[2]  # 프로젝트 루트
@@ -125,35 +334,36 @@ if __name__ == "__main__":
 
     TEST_URLS = df_urls["url"].tolist()
 
-    all_comments = []
-
-    for url in TEST_URLS:
-        print("\n=====================================")
-        print(f"[START] 댓글 수집 시작: {url}")
-        print("=====================================")
+    pool = DriverPool(size=args.workers, headless=not args.show, recycle_after=args.recycle_after)
+    results = pool.map(TEST_URLS)
+    if TEST_URLS:
+        limiter_for(TEST_URLS[0]).report()
 
-        df = get_comments_from_url(url)
-        print(f"[INFO] 수집된 댓글 수: {len(df)}")
+    all_comments = []
+    for url, df in zip(TEST_URLS, results):
+        if df is None:
+            print(f"[WARN] 댓글 수집 실패: {url}")
+            continue
+        print(f"[INFO] 수집된 댓글 수: {len(df)} ({url})")
 
         if len(df) > 0:
             df["article_url"] = url
             all_comments.append(df)
 
-    from pathlib import Path
+    raw_dir.mkdir(parents=True, exist_ok=True)
+
+    # 빈 리스트 예외 처리
+    if len(all_comments) > 0:
+        final_df = pd.concat(all_comments, ignore_index=True)
 
-# 프로젝트 루트 기준 경로 설정
-BASE_DIR = Path(__file__).resolve().parents[2]
-raw_dir = BASE_DIR / "data" / "raw"
-raw_dir.mkdir(parents=True, exist_ok=True)
+        out_path = raw_dir / "comments_selenium.csv"
+        final_df.to_csv(out_path, index=False, encoding="utf-8-sig")
 
-# 빈 리스트 예외 처리
-if len(all_comments) > 0:
-    final_df = pd.concat(all_comments, ignore_index=True)
+        print("\n[DONE] 완료! 저장된 파일:")
+        print(out_path)
+    else:
+        print("⚠️ 수집된 댓글이 없습니다. 뉴스 URL이 있는지 확인하세요.")
 
-    out_path = raw_dir / "comments_selenium.csv"
-    final_df.to_csv(out_path, index=False, encoding="utf-8-sig")
 
-    print("\n[DONE] 완료! 저장된 파일:")
-    print(out_path)
-else:
-    print("⚠️ 수집된 댓글이 없습니다. 뉴스 URL이 있는지 확인하세요.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import time
+import asyncio
+import threading
+from urllib.parse import urlparse
+
+import requests
+
+
+# 이 상태 코드는 "너무 빠르다"는 신호로 보고 감속
+THROTTLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class AdaptiveRateLimiter:
+    """
+    호스트 단위 토큰 버킷 + AIMD 속도 조절. 스레드(requests / Selenium)와 asyncio(aiohttp) 모두에서 사용.
+    - 요청 전에 acquire() / await acquire_async()로 토큰을 받고, 응답 후 record()로 결과를 알려준다
+    - 정상 응답이 이어지면 속도를 조금씩 올리고 (초당 요청 수 기준 한 바퀴에 +increase)
+    - 429/5xx, 연결 오류, 느린 응답(slow_latency 초 초과)이면 속도를 decrease 배로 줄인다
+      (동시에 날아간 요청들이 한꺼번에 실패해도 한 번만 줄도록 cooldown 동안은 다시 줄이지 않음)
+    - report_every 초마다 현재 허용 속도와 실제 처리 속도를 출력
+    """
+
+    def __init__(
+        self,
+        name: str = "",
+        rate: float = 5.0,
+        min_rate: float = 0.5,
+        max_rate: float = 30.0,
+        burst: float = 1.0,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        slow_latency: float = 3.0,
+        cooldown: float = 1.0,
+        report_every: float = 10.0,
+    ):
+        self.name = name
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_latency = slow_latency
+        self.cooldown = cooldown
+        self.report_every = report_every
+
+        self._lock = threading.Lock()
+        self._tokens = burst
+        self._last_refill = time.monotonic()
+        self._last_decrease = 0.0
+
+        # 출력용 집계 (report_every 구간마다 초기화)
+        self._window_start = time.monotonic()
+        self._window_ok = 0
+        self._window_bad = 0
+
+    def _reserve(self) -> float:
+        """토큰 하나를 예약하고 기다려야 할 시간(초)을 반환. 토큰이 모자라면 빚(음수)으로 예약"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def record(self, status: int | None = None, latency: float | None = None, error: bool = False):
+        """응답 결과 반영. status가 없으면(브라우저 로딩 등) 오류 여부와 지연 시간만 본다"""
+        bad = error or status in THROTTLE_STATUS or (latency is not None and latency > self.slow_latency)
+
+        with self._lock:
+            now = time.monotonic()
+            if bad:
+                self._window_bad += 1
+                if now - self._last_decrease >= self.cooldown:
+                    self.rate = max(self.min_rate, self.rate * self.decrease)
+                    self._tokens = min(self._tokens, 0.0)  # 남은 토큰으로 바로 몰아서 보내지 않도록
+                    self._last_decrease = now
+            else:
+                self._window_ok += 1
+                self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+            if now - self._window_start < self.report_every:
+                return
+            line = self._report_line(now)
+
+        print(line)
+
+    def _report_line(self, now: float) -> str:
+        elapsed = now - self._window_start
+        done = self._window_ok + self._window_bad
+        line = (
+            f"[RATE] {self.name} 허용 {self.rate:.1f} req/s, 실제 {done / elapsed if elapsed > 0 else 0:.1f} req/s "
+            f"(최근 {elapsed:.0f}s: 성공 {self._window_ok}, 감속 신호 {self._window_bad})"
+        )
+        self._window_start, self._window_ok, self._window_bad = now, 0, 0
+        return line
+
+    def report(self):
+        """지금까지의 구간 집계를 바로 출력 (크롤링 끝날 때)"""
+        with self._lock:
+            line = self._report_line(time.monotonic())
+        print(line)
+
+
+_limiters: dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(host: str, **kwargs) -> AdaptiveRateLimiter:
+    """
+    호스트별 공유 limiter. 같은 프로세스의 크롤러들은 같은 호스트에 대해 하나의 속도를 나눠 쓴다.
+    kwargs는 처음 만들 때만 적용 (속도를 바꾸려면 첫 요청 전에 호출).
+    """
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = AdaptiveRateLimiter(name=host, **kwargs)
+        return _limiters[host]
+
+
+def limiter_for(url: str) -> AdaptiveRateLimiter:
+    return get_limiter(urlparse(url).netloc)
+
+
+def throttled_get(url: str, session=None, **kwargs) -> requests.Response:
+    """requests.get + 호스트 limiter (요청 전 대기, 응답 상태/지연 시간 반영)"""
+    limiter = limiter_for(url)
+    limiter.acquire()
+    start = time.monotonic()
+    try:
+        res = (session or requests).get(url, **kwargs)
+    except requests.RequestException:
+        limiter.record(error=True)
+        raise
+    limiter.record(res.status_code, time.monotonic() - start)
+    return res
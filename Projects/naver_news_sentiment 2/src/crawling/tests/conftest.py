@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 크롤링 스크립트들이 같은 폴더 기준 import (from rate_limiter import ...)를 쓰므로 경로에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
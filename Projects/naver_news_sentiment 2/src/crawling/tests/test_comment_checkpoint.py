@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+import crawl_comments
+from comment_checkpoint import CommentCheckpoint
+from crawl_comments import PAGE_SIZE, crawl_article_incremental
+
+URL = "https://n.news.naver.com/mnews/article/001/0000000001"
+
+
+class FakeCommentApi:
+    """최신순 댓글 목록을 페이지로 나눠 주는 가짜 댓글 API. fail_from 이후 페이지는 실패(None)."""
+
+    def __init__(self, n: int):
+        self.next_no = 0
+        self.comments = []  # 최신순
+        self.add(n)
+        self.fail_from = None
+        self.requested = []
+
+    def add(self, n: int):
+        for _ in range(n):
+            self.next_no += 1
+            self.comments.insert(
+                0,
+                {"commentNo": self.next_no, "contents": f"c{self.next_no}", "regTime": f"2025-01-01T00:{self.next_no:04d}"},
+            )
+
+    def delete(self, nos: set):
+        self.comments = [c for c in self.comments if c["commentNo"] not in nos]
+
+    async def fetch_page(self, session, sem, oid, aid, page, newest_first=False):
+        assert newest_first  # 증분 수집은 최신순으로만 요청
+        self.requested.append(page)
+        if self.fail_from is not None and page >= self.fail_from:
+            return None
+        start = (page - 1) * PAGE_SIZE
+        return {
+            "result": {
+                "count": {"comment": len(self.comments)},
+                "commentList": self.comments[start : start + PAGE_SIZE],
+            }
+        }
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CommentCheckpoint(str(tmp_path / "checkpoint.sqlite"))
+    yield store
+    store.close()
+
+
+def run(store, max_pages=30):
+    return asyncio.run(crawl_article_incremental(None, None, store, URL, max_pages=max_pages))
+
+
+def stored_nos(store) -> set:
+    return {r[0] for r in store.conn.execute("SELECT comment_no FROM comments WHERE article_url = ?", (URL,))}
+
+
+def test_resume_after_interruption_with_inserts_and_deletes(store, monkeypatch):
+    api = FakeCommentApi(200)
+    monkeypatch.setattr(crawl_comments, "fetch_page", api.fetch_page)
+
+    # 1회차: 4페이지부터 실패 → 최신 60개만 저장, 끝까지 못 감
+    api.fail_from = 4
+    assert run(store) == 60
+    assert not store.article(URL)["backfill_done"]
+
+    # 그 사이 새 댓글 3개, 저장된 구간의 댓글 45개 삭제 → 저장 못 한 댓글들이 앞 페이지로 당겨짐
+    api.add(3)
+    api.delete(set(range(150, 195)))
+    api.fail_from = None
+
+    run(store)
+    current = {str(c["commentNo"]) for c in api.comments}
+    assert current <= stored_nos(store)
+    assert store.article(URL)["backfill_done"]
+
+
+def test_resume_after_interruption_with_inserts_only(store, monkeypatch):
+    api = FakeCommentApi(100)
+    monkeypatch.setattr(crawl_comments, "fetch_page", api.fetch_page)
+
+    api.fail_from = 3
+    run(store)
+    api.add(25)
+    api.fail_from = None
+    api.requested.clear()
+
+    added = run(store)
+    assert {str(c["commentNo"]) for c in api.comments} == stored_nos(store)
+    assert added == 25 + 60
+    # 새 댓글 2페이지 + 이어 받기(한 페이지 겹침) → 같은 페이지를 여러 번 받지 않음
+    assert max(api.requested.count(p) for p in set(api.requested)) <= 2
+
+
+def test_rerun_without_changes_fetches_first_page_only(store, monkeypatch):
+    api = FakeCommentApi(45)
+    monkeypatch.setattr(crawl_comments, "fetch_page", api.fetch_page)
+
+    assert run(store) == 45
+    assert store.article(URL)["backfill_done"]
+    api.requested.clear()
+    assert run(store) == 0
+    assert api.requested == [1]
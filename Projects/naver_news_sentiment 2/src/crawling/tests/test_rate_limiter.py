@@ -0,0 +1,100 @@
+import pytest
+
+import rate_limiter
+from rate_limiter import AdaptiveRateLimiter
+
+
+class FakeClock:
+    """time.monotonic / time.sleep 대용. sleep하면 시간이 그만큼 흐른다."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limiter.time, "sleep", clock.sleep)
+    return clock
+
+
+def make_limiter(**kwargs):
+    params = dict(rate=10, min_rate=1, max_rate=20, increase=1, decrease=0.5, slow_latency=3, cooldown=1)
+    params.update(kwargs)
+    return AdaptiveRateLimiter("test", report_every=1e9, **params)
+
+
+def test_throttle_status_halves_rate_once_per_cooldown(clock):
+    limiter = make_limiter()
+    limiter.record(429, 0.1)
+    assert limiter.rate == 5
+
+    # 같이 날아간 요청들이 연달아 429를 받아도 cooldown 안에서는 한 번만 감속
+    clock.now += 0.5
+    limiter.record(429, 0.1)
+    limiter.record(503, 0.1)
+    assert limiter.rate == 5
+
+    clock.now += 1.0
+    limiter.record(503, 0.1)
+    assert limiter.rate == 2.5
+
+
+@pytest.mark.parametrize("kwargs", [{"latency": 5.0}, {"error": True}])
+def test_slow_response_or_error_decreases_rate(clock, kwargs):
+    limiter = make_limiter()
+    limiter.record(200 if "latency" in kwargs else None, **kwargs)
+    assert limiter.rate == 5
+
+
+def test_rate_never_drops_below_min_rate(clock):
+    limiter = make_limiter()
+    for _ in range(10):
+        clock.now += 2
+        limiter.record(429)
+    assert limiter.rate == 1
+
+
+def test_rate_recovers_additively_after_decrease(clock):
+    limiter = make_limiter()
+    limiter.record(429)
+    assert limiter.rate == 5
+
+    # 성공 한 번에 +increase/rate (초당 요청 수 한 바퀴에 +increase)
+    limiter.record(200, 0.1)
+    assert limiter.rate == pytest.approx(5.2)
+
+    oks = 1
+    while limiter.rate < 10:
+        limiter.record(200, 0.1)
+        oks += 1
+    # 10 → 5로 줄인 만큼 되돌아오는 데 대략 (10² - 5²) / 2 번의 성공
+    assert 30 <= oks <= 40
+
+    for _ in range(1000):
+        limiter.record(200, 0.1)
+    assert limiter.rate == 20  # max_rate에서 멈춤
+
+
+def test_acquire_paces_requests_at_current_rate(clock):
+    limiter = make_limiter(rate=10)
+    start = clock.now
+    for _ in range(21):
+        limiter.acquire()
+    # burst 1개는 바로, 나머지 20개는 0.1초 간격
+    assert clock.now - start == pytest.approx(2.0)
+
+    # 감속하면 남은 토큰을 버리고 새 속도(5 req/s)로 간격이 벌어짐
+    limiter.record(429)
+    limiter.acquire()
+    start = clock.now
+    for _ in range(10):
+        limiter.acquire()
+    assert clock.now - start == pytest.approx(2.0)